@@ -0,0 +1,96 @@
+"""Benchmarks of the driver hot paths and the generator.
+
+The benchmarks use pytest-benchmark (part of ``requirements.txt``) and run
+against the in-process fake data server (``zhinst.labber.testing``) with real
+and synthetic (scaled) nodedocs. They are not part of the normal test run. Use
+
+    pytest benchmarks --benchmark-json=benchmark.json
+
+to run them and store the results as JSON. Two result files can be compared
+with ``pytest-benchmark compare``.
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tests" / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from BaseDriver import InstrumentQuantity
+from zhinst.labber.testing import FakeDataServer, fake_data_server, scale_nodedoc
+
+# Number of copies of each indexed node of the synthetic device
+SCALE = 8
+
+
+@pytest.fixture(scope="session")
+def data_dir():
+    yield Path(__file__).resolve().parents[1] / "tests" / "data" / "toolkit"
+
+
+@pytest.fixture(scope="session")
+def synthetic_nodedoc(data_dir):
+    yield scale_nodedoc(data_dir / "nodedoc_dev1234_uhfli.json", SCALE)
+
+
+@pytest.fixture()
+def fake_server(data_dir, synthetic_nodedoc):
+    server = FakeDataServer(
+        module_nodedocs={
+            "dataAcquisitionModule": data_dir / "nodedoc_daq_test.json",
+            "sweep": data_dir / "nodedoc_sweeper_test.json",
+        }
+    )
+    server.add_device("dev1234", synthetic_nodedoc, "UHFLI")
+    with fake_data_server(server):
+        yield server
+
+
+def create_quant(driver, name, cmd, datatype=InstrumentQuantity.DOUBLE, value=0):
+    """Create a Labber quantity and register it in the driver."""
+    quant = Mock(spec=InstrumentQuantity)
+    quant.name = name
+    quant.set_cmd = cmd
+    quant.get_cmd = cmd
+    quant.cmd_def = []
+    quant.datatype = datatype
+    quant.VECTOR = InstrumentQuantity.VECTOR
+    quant.STRING = InstrumentQuantity.STRING
+    quant.PATH = InstrumentQuantity.PATH
+    quant.sweep_minute = False
+    quant.getValue.return_value = value
+    driver.dQuantities[name] = quant
+    driver._node_quant_map[driver._quant_to_path(name)] = name
+    return quant
+
+
+def create_driver(instrument):
+    """Create an opened Labber driver connected to the fake data server."""
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": instrument,
+        # Only measure the driver and not the log output
+        "logger_level": 30,
+    }
+    labber_driver.created_sessions = {}
+    driver = labber_driver.BaseDevice(settings=settings)
+    driver.comCfg = MagicMock()
+    driver.comCfg.getAddressString.return_value = "DEV1234"
+    driver.instrCfg = MagicMock()
+    driver.instrCfg.getQuantity.side_effect = lambda name: driver.dQuantities[name]
+    driver.interface = MagicMock()
+    driver.dOp = {"operation": 0}
+    driver.performOpen()
+    return driver
+
+
+@pytest.fixture()
+def device_driver(fake_server):
+    yield create_driver({"base_type": "device", "type": "UHFLI"})
+
+
+@pytest.fixture()
+def daq_driver(fake_server):
+    yield create_driver({"base_type": "module", "type": "daq"})
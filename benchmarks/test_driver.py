@@ -0,0 +1,139 @@
+import configparser
+
+import numpy as np
+import pytest
+from InstrumentDriver_Interface import Interface
+
+import zhinst.labber.driver.base_instrument as labber_driver
+from conftest import SCALE, create_quant
+from BaseDriver import InstrumentQuantity
+from zhinst.labber import generate_labber_files
+
+
+def setting_quants(driver, nodedoc):
+    """Labber quantities for all numeric settings of the device."""
+    quants = []
+    for path, info in nodedoc.items():
+        if "Setting" not in info["Properties"] or "Write" not in info["Properties"]:
+            continue
+        if info["Type"] not in ["Double", "Integer (64 bit)"]:
+            continue
+        cmd = path[len("/dev1234/") :]
+        quants.append(create_quant(driver, cmd.replace("/", " - "), cmd))
+    return quants
+
+
+def test_set_value(benchmark, device_driver):
+    quant = create_quant(device_driver, "oscs - 0 - freq", "oscs/0/freq")
+    device_driver.dOp = {"operation": Interface.SET}
+    benchmark(device_driver.performSetValue, quant, 1e6)
+
+
+def test_get_value(benchmark, device_driver):
+    quant = create_quant(device_driver, "oscs - 0 - freq", "oscs/0/freq")
+    device_driver.dOp = {"operation": Interface.GET}
+    benchmark(device_driver.performGetValue, quant)
+
+
+def test_set_cfg(benchmark, device_driver, synthetic_nodedoc):
+    quants = setting_quants(device_driver, synthetic_nodedoc)
+    device_driver.dOp = {"operation": Interface.SET_CFG}
+    n_calls = len(quants)
+
+    def set_cfg():
+        for call_no, quant in enumerate(quants):
+            device_driver.performSetValue(
+                quant, 1, options={"call_no": call_no, "n_calls": n_calls}
+            )
+
+    benchmark.extra_info["quants"] = n_calls
+    benchmark.pedantic(set_cfg, rounds=5)
+
+
+def test_get_cfg(benchmark, device_driver, synthetic_nodedoc):
+    quants = setting_quants(device_driver, synthetic_nodedoc)
+    device_driver.dOp = {"operation": Interface.GET_CFG}
+
+    def get_cfg():
+        device_driver._snapshot.clear()
+        for quant in quants:
+            device_driver.performGetValue(quant)
+
+    benchmark.extra_info["quants"] = len(quants)
+    benchmark.pedantic(get_cfg, rounds=5)
+
+
+@pytest.mark.parametrize("num_samples", [1024, 100000])
+def test_import_waveforms(benchmark, device_driver, tmp_path, num_samples):
+    rng = np.random.default_rng(0)
+    paths = []
+    for name in ["waves1", "waves2", "markers"]:
+        path = tmp_path / f"{name}.csv"
+        data = rng.uniform(-1, 1, (16, num_samples))
+        if name == "markers":
+            data = (data > 0).astype(int)
+        np.savetxt(path, data, delimiter=",", fmt="%d" if name == "markers" else "%f")
+        paths.append(path)
+    waves = benchmark.pedantic(device_driver._import_waveforms, paths, rounds=5)
+    assert len(waves) == 16
+
+
+def test_module_read(benchmark, daq_driver):
+    num_signals = 16 * SCALE
+    daq_driver._instrument.grid.cols(1000)
+    for i in range(num_signals):
+        create_quant(
+            daq_driver,
+            f"signal - {i}",
+            "",
+            InstrumentQuantity.STRING,
+            f"/dev1234/demods/{i}/sample.r",
+        )
+        create_quant(daq_driver, f"result - {i}", "", InstrumentQuantity.VECTOR)
+    daq_driver.performSetValue(daq_driver.dQuantities["signal - 0"], "")
+    # Use a fixed result to only measure the driver
+    raw_module = daq_driver._instrument.raw_module
+    result = raw_module.read(flat=True)
+    raw_module.read = lambda flat=False: result
+    daq_driver.dOp = {"operation": Interface.GET}
+    benchmark(daq_driver.performGetValue, daq_driver.dQuantities["result - 0"])
+    assert daq_driver.dQuantities[f"result - {num_signals - 1}"].setValue.called
+
+
+@pytest.fixture()
+def generated_driver(fake_server, tmp_path):
+    """Generated driver directory of the synthetic device."""
+    generate_labber_files(str(tmp_path), "ADVANCED", "dev1234", "localhost")
+    yield tmp_path / "Zurich_Instruments_UHFLI"
+
+
+@pytest.mark.parametrize("metadata", [False, True])
+def test_create_driver(benchmark, generated_driver, metadata):
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": {"base_type": "device", "type": "UHFLI"},
+    }
+    metadata_file = generated_driver / "quant_metadata.py" if metadata else None
+    driver = benchmark(
+        labber_driver.BaseDevice, settings=settings, metadata_file=metadata_file
+    )
+    assert (driver._quant_info is not None) == metadata
+
+
+@pytest.mark.parametrize("metadata", [False, True])
+def test_node_info(benchmark, generated_driver, metadata):
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": {"base_type": "device", "type": "UHFLI"},
+    }
+    metadata_file = generated_driver / "quant_metadata.py" if metadata else None
+    driver = labber_driver.BaseDevice(settings=settings, metadata_file=metadata_file)
+    config = configparser.ConfigParser()
+    config.read(generated_driver / "Zurich_Instruments_UHFLI.ini")
+    quant_names = config.sections()
+
+    def node_info():
+        return [driver._get_node_info(name) for name in quant_names]
+
+    benchmark.extra_info["quants"] = len(quant_names)
+    assert any(benchmark(node_info))
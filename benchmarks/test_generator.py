@@ -0,0 +1,124 @@
+import io
+
+import pytest
+
+from zhinst.labber import generate_labber_files
+from zhinst.labber.code_generator.drivers import generate_labber_device_driver_code
+from zhinst.labber.generator.conf import LabberConfiguration
+from zhinst.labber.generator.generator import (
+    conf_to_labber_format,
+    iter_labber_format,
+    open_settings_file,
+)
+from zhinst.labber.generator.helpers import PatternSet, delete_device_from_node_path
+from zhinst.labber.generator.ini import write_ini
+from zhinst.labber.generator.quants import NodeQuant, QuantGenerator
+
+
+def test_generate_labber_files(benchmark, fake_server, tmp_path):
+    directories = iter(range(3))
+
+    def setup():
+        directory = tmp_path / str(next(directories))
+        directory.mkdir()
+        return (str(directory), "NORMAL", "dev1234", "localhost"), {}
+
+    generated, _ = benchmark.pedantic(generate_labber_files, setup=setup, rounds=3)
+    assert generated
+
+
+def test_generate_labber_files_unchanged(benchmark, fake_server, tmp_path):
+    generate_labber_files(str(tmp_path), "NORMAL", "dev1234", "localhost")
+
+    def generate():
+        return generate_labber_files(
+            str(tmp_path), "NORMAL", "dev1234", "localhost", upgrade=True
+        )
+
+    assert benchmark.pedantic(generate, rounds=3) == ([], [])
+
+
+def test_generate_device_driver_code(benchmark):
+    code = benchmark(
+        generate_labber_device_driver_code, "Zurich_Instruments_UHFLI", "settings.json"
+    )
+    assert "Zurich Instruments Zurich_Instruments_UHFLI" in code
+
+
+def test_ignored_nodes_matching(benchmark, synthetic_nodedoc):
+    conf = LabberConfiguration("UHFLI", "NORMAL", open_settings_file())
+    nodes = [
+        delete_device_from_node_path(info["Node"])
+        for info in synthetic_nodedoc.values()
+    ]
+
+    def match():
+        ignored_nodes = PatternSet(conf.ignored_nodes)
+        return sum(1 for node in nodes if ignored_nodes.match(node))
+
+    assert benchmark(match) > 0
+
+
+def test_node_quants(benchmark, synthetic_nodedoc):
+    infos = list(synthetic_nodedoc.values())
+
+    def convert():
+        quants = {}
+        for info in infos:
+            try:
+                quants.update(NodeQuant(info).as_dict())
+            except ValueError:
+                continue
+        return quants
+
+    assert len(benchmark(convert)) > len(infos) // 2
+
+
+def test_quant_paths(benchmark, synthetic_nodedoc):
+    nodes = list(synthetic_nodedoc)
+
+    def expand():
+        quant_gen = QuantGenerator(nodes)
+        return [
+            quant_gen.quant_paths(quant, ["dev"])
+            for quant in ["/demods/*/rate", "/sigouts/*/enables/*", "/awgs/*/enable"]
+        ]
+
+    demods, enables, _ = benchmark(expand)
+    assert demods and enables
+
+
+SECTIONS = [f"section {i}" for i in range(50)]
+
+
+@pytest.fixture(scope="module")
+def labber_data(synthetic_nodedoc):
+    """Labber configuration of the synthetic nodedoc, spread over sections."""
+    yield {
+        info["Node"].lower(): {
+            "section": SECTIONS[i % (len(SECTIONS) + 1) - 1],
+            "label": info["Node"].lower(),
+            "set_cmd": info["Node"],
+            "tooltip": info["Description"].replace("%", " percent"),
+        }
+        for i, info in enumerate(synthetic_nodedoc.values())
+    }
+
+
+def test_conf_to_labber_format(benchmark, labber_data):
+    formatted = benchmark(
+        conf_to_labber_format, labber_data, " - ", {"sections": SECTIONS[:-1]}
+    )
+    assert len(formatted) == len(labber_data)
+
+
+def test_write_ini(benchmark, labber_data):
+    def write():
+        file = io.StringIO()
+        write_ini(
+            file,
+            iter_labber_format(labber_data, " - ", {"sections": SECTIONS[:-1]}),
+        )
+        return file.getvalue()
+
+    assert benchmark(write).count("\n[") == len(labber_data) - 1
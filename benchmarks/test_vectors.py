@@ -0,0 +1,52 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+from InstrumentDriver_Interface import Interface
+
+from conftest import create_quant
+from BaseDriver import InstrumentQuantity
+
+NUM_SAMPLES = 1_000_000
+
+
+def peak_memory(function, *args):
+    """Peak memory in bytes that is allocated while calling a function."""
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+@pytest.mark.parametrize(
+    "dtype, datatype",
+    [
+        (np.complex64, InstrumentQuantity.VECTOR_COMPLEX),
+        (np.int16, InstrumentQuantity.VECTOR),
+    ],
+)
+def test_get_vector(benchmark, fake_server, device_driver, dtype, datatype):
+    vector = np.ones(NUM_SAMPLES, dtype=dtype)
+    fake_server.set("/dev1234/awgs/0/waveform/waves/0", vector)
+    quant = create_quant(
+        device_driver,
+        "awgs - 0 - waveform - waves - 0",
+        "awgs/0/waveform/waves/0",
+        datatype=datatype,
+    )
+    quant.VECTOR_COMPLEX = InstrumentQuantity.VECTOR_COMPLEX
+    device_driver.dOp = {"operation": Interface.GET}
+
+    result, peak = peak_memory(device_driver.performGetValue, quant)
+    assert result.dtype == dtype
+    assert np.shares_memory(result, vector)
+    benchmark.extra_info["samples"] = NUM_SAMPLES
+    benchmark.extra_info["vector_bytes"] = vector.nbytes
+    benchmark.extra_info["peak_bytes"] = peak
+    # no copy of the vector is made on the way to Labber
+    assert peak < vector.nbytes
+
+    benchmark(device_driver.performGetValue, quant)
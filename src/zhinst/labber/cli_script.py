@@ -1,6 +1,14 @@
 import click
 
 from zhinst.labber import generate_labber_files
+from zhinst.labber.generator import generate_labber_files_offline
+from zhinst.labber.generator.batch import (
+    DeviceEntry,
+    generate_labber_files_batch,
+    load_inventory,
+)
+from zhinst.labber.generator.generator import MODULE_FACTORIES
+from zhinst.labber.driver.broker import DEFAULT_PORT, is_loopback, serve
 
 
 @click.group()
@@ -68,8 +76,59 @@ def main():
     functionality or nodes.
     """,
 )
+@click.option(
+    "--nodedoc",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False),
+    help="""Generate the drivers offline from a saved node documentation.
+
+    JSON file with the output of `listNodesJSON` of the device. No data server
+    is contacted. Requires `--device_type`.
+    """,
+)
+@click.option(
+    "--device_type",
+    required=False,
+    type=str,
+    help="Device type of the node documentation (e.g. SHFQA4).",
+)
+@click.option(
+    "--options",
+    required=False,
+    type=str,
+    default="",
+    help="Comma separated device options of the node documentation (e.g. MF,AWG).",
+)
+@click.option(
+    "--labone_version",
+    required=False,
+    type=str,
+    default="24.10",
+    help="LabOne version of the node documentation.",
+)
+@click.option(
+    "--module_nodedoc",
+    required=False,
+    multiple=True,
+    type=str,
+    help="""Node documentation of a module in the format MODULE=FILE
+    (e.g. daq=nodedoc_daq.json). Can be used multiple times.
+    """,
+)
 def setup(
-    driver_directory, device_id, server_host, server_port, interface, hf2, mode, upgrade
+    driver_directory,
+    device_id,
+    server_host,
+    server_port,
+    interface,
+    hf2,
+    mode,
+    upgrade,
+    nodedoc,
+    device_type,
+    options,
+    labone_version,
+    module_nodedoc,
 ):
     """Generate Zurich Instruments Labber drivers.
 
@@ -86,25 +145,258 @@ def setup(
     Example:
 
     >>> zhinst-labber setup C:/Labber/Drivers DEV1234 localhost
+
+    >>> zhinst-labber setup C:/Labber/Drivers DEV1234 localhost
+    --nodedoc nodedoc_dev1234.json --device_type UHFLI --options MF,AWG
     """
+    if nodedoc is None and (device_type or module_nodedoc):
+        raise click.UsageError("--device_type and --module_nodedoc require --nodedoc.")
+    if nodedoc is not None and not device_type:
+        raise click.UsageError("--nodedoc requires --device_type.")
+    module_nodedocs = {}
+    for entry in module_nodedoc:
+        module, sep, path = entry.partition("=")
+        if not sep or not path:
+            raise click.BadParameter(
+                f"{entry} is not in the format MODULE=FILE.",
+                param_hint="--module_nodedoc",
+            )
+        module = module.strip().lower()
+        if module not in MODULE_FACTORIES:
+            raise click.BadParameter(
+                f"Unknown module {module}. "
+                f"Available modules: {', '.join(MODULE_FACTORIES)}",
+                param_hint="--module_nodedoc",
+            )
+        module_nodedocs[module] = path
     click.echo("Generating Zurich Instruments Labber device drivers...")
-    generated, upgraded = generate_labber_files(
-        driver_directory=driver_directory,
-        device_id=device_id,
-        server_host=server_host,
-        interface=interface,
-        mode=mode.upper(),
-        upgrade=upgrade,
-        server_port=server_port,
-        hf2=hf2,
-    )
+    if nodedoc is None:
+        generated, upgraded = generate_labber_files(
+            driver_directory=driver_directory,
+            device_id=device_id,
+            server_host=server_host,
+            interface=interface,
+            mode=mode.upper(),
+            upgrade=upgrade,
+            server_port=server_port,
+            hf2=hf2,
+        )
+    else:
+        generated, upgraded = generate_labber_files_offline(
+            driver_directory=driver_directory,
+            mode=mode.upper(),
+            device_id=device_id,
+            nodedoc=nodedoc,
+            device_type=device_type,
+            server_host=server_host,
+            options="\n".join(
+                option.strip() for option in options.split(",") if option.strip()
+            ),
+            labone_version=labone_version,
+            module_nodedocs=module_nodedocs,
+            upgrade=upgrade,
+            server_port=server_port,
+            hf2=hf2,
+        )
     if not upgrade and not generated:
         click.echo(
             "Error: It appears that the driver already exists. "
             "Please delete the files manually or "
             "use --upgrade options to overwrite the existing drivers."
         )
+    if upgrade and not generated and not upgraded:
+        click.echo("The drivers are up to date.")
     for file in generated:
         click.echo(f"Generated file: {file}")
     for file in upgraded:
         click.echo(f"Upgraded file: {file}")
+
+
+@main.command()
+@click.argument(
+    "driver_directory",
+    required=True,
+    type=click.Path(exists=True),
+)
+@click.argument(
+    "device_ids",
+    required=False,
+    nargs=-1,
+    type=str,
+)
+@click.option(
+    "--inventory",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False),
+    help="""JSON file with a list of devices.
+
+    Each entry is either a device ID or an object with the keys device_id,
+    server_host, server_port, interface, hf2 and for offline generation nodedoc,
+    device_type, options, labone_version and module_nodedocs.
+    """,
+)
+@click.option(
+    "--server_host",
+    required=False,
+    type=str,
+    default="localhost",
+    help="Zurich Instruments Data Server host of the DEVICE_IDS.",
+)
+@click.option(
+    "--server_port",
+    required=False,
+    type=int,
+    help="Zurich Instruments Data Server port of the DEVICE_IDS.",
+)
+@click.option("--hf2", required=False, is_flag=True, help="HF2 Dataserver")
+@click.option(
+    "--mode",
+    required=False,
+    type=click.Choice(["NORMAL", "ADVANCED"], case_sensitive=False),
+    default="NORMAL",
+    help="Select labber configuration mode. (see setup)",
+)
+@click.option(
+    "--upgrade",
+    required=False,
+    is_flag=True,
+    help="Upgrade existing drivers.",
+)
+@click.option(
+    "--jobs",
+    required=False,
+    type=click.IntRange(min=1),
+    help="Number of processes. Defaults to the number of CPUs.",
+)
+@click.option(
+    "--summary/--no-summary",
+    default=True,
+    help="Show the generation time and status of every device.",
+)
+def batch(
+    driver_directory,
+    device_ids,
+    inventory,
+    server_host,
+    server_port,
+    hf2,
+    mode,
+    upgrade,
+    jobs,
+    summary,
+):
+    """Generate Zurich Instruments Labber drivers for multiple devices.
+
+    The device drivers are generated in parallel. The DataServer and module
+    drivers are generated once per data server.
+
+    DRIVER_DIRECTORY: Directory where the drivers are saved. Usually in the Labber Driver-directory.
+
+    DEVICE_IDS: Zurich Instruments device IDs on SERVER_HOST
+
+    Example:
+
+    >>> zhinst-labber batch C:/Labber/Drivers DEV1234 DEV2345 --server_host localhost
+
+    >>> zhinst-labber batch C:/Labber/Drivers --inventory devices.json
+    """
+    devices = [
+        DeviceEntry(
+            device_id,
+            server_host=server_host,
+            server_port=server_port,
+            hf2=hf2,
+        )
+        for device_id in device_ids
+    ]
+    if inventory:
+        try:
+            devices += load_inventory(inventory)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--inventory")
+    if not devices:
+        raise click.UsageError("Specify DEVICE_IDS or --inventory.")
+    click.echo("Generating Zurich Instruments Labber device drivers...")
+    results = generate_labber_files_batch(
+        driver_directory=driver_directory,
+        mode=mode.upper(),
+        devices=devices,
+        upgrade=upgrade,
+        max_workers=jobs,
+    )
+    for result in results:
+        for file in result.created:
+            click.echo(f"Generated file: {file}")
+        for file in result.upgraded:
+            click.echo(f"Upgraded file: {file}")
+    if summary:
+        click.echo("Summary:")
+        width = max(len(result.name) for result in results)
+        for result in results:
+            if result.error is not None:
+                status = f"failed: {result.error}"
+            elif not result.created and not result.upgraded:
+                status = "up to date"
+            else:
+                status = (
+                    f"{len(result.created)} generated, "
+                    f"{len(result.upgraded)} upgraded"
+                )
+            click.echo(f"  {result.name:<{width}}  {result.duration:7.2f}s  {status}")
+    else:
+        for result in results:
+            if result.error is not None:
+                click.echo(f"{result.name} failed: {result.error}", err=True)
+    if any(result.error is not None for result in results):
+        raise click.ClickException("Generation failed for some devices.")
+
+
+@main.command()
+@click.option(
+    "--host",
+    required=False,
+    type=str,
+    default="localhost",
+    help="Address the broker listens on.",
+)
+@click.option(
+    "--port",
+    required=False,
+    type=int,
+    default=DEFAULT_PORT,
+    help="Port the broker listens on.",
+)
+@click.option(
+    "--authkey",
+    required=False,
+    type=str,
+    default=None,
+    help="Authentication key the drivers need to connect to the broker. Required "
+    "if the broker listens on a non-loopback address. Defaults to a random key "
+    "stored in the home directory of the user.",
+)
+@click.option(
+    "--snapshot_ttl",
+    required=False,
+    type=float,
+    default=1.0,
+    help="Time in seconds a snapshot (wildcard get) is shared between drivers.",
+)
+def broker(host, port, authkey, snapshot_ttl):
+    """Run a local broker for Zurich Instruments Labber drivers.
+
+    Labber runs every instrument driver in its own process. The broker keeps a
+    single connection per data server and shares it between all drivers that
+    specify the broker in the "data_server" section of their settings.json.
+
+    Example:
+
+    >>> zhinst-labber broker --port 8020
+    """
+    if not authkey and not is_loopback(host):
+        raise click.BadParameter(
+            "A non-loopback address requires an explicit --authkey.",
+            param_hint="--host",
+        )
+    click.echo(f"Zurich Instruments Labber broker listening on {host}:{port}")
+    serve(host=host, port=port, authkey=authkey, snapshot_ttl=snapshot_ttl)
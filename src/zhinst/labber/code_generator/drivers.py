@@ -1,26 +1,84 @@
+import string
 import typing as t
+from functools import lru_cache
 from pathlib import Path
 
-import autoflake
-import black
-import jinja2
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+# Formatted version of `device_template.py.j2` (see `build_device_template`)
+DEVICE_TEMPLATE = TEMPLATE_DIR / "device_template.py.tmpl"
+
+_PLACEHOLDERS = {
+    "class_name": "__ZHINST_LABBER_CLASS_NAME__",
+    "settings_file": "__ZHINST_LABBER_SETTINGS_FILE__",
+    "metadata_file": "__ZHINST_LABBER_METADATA_FILE__",
+}
+
+
+@lru_cache(maxsize=None)
+def _device_template() -> string.Template:
+    """Formatted device driver template.
+
+    Returns:
+        Template with the placeholders `class_name`, `settings_file` and
+        `metadata_file`.
+    """
+    return string.Template(DEVICE_TEMPLATE.read_text(encoding="utf-8"))
 
 
 def generate_labber_device_driver_code(
-    classname: str, settings_file: t.Union[Path, str]
+    classname: str,
+    settings_file: t.Union[Path, str],
+    metadata_file: t.Union[Path, str] = "quant_metadata.py",
 ) -> str:
     """Generate labber device driver code.
 
     Generates a Python file based on:
     `zhinst/labber/code_generator/templates/device_template.py.j2`
+
+    The template is formatted once during development
+    (`device_template.py.tmpl`), generating the code only substitutes the
+    class name, the settings file and the quant metadata file.
+    """
+    return _device_template().substitute(
+        class_name=classname, settings_file=settings_file, metadata_file=metadata_file
+    )
+
+
+def build_device_template() -> str:
+    """Build the formatted device driver template.
+
+    Renders `device_template.py.j2` with placeholders and formats the result
+    with black and autoflake.
+
+    Requires the development dependencies jinja2, black and autoflake.
+
+    Returns:
+        Content of `device_template.py.tmpl`.
     """
-    data = {"class": {"name": classname}, "settings_file": settings_file}
+    import autoflake
+    import black
+    import jinja2
 
-    fp = Path(__file__).parent / "templates"
-    templateLoader = jinja2.FileSystemLoader(searchpath=fp)
+    data = {
+        "class": {"name": _PLACEHOLDERS["class_name"]},
+        "settings_file": _PLACEHOLDERS["settings_file"],
+        "metadata_file": _PLACEHOLDERS["metadata_file"],
+    }
+    templateLoader = jinja2.FileSystemLoader(searchpath=TEMPLATE_DIR)
     templateEnv = jinja2.Environment(loader=templateLoader)
     template = templateEnv.get_template("device_template.py.j2")
     result = template.render(data)
     result = black.format_str(result, mode=black.FileMode())
     result = autoflake.fix_code(result, remove_all_unused_imports=True)
+    result = result.replace("$", "$$")
+    for name, placeholder in _PLACEHOLDERS.items():
+        result = result.replace(placeholder, "${" + name + "}")
     return result
+
+
+def write_device_template() -> None:
+    """Update `device_template.py.tmpl` after `device_template.py.j2` changed.
+
+    Requires the development dependencies jinja2, black and autoflake.
+    """
+    DEVICE_TEMPLATE.write_text(build_device_template(), encoding="utf-8")
@@ -0,0 +1,80 @@
+"""Accessors for parts of the return value of toolkit functions.
+
+The settings file specifies which part of a return value belongs to a quantity
+with a python like subscription expression (e.g. ``['vector']`` or
+``[0]['x']``). The expression is parsed once into a chain of keys/indexes
+instead of being evaluated on every call.
+"""
+
+import ast
+import typing as t
+
+
+class Accessor:
+    """Compiled subscription expression.
+
+    Args:
+        expression: Subscription expression (e.g. ``['vector'][0]``). An empty
+            expression returns the value itself.
+
+    Raises:
+        ValueError: If the expression is not a chain of constant subscriptions.
+    """
+
+    __slots__ = ("expression", "keys")
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.keys = self._parse(expression)
+
+    @staticmethod
+    def _parse(expression: str) -> t.Tuple[t.Union[int, str], ...]:
+        """Parse a subscription expression into a chain of keys.
+
+        Args:
+            expression: Subscription expression.
+
+        Returns:
+            Keys/indexes in the order they are applied.
+
+        Raises:
+            ValueError: If the expression is not a chain of constant subscriptions.
+        """
+        if not expression.strip():
+            return ()
+        try:
+            node = ast.parse("_" + expression.strip(), mode="eval").body
+        except SyntaxError:
+            raise ValueError(f"Invalid return value {expression}") from None
+        keys = []
+        while isinstance(node, ast.Subscript):
+            key = node.slice
+            # python < 3.9 wraps the slice in an Index node
+            key = getattr(key, "value", key) if type(key).__name__ == "Index" else key
+            try:
+                value = ast.literal_eval(key)
+            except ValueError:
+                raise ValueError(f"Invalid return value {expression}") from None
+            if not isinstance(value, (int, str)):
+                raise ValueError(f"Invalid return value {expression}")
+            keys.append(value)
+            node = node.value
+        if not isinstance(node, ast.Name) or node.id != "_":
+            raise ValueError(f"Invalid return value {expression}")
+        return tuple(reversed(keys))
+
+    def __call__(self, value: t.Any) -> t.Any:
+        """Get the part of a value.
+
+        Args:
+            value: Return value of the function.
+
+        Returns:
+            Part of the value specified by the expression.
+        """
+        for key in self.keys:
+            value = value[key]
+        return value
+
+    def __repr__(self) -> str:
+        return f"Accessor({self.expression!r})"
@@ -6,7 +6,7 @@ import json
 import logging
 import os
 import re
-import string
+import time
 import typing as t
 from itertools import repeat
 from pathlib import Path
@@ -14,12 +14,45 @@ from pathlib import Path
 import numpy as np
 from BaseDriver import LabberDriver
 from InstrumentDriver_Interface import Interface
+from zhinst import core
 from zhinst.toolkit import Session, Waveforms
 from zhinst.toolkit.driver.devices import DeviceType
 from zhinst.toolkit.driver.modules import ModuleType
 
-from zhinst.labber.driver.logger import configure_logger
+from zhinst.labber.driver.accessor import Accessor
+from zhinst.labber.driver.broker import connect_broker
+from zhinst.labber.driver.config_planner import SetConfigPlanner
+from zhinst.labber.driver.hardware_loop import (
+    COMMAND_TABLE_KINDS,
+    MODULE_COUNT_NODES,
+    MODULE_DURATION_NODES,
+    HardwareLoop,
+    ModuleResults,
+)
+from zhinst.labber.driver.logger import PayloadSummary, configure_logger
+from zhinst.labber.driver.metadata import (
+    driver_node_info,
+    load_metadata,
+    match_driver_info,
+)
+from zhinst.labber.driver.poller import BackgroundPoller, matching_config
+from zhinst.labber.driver.prefetch import get_prefetcher, prefetched_device
+from zhinst.labber.driver.recorder import (
+    RecordingConnection,
+    ReplayConnection,
+    TraceRecord,
+    TraceWriter,
+    traced,
+)
 from zhinst.labber.driver.snapshot_manager import SnapshotManager, TransactionManager
+from zhinst.labber.driver.state import load_state, save_state
+from zhinst.labber.driver.streaming import (
+    POLL_TIME,
+    SAMPLE_FIELDS,
+    DemodStream,
+    apply_statistic,
+)
+from zhinst.labber.driver.vectors import extract_vector, to_labber_vector
 from zhinst.labber.helper import check_compatibility
 
 Quantity = t.TypeVar("Quantity")
@@ -50,6 +83,17 @@ class BaseDevice(LabberDriver):
         * shared_session: Flag if the session should be shared with Labber.
             Warning: If set to false some feature may no longer be supported.
             (default = true)
+        * broker: Optional information about a local broker
+            (``zhinst-labber broker``) that shares a single data server
+            connection between all Labber driver processes. If not specified
+            the driver connects to the data server directly.
+            * host: Address of the broker. (default = "localhost")
+            * port: Port of the broker. (default = 8020)
+            * authkey: Authentication key of the broker. (default = random
+                key stored in ``~/.zhinst-labber/broker_authkey``)
+        * prefetch: Serials of the devices that should be connected
+            concurrently when the first driver of the session is opened.
+            (default = [])
     * instrument: (Labber instrument specific information)
         * base_type: Base type of the instrument. (device, module, session)
         * type: Type of the module. Not used for session.
@@ -60,40 +104,104 @@ class BaseDevice(LabberDriver):
         settings are used.
     * logger_path: Optional logger path where the logging information will be
         stored (in addition to the std output which is always enabled).
+    * record_path: Optional path of a trace file. If specified all Labber
+        operations and the resulting data server requests are recorded
+        together with their timing (see ``zhinst.labber.driver.recorder``).
+    * replay_path: Optional path of a recorded trace. If specified the driver
+        does not connect to a data server but answers all requests with the
+        values of the trace.
+    * background_poller: Optional configuration of read-only vector
+        quantities that are polled in a background thread (only for devices).
+        The keys are wildcard quantity paths (e.g. ``/scopes/*/wave``), the
+        values the configuration for the matching quantities:
+        * buffer_size: Number of samples of a completed buffer. (default = 0,
+            meaning every received vector)
+        * fresh: Flag if a read must return data that has not been returned
+            before. (default = false)
+        * timeout: Maximum time in seconds a read waits for data before it
+            falls back to a direct read. (default = 1.0)
 
     The driver will accept all arguments and forward them to the
     ``LabberDriver`` directly.
 
+    If the generator created a quant metadata module for the driver, the
+    driver information of the quants is read from it instead of the global
+    settings (see ``zhinst.labber.driver.metadata``).
+
     Args:
         settings: local settings
+        metadata_file: Path of the quant metadata module of the driver.
     """
 
-    def __init__(self, *args, settings=t.Dict, **kwargs):
+    def __init__(
+        self,
+        *args,
+        settings=t.Dict,
+        metadata_file: t.Optional[t.Union[str, Path]] = None,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self._session = None
         self._instrument = None
         self._transaction = None
         self._snapshot = None
+        self._recorder = None
+        self._hardware_loop = HardwareLoop()
+        self._command_tables_changed = False
+        self._module_results = None
+        self._streams = {}
+        self._stream_connection = None
+        self._poller = None
+        self._poller_quants = {}
+        self._function_paths = {}
+        self._toolkit_functions = {}
         self._instrument_settings = settings
         self._device_type = settings["instrument"].get("type", "")
         instrument_type = settings["instrument"].get("base_type", "")
         log_level = settings.get("logger_level", None)
 
-        # read information from global settings file
-        with GLOBAL_SETTINGS.open("r") as file:
-            node_info = json.loads(file.read())
-            self._node_info = node_info["common"].get("quants", {})
-            if self._device_type:
-                if instrument_type == "device":
-                    dev_type = self._device_type.split("_")[0].rstrip(string.digits)
-                    device_info = node_info.get(dev_type, {}).get("quants", {})
-                else:
-                    device_info = node_info.get(self._device_type, {}).get("quants", {})
-                self._node_info = {**self._node_info, **device_info}
+        metadata = (
+            load_metadata(metadata_file, GLOBAL_SETTINGS) if metadata_file else None
+        )
+        if metadata is not None:
+            # driver information already resolved for every quant
+            self._node_info = {}
+            self._quant_info = {
+                node_path: metadata.DRIVER_INFO[index]
+                for node_path, index in metadata.QUANTS.items()
+            }
+            self._function_info = metadata.FUNCTIONS
+            self._path_seperator = metadata.LABBER_DELIMITER
+            global_log_level = metadata.LOG_LEVEL
+            driver_infos = (
+                (f"DRIVER_INFO[{index}]", info)
+                for index, info in enumerate(metadata.DRIVER_INFO)
+            )
+        else:
+            # read information from global settings file
+            with GLOBAL_SETTINGS.open("r") as file:
+                node_info = json.loads(file.read())
+            self._node_info = driver_node_info(
+                node_info, instrument_type, self._device_type
+            )
+            self._quant_info = None
             self._function_info = node_info.get("functions", {})
             self._path_seperator = node_info["misc"]["labberDelimiter"]
-            # use global log level if no local one is defined
-            log_level = node_info["misc"]["LogLevel"] if not log_level else log_level
+            global_log_level = node_info["misc"]["LogLevel"]
+            driver_infos = (
+                (pattern, info.get("driver", {}))
+                for pattern, info in self._node_info.items()
+            )
+        # use global log level if no local one is defined
+        log_level = global_log_level if not log_level else log_level
+        # compile the return value expressions of the functions once
+        for pattern, driver_info in driver_infos:
+            if "return_value" in driver_info:
+                try:
+                    driver_info["return_value"] = Accessor(driver_info["return_value"])
+                except ValueError as error:
+                    logger.error("%s: %s", pattern, error)
+                    driver_info["return_value"] = None
 
         configure_logger(
             logger, log_level, self._instrument_settings.get("logger_path", None)
@@ -106,6 +214,7 @@ class BaseDevice(LabberDriver):
             self._quant_to_path(quant): quant for quant in self.dQuantities
         }
 
+    @traced("open", with_quant=False)
     def performOpen(self, options: t.Dict = {}) -> None:
         """Perform the operation of opening the instrument connection.
 
@@ -116,12 +225,26 @@ class BaseDevice(LabberDriver):
             self._instrument_settings["data_server"],
             self._instrument_settings["instrument"].get("base_type", "DataServer"),
         )
+        prefetch = self._instrument_settings["data_server"].get("prefetch", [])
+        if prefetch and self._session in created_sessions.values():
+            get_prefetcher(self._session).prefetch(prefetch)
         self._instrument = self._create_instrument(
             self._instrument_settings["instrument"]
         )
         self._snapshot = SnapshotManager(self._instrument.root)
         self._transaction = TransactionManager(self._instrument, self)
+        self._config_planner = SetConfigPlanner(self._snapshot)
+        self._resolve_toolkit_functions()
+        poller_config = self._instrument_settings.get("background_poller", {})
+        if (
+            poller_config
+            and self._instrument_settings["instrument"].get("base_type", "")
+            == "device"
+            and not self._instrument_settings.get("replay_path", None)
+        ):
+            self._start_poller(poller_config)
 
+    @traced("set")
     def performSetValue(
         self,
         quant: Quantity,
@@ -161,9 +284,17 @@ class BaseDevice(LabberDriver):
             Value that was set. (If None Labber will automatically use the input
             value instead)
         """
+        set_config = (
+            "call_no" in options and self.dOp["operation"] == Interface.SET_CFG
+        )
         # Start transaction if necessary
         if "call_no" in options and not self._transaction.is_running():
             self._transaction.start()
+        if set_config and self.isFirstCall(options):
+            try:
+                self._config_planner.start()
+            except Exception as error:
+                logger.error("Error during taking a snapshot: %s", error)
         try:
             node_info = self._get_node_info(quant.name)
             if "call_no" in options and not node_info.get("transaction", True):
@@ -173,13 +304,18 @@ class BaseDevice(LabberDriver):
                     quant.name,
                 )
                 return value
+            if node_info.get("stream", ""):
+                logger.info("%s: set %s", quant.name, value)
+                return value
+            if node_info.get("hardware_loop", ""):
+                return self._set_hardware_loop_value(
+                    quant, value, node_info["hardware_loop"], options
+                )
             if node_info.get("function", ""):
                 quant.setValue(False if node_info.get("trigger", False) else value)
-                function_path = node_info.get("function_path", ".")
-                function_path = self._quant_to_path(quant.name) / function_path
                 self.call_function(
                     node_info["function"],
-                    function_path.resolve(),
+                    self._get_function_path(quant.name, node_info),
                 )
                 return False if node_info.get("trigger", False) else value
             if not quant.set_cmd:
@@ -188,6 +324,14 @@ class BaseDevice(LabberDriver):
             # Add device if necessary
             if node_info.get("is_node_path", False) and "dev" not in value.lower():
                 value, _ = self._raw_path_to_zi_node(value)
+            # Set CFG => only write nodes that differ from the snapshot
+            if (
+                set_config
+                and not node_info.get("trigger", False)
+                and not self._needs_write(quant, value)
+            ):
+                logger.info("%s: unchanged %s", quant.name, PayloadSummary(value))
+                return value
             value = self._set_value_toolkit(
                 quant, value, wait_for=node_info.get("wait_for", False)
             )
@@ -199,7 +343,14 @@ class BaseDevice(LabberDriver):
                     self._transaction.end()
                 except Exception as error:
                     logger.error("Error during ending a transaction: %s", error)
-
+            if set_config and self.isFinalCall(options):
+                self._write_stale_values()
+            if self._command_tables_changed and self.isFinalCall(options):
+                self._command_tables_changed = False
+                if not self._hardware_loop.has_steps:
+                    self._upload_command_tables()
+
+    @traced("get")
     def performGetValue(self, quant: Quantity, options: t.Dict = {}) -> t.Any:
         """Perform the Get Value instrument operation.
 
@@ -215,18 +366,42 @@ class BaseDevice(LabberDriver):
         Returns:
             New value of the quantity.
         """
+        # Armed module => only read the record of the current step
+        if (
+            self._module_results is not None
+            and self.isHardwareLoop(options)
+            and self._get_node_info(quant.name).get("function", "") == "module_read"
+        ):
+            seq_no, _ = self.getHardwareLoopIndex(options)
+            return self._read_module_step(quant, seq_no)
         node_info = self._get_node_info(quant.name)
+        # Hardware loop result => read it once and return one slice per step
+        if node_info.get("hardware_loop_result", False) and self.isHardwareLoop(
+            options
+        ):
+            seq_no, n_seq = self.getHardwareLoopIndex(options)
+            return self._hardware_loop.split_result(
+                quant.name, lambda: self.performGetValue(quant), seq_no, n_seq
+            )
+        if node_info.get("stream", ""):
+            return self._get_stream_value(quant, node_info["stream"])
+        # Background poller => return the latest completed buffer
+        if quant.name in self._poller_quants and self.dOp["operation"] not in [
+            Interface.GET_CFG,
+            Interface.SET_CFG,
+        ]:
+            value = self._get_polled_value(quant)
+            if value is not None:
+                return value
         # Get CFG => reset function values to default
         if self.dOp["operation"] == Interface.GET_CFG and node_info.get("function", ""):
             logger.info("%s: reset to default", quant.name)
             return "" if quant.datatype in [quant.STRING, quant.PATH] else 0
         # Call function. (No function execution during GET_CFG)
         if node_info.get("function", ""):
-            function_path = node_info.get("function_path", ".")
-            function_path = self._quant_to_path(quant.name) / function_path
             self.call_function(
                 node_info["function"],
-                function_path.resolve(),
+                self._get_function_path(quant.name, node_info),
             )
         # Get value from toolkit
         elif quant.get_cmd:
@@ -242,7 +417,7 @@ class BaseDevice(LabberDriver):
                     value = self._parse_value(quant, self._snapshot.get_value(get_cmd))
                 except RuntimeError as error:
                     logger.debug("%s", error)
-                logger.info("%s: get %s", quant.name, value)
+                logger.info("%s: get %s", quant.name, PayloadSummary(value))
 
                 return value if value is not None else quant.getValue()
             # clear snapshot if GET_CFG is finished
@@ -251,23 +426,539 @@ class BaseDevice(LabberDriver):
                 value = self._parse_value(
                     quant, self._instrument[get_cmd](parse=False, enum=False)
                 )
-                logger.info("%s: get %s", quant.name, value)
+                logger.info("%s: get %s", quant.name, PayloadSummary(value))
                 return value if value is not None else quant.getValue()
             except Exception as error:
                 logger.error("%s", error)
         return quant.getValue()
 
-    # def performClose(self, bError: bool = False, options: t.Dict = {}) -> None:
-    #     """Perform the close instrument connection operation."""
-    #     pass
+    def performClose(self, bError: bool = False, options: t.Dict = {}) -> None:
+        """Perform the close instrument connection operation.
+
+        Stops the background poller, unsubscribes all streamed nodes and closes
+        the trace file if the driver is recording.
+        """
+        self._close(bError, options)
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
+    @traced("close", with_quant=False)
+    def _close(self, bError: bool = False, options: t.Dict = {}) -> None:
+        """Stop the background poller and unsubscribe all streamed nodes.
+
+        Traced as close operation, which needs to be recorded before the trace
+        file is closed.
+        """
+        if self._poller is not None:
+            self._poller.stop()
+            self._poller = None
+            self._poller_quants = {}
+        for stream in self._streams.values():
+            try:
+                self._stream_connection.unsubscribe(stream.path)
+            except Exception as error:
+                logger.error("%s", error)
+        self._streams = {}
+        self._stream_connection = None
 
     # def initSetConfig(self) -> None:
     #     """Run before setting values in Set Config."""
     #     pass
 
-    # def performArm(self, quant_names: str, options: t.Dict = {}) -> None:
-    #     """Perform the instrument arm operation"""
-    #     pass
+    @traced("arm", with_quant=False)
+    def performArm(self, quant_names: t.List[str], options: t.Dict = {}) -> None:
+        """Perform the instrument arm operation.
+
+        Devices upload the values collected for a hardware loop. Modules are
+        started once for the whole hardware loop.
+
+        Args:
+            quant_names: Names of the quantities that will be read after arming.
+            options: Additional information provided by Labber.
+        """
+        base_type = self._instrument_settings["instrument"].get("base_type", "")
+        if base_type == "device":
+            self._arm_hardware_loop(options)
+        elif base_type == "module":
+            self._arm_module(options)
+
+    def export_state(self, path: t.Union[str, Path]) -> None:
+        """Export the state of the instrument into a file.
+
+        The values of all settable nodes are read with a single get. The files
+        of all path quantities (e.g. sequencer programs or waveforms) are
+        stored as part of the state as well.
+
+        Args:
+            path: Path of the state file.
+        """
+        root = self._instrument.root
+        values = root["*"](parse=False, enum=False, settingsonly=True)
+        nodes = {}
+        for node, value in values.items():
+            try:
+                if root.raw_path_to_node(node).node_info.writable:
+                    nodes[node] = value
+            except Exception as error:
+                logger.debug("%s: %s", node, error)
+        files = {}
+        for quant_name, quant in self.dQuantities.items():
+            if quant.datatype != quant.PATH:
+                continue
+            file_path = str(self.getValue(quant_name))
+            if file_path not in ["", "."] and Path(file_path).is_file():
+                files[quant_name] = Path(file_path)
+        save_state(path, nodes, files)
+        logger.info(
+            "Exported %d nodes and %d files to %s", len(nodes), len(files), path
+        )
+
+    def import_state(self, path: t.Union[str, Path]) -> None:
+        """Restore the state of the instrument from a file.
+
+        All nodes are set within a single transaction. Afterwards the files of
+        the state are assigned to their quantities and the functions that use
+        them are called.
+
+        Args:
+            path: Path of the state file (see ``export_state``).
+        """
+        nodes, files = load_state(path)
+        root = self._instrument.root
+        self._transaction.start()
+        try:
+            for node, value in nodes.items():
+                try:
+                    root.raw_path_to_node(node)(value)
+                except Exception as error:
+                    logger.error("%s: %s", node, error)
+        finally:
+            try:
+                self._transaction.end()
+            except Exception as error:
+                logger.error("Error during ending a transaction: %s", error)
+        for quant_name, file_path in files.items():
+            if quant_name in self.dQuantities:
+                self.setValue(quant_name, str(file_path))
+        # Uploading a sequencer program resets the command table of the AWG
+        # => sequencer programs first
+        functions = sorted(
+            self._functions_using(files),
+            key=lambda name: self._get_node_info(name)["function"]
+            != "sequencer_program",
+        )
+        for quant_name in functions:
+            node_info = self._get_node_info(quant_name)
+            self.call_function(
+                node_info["function"],
+                self._get_function_path(quant_name, node_info),
+            )
+        logger.info(
+            "Imported %d nodes and %d files from %s", len(nodes), len(files), path
+        )
+
+    def _functions_using(self, quant_names: t.Iterable[str]) -> t.List[str]:
+        """Function quantities that use at least one of the quantities.
+
+        Args:
+            quant_names: Names of the quantities.
+
+        Returns:
+            Names of the function quantities.
+        """
+        quant_names = set(quant_names)
+        functions = []
+        for quant_name in self.dQuantities:
+            node_info = self._get_node_info(quant_name)
+            args = self._function_info.get(node_info.get("function"), {}).get(
+                "Args", {}
+            )
+            if not args:
+                continue
+            function_path = self._get_function_path(quant_name, node_info)
+            for relative_names in args.values():
+                if not isinstance(relative_names, list):
+                    relative_names = [relative_names]
+                if any(
+                    self._path_to_quant((function_path / name).resolve())
+                    in quant_names
+                    for name in relative_names
+                ):
+                    functions.append(quant_name)
+                    break
+        return functions
+
+    def _arm_module(self, options: t.Dict) -> None:
+        """Start a module for the whole hardware loop.
+
+        Subscribes the signals, configures the module to record one record per
+        step and executes it once. The following steps only read their record
+        (see _read_module_step).
+
+        Args:
+            options: Additional information provided by Labber.
+        """
+        self._module_results = None
+        count_node = MODULE_COUNT_NODES.get(self._device_type.lower(), "")
+        if not count_node or not self.isHardwareLoop(options):
+            return
+        _, n_seq = self.getHardwareLoopIndex(options)
+        func_info = self._function_info["module_read"]
+        try:
+            self._call_module_subscribe(Path(func_info.get("signals", "/signal/*")))
+            self._instrument.raw_module.set(count_node, n_seq)
+            self._instrument.raw_module.set("historylength", n_seq)
+            self._instrument.raw_module.execute()
+            duration_node = MODULE_DURATION_NODES.get(self._device_type.lower(), "")
+            duration = (
+                self._instrument.raw_module.getDouble(duration_node)
+                if duration_node
+                else 0.0
+            )
+        except Exception as error:
+            logger.error("%s", error)
+            return
+        logger.info("Module armed for %d steps", n_seq)
+        self._module_results = ModuleResults(n_seq, duration)
+
+    def _read_module_step(self, quant: Quantity, seq_no: int) -> t.Any:
+        """Read the result of a single step of an armed module.
+
+        Reads the module until the record of the step is available or the
+        module is finished. The read is aborted if no new record is received
+        within the timeout of the module results.
+
+        Args:
+            quant: Result quantity.
+            seq_no: Index of the step.
+
+        Returns:
+            Result of the step.
+        """
+        func_info = self._function_info["module_read"]
+        signal_paths = fnmatch.filter(
+            map(str, self._node_quant_map),
+            Path(func_info.get("signals", "/signal/*")).resolve(),
+        )
+        result_paths = fnmatch.filter(
+            map(str, self._node_quant_map),
+            Path(func_info.get("result", "/result/*")).resolve(),
+        )
+        signal = dict(zip(result_paths, signal_paths)).get(
+            str(self._quant_to_path(quant.name)), None
+        )
+        if signal is None:
+            return quant.getValue()
+        signal_value, option = self._raw_path_to_zi_node(
+            self.getValue(self._node_quant_map[Path(signal)]).lower()
+        )
+        results = self._module_results
+        deadline = time.monotonic() + results.timeout
+        while not results.timed_out and results.available(signal_value) <= seq_no:
+            available = results.available(signal_value)
+            finished = self._instrument.raw_module.finished()
+            results.update(self._instrument.raw_module.read(flat=True))
+            if finished or self.isStopped():
+                break
+            if results.available(signal_value) > available:
+                deadline = time.monotonic() + results.timeout
+            elif time.monotonic() > deadline:
+                results.timed_out = True
+                logger.error(
+                    "%s: module did not return a record within %.3fs",
+                    quant.name,
+                    results.timeout,
+                )
+                break
+            self.wait(0.01)
+        if seq_no + 1 >= results.n_seq:
+            self._module_results = None
+        record = results.get(signal_value, seq_no)
+        if record is None:
+            logger.error("%s: no result for step %d", quant.name, seq_no)
+            return np.array([])
+        signal_result = self._get_signal_result(record, option)
+        if signal_result is None:
+            logger.error(
+                "Valid signal for %s needed. Must be one of %s. \
+                    Use node/path::signal to specify a signal",
+                quant.name,
+                list(record.keys()),
+            )
+            return np.array([])
+        signal_result = signal_result[-1] if signal_result.ndim > 1 else signal_result
+        logger.info(
+            "%s: received %s (step %d)", quant.name, signal_result[-10:], seq_no
+        )
+        return signal_result
+
+    def _start_poller(self, poller_config: t.Dict[str, t.Dict[str, t.Any]]) -> None:
+        """Start the background poller for all matching read-only quantities.
+
+        The poller uses its own data server connection so that its
+        subscriptions do not interfere with the session of the driver.
+
+        Args:
+            poller_config: Poller configuration per quant pattern.
+        """
+        for name, quant in self.dQuantities.items():
+            if quant.set_cmd or not quant.get_cmd:
+                continue
+            config = matching_config(str(self._quant_to_path(name)), poller_config)
+            if config is not None:
+                node = f"/{self._instrument.serial}/{quant.get_cmd}".lower()
+                self._poller_quants[name] = (node, config)
+        if not self._poller_quants:
+            return
+        hf2 = self._instrument_settings["data_server"].get("hf2", False)
+        try:
+            connection = core.ziDAQServer(
+                self._session.daq_server.host,
+                self._session.daq_server.port,
+                1 if hf2 else 6,
+            )
+            self._poller = BackgroundPoller(connection)
+            for node, config in self._poller_quants.values():
+                self._poller.add(node, int(config.get("buffer_size", 0)))
+                logger.info("background poller subscribed to node %s", node)
+            self._poller.start()
+        except Exception as error:
+            logger.error("%s", error)
+            self._poller = None
+            self._poller_quants = {}
+
+    def _get_polled_value(self, quant: Quantity) -> t.Optional[NumpyArray]:
+        """Get the latest value of a quantity from the background poller.
+
+        Args:
+            quant: Labber quantity.
+
+        Returns:
+            Latest completed buffer or None if no data was received in time.
+        """
+        node, config = self._poller_quants[quant.name]
+        value = self._poller.get(
+            node,
+            fresh=config.get("fresh", False),
+            timeout=float(config.get("timeout", 1.0)),
+        )
+        if value is None:
+            logger.warning("%s: no data received from the poller", quant.name)
+            return None
+        logger.info("%s: get %s", quant.name, PayloadSummary(value))
+        return value
+
+    def _get_stream_value(self, quant: Quantity, kind: str) -> t.Any:
+        """Get a value of a streamed demodulator sample node.
+
+        The sample node is subscribed on the first read. Statistic and raw
+        vectors of an acquisition can each be read once, afterwards the next
+        read starts a new acquisition.
+
+        Args:
+            quant: Labber quantity.
+            kind: Kind of the stream value. (value, x, y, timestamp or a setting)
+
+        Returns:
+            Value of the quantity.
+        """
+        if (
+            kind not in ("value",) + SAMPLE_FIELDS
+            or self.dOp["operation"] == Interface.GET_CFG
+        ):
+            return quant.getValue()
+        demod_path = self._quant_to_path(quant.name).parent.parent
+        try:
+            stream = self._get_stream(demod_path)
+            if stream.needs_acquisition(kind):
+                self._acquire_stream(stream, demod_path)
+            samples = stream.read(kind)
+            if kind == "value":
+                statistic = self.getValue(
+                    self._path_to_quant(demod_path / "stream/statistic")
+                )
+                value = apply_statistic(samples, statistic)
+            else:
+                value = np.asarray(samples[kind], dtype=float)
+        except Exception as error:
+            logger.error("%s", error)
+            return quant.getValue()
+        logger.info("%s: get %s", quant.name, PayloadSummary(value))
+        return value
+
+    def _get_stream(self, demod_path: Path) -> DemodStream:
+        """Get the stream of a demodulator and subscribe it if necessary.
+
+        The streams use their own data server connection. Polling the shared
+        session would consume the samples of other drivers of the session.
+
+        Args:
+            demod_path: Path of the demodulator.
+
+        Returns:
+            Stream of the demodulator.
+        """
+        stream = self._streams.get(demod_path, None)
+        if stream is None:
+            node = f"/{self._instrument.serial}{demod_path.as_posix()}/sample"
+            stream = DemodStream(node.lower(), float(self._instrument.clockbase()))
+            if self._stream_connection is None:
+                hf2 = self._instrument_settings["data_server"].get("hf2", False)
+                self._stream_connection = core.ziDAQServer(
+                    self._session.daq_server.host,
+                    self._session.daq_server.port,
+                    1 if hf2 else 6,
+                )
+            self._stream_connection.subscribe(stream.path)
+            logger.info("subscribed to node %s", stream.path)
+            self._streams[demod_path] = stream
+        return stream
+
+    def _poll_streams(self, stream: DemodStream) -> None:
+        """Poll the subscribed nodes and update the buffer of a stream.
+
+        The samples of the other streams are discarded. An acquisition only
+        uses samples that are recorded after it started, so their buffers do
+        not grow while they are not read.
+
+        Args:
+            stream: Stream of the running acquisition.
+        """
+        result = self._stream_connection.poll(
+            POLL_TIME, int(POLL_TIME * 1000), flat=True
+        )
+        for path, sample in result.items():
+            if path.lower() == stream.path:
+                stream.buffer.append(sample)
+
+    def _acquire_stream(self, stream: DemodStream, demod_path: Path) -> None:
+        """Acquire new samples of a stream.
+
+        Samples that have been recorded before the acquisition are discarded.
+        The acquisition is finished as soon as the specified number of samples
+        or the time window is reached.
+
+        Args:
+            stream: Stream of the demodulator.
+            demod_path: Path of the demodulator.
+
+        Raises:
+            TimeoutError: If the samples are not received in time.
+        """
+        count = int(
+            self.getValue(self._path_to_quant(demod_path / "stream/samplecount"))
+        )
+        window = int(
+            float(self.getValue(self._path_to_quant(demod_path / "stream/window")))
+            * stream.clockbase
+        )
+        rate = 0.0
+        if count > 0:
+            rate = float(self._instrument[f"{demod_path.as_posix()[1:]}/rate"]())
+        timeout = stream.timeout(count, window, rate)
+        self._poll_streams(stream)
+        stream.buffer.clear()
+        deadline = time.monotonic() + timeout
+        while not stream.is_complete(count, window):
+            if self.isStopped():
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"{stream.path}: Only {len(stream.buffer)} samples received "
+                    f"within {timeout:.3f}s."
+                )
+            self._poll_streams(stream)
+        stream.finish_acquisition(count, window)
+
+    def _set_hardware_loop_value(
+        self, quant: Quantity, value: t.Any, kind: str, options: t.Dict
+    ) -> t.Any:
+        """Set a value of a hardware loop.
+
+        Within a hardware loop the values of each step are only collected and
+        uploaded when the instrument is armed. Outside of a hardware loop the
+        value is used for all steps. A value that is set individually is
+        uploaded directly. Values of a set config are only uploaded (after the
+        transaction) if a previously set value changed. Only the command
+        tables of the affected AWG cores are uploaded. (The values of the set
+        config on load therefore do not overwrite a command table uploaded by
+        the user.)
+
+        Args:
+            quant: Quantity that should be set.
+            value: Value to be set.
+            kind: Kind of the hardware loop value.
+            options: Additional information provided by Labber.
+
+        Returns:
+            Value that was set.
+        """
+        if kind not in COMMAND_TABLE_KINDS:
+            return value
+        awg = "/".join(self._quant_to_path(quant.name).parent.parent.parts[1:])
+        if self.isHardwareLoop(options):
+            seq_no, n_seq = self.getHardwareLoopIndex(options)
+            self._hardware_loop.set_step(awg, kind, value, seq_no, n_seq)
+            logger.info("%s: set %s (step %d/%d)", quant.name, value, seq_no, n_seq)
+            return value
+        changed = self._hardware_loop.set_static(awg, kind, value)
+        logger.info("%s: set %s", quant.name, value)
+        if "call_no" in options:
+            self._command_tables_changed |= changed
+            return value
+        self._hardware_loop.mark_pending(awg)
+        if not self._hardware_loop.has_steps:
+            self._upload_command_tables()
+        return value
+
+    def _upload_command_tables(self) -> None:
+        """Upload the command tables of the hardware loop."""
+        command_tables = self._hardware_loop.command_tables(self._device_type)
+        self._hardware_loop.uploaded()
+        self._command_tables_changed = False
+        for awg, command_table in command_tables.items():
+            logger.info(
+                "%s: upload command table with %d entries",
+                awg,
+                len(command_table["table"]),
+            )
+            try:
+                self._instrument[awg].commandtable.upload_to_device(
+                    command_table, validate=True
+                )
+            except Exception as error:
+                logger.error("%s", error)
+
+    def _arm_hardware_loop(self, options: t.Dict) -> None:
+        """Upload all values of the hardware loop.
+
+        Uploads the command tables and writes the number of steps into the
+        user registers specified by the ``count_register`` quantities.
+
+        Args:
+            options: Additional information provided by Labber.
+        """
+        n_seq = self._hardware_loop.n_seq
+        if self.isHardwareLoop(options):
+            _, n_seq = self.getHardwareLoopIndex(options)
+        if not n_seq:
+            return
+        if self._hardware_loop.is_pending:
+            self._upload_command_tables()
+            self._hardware_loop.reset_steps()
+        for path in fnmatch.filter(
+            map(str, self._node_quant_map), "*/hardware_loop/count_register"
+        ):
+            register = int(self.getValue(self._node_quant_map[Path(path)]))
+            if register < 0:
+                continue
+            awg = "/".join(Path(path).parent.parent.parts[1:])
+            logger.info("%s: set user register %d to %d", awg, register, n_seq)
+            try:
+                self._instrument[awg].userregs[register](n_seq)
+            except Exception as error:
+                logger.error("%s", error)
 
     def _parse_value(self, quant: Quantity, value: t.Any) -> t.Any:
         """Parse the value received from toolkit for a node.
@@ -279,6 +970,11 @@ class BaseDevice(LabberDriver):
         Returns:
             parsed value
         """
+        # Vectors keep their native dtype and are not copied
+        if quant.datatype in [quant.VECTOR, quant.VECTOR_COMPLEX]:
+            value = extract_vector(value)
+            if not isinstance(value, dict):
+                return to_labber_vector(value)
         if isinstance(value, dict):
             if "x" in value and "y" in value:
                 return complex(value["x"], value["y"])
@@ -298,6 +994,8 @@ class BaseDevice(LabberDriver):
 
         One single session to each data server is reused per default in Labber.
         The "shared_session" option in the settings can disable this behavior.
+        If a broker is specified in the settings the session uses the broker
+        connection, which is shared across all Labber driver processes.
 
         Args:
             data_server_info: settings info for the Data Server.
@@ -317,15 +1015,75 @@ class BaseDevice(LabberDriver):
             if len(split_raw_server) > 1:
                 target_port = int(split_raw_server[1])
         logger.info("Data Server Session %s:%s", target_host, target_port)
+        # Recording and replaying sessions are never shared
+        replay_path = self._instrument_settings.get("replay_path", None)
+        if replay_path:
+            logger.info("Replay trace %s", replay_path)
+            return Session(
+                target_host,
+                target_port,
+                connection=ReplayConnection.from_file(replay_path),
+            )
+        record_path = self._instrument_settings.get("record_path", None)
+        if record_path:
+            return self._get_recording_session(
+                record_path, data_server_info, target_host, target_port, target_hf2
+            )
         if data_server_info.get("shared_session", True):
             for (host, port), session in created_sessions.items():
                 if target_host == host and target_port == port:
                     return session
-        new_session = Session(target_host, target_port, hf2=target_hf2)
+        if "broker" in data_server_info:
+            connection = connect_broker(
+                data_server_info["broker"], target_host, target_port, target_hf2
+            )
+            new_session = Session(
+                target_host, target_port, hf2=target_hf2, connection=connection
+            )
+        else:
+            new_session = Session(target_host, target_port, hf2=target_hf2)
         check_compatibility(new_session)
         created_sessions[(target_host, target_port)] = new_session
         return new_session
 
+    def _get_recording_session(
+        self,
+        record_path: str,
+        data_server_info: t.Dict[str, t.Any],
+        host: str,
+        port: int,
+        hf2: bool,
+    ) -> Session:
+        """Return a private Session that records all requests into a trace.
+
+        Args:
+            record_path: Path of the trace file.
+            data_server_info: settings info for the Data Server.
+            host: Address of the data server.
+            port: Port of the data server.
+            hf2: Flag if the data server is for hf2 device.
+
+        Returns:
+            Valid toolkit Session object.
+        """
+        logger.info("Record trace %s", record_path)
+        if "broker" in data_server_info:
+            connection = connect_broker(data_server_info["broker"], host, port, hf2)
+        else:
+            connection = core.ziDAQServer(host, port, 1 if hf2 else 6)
+        if self._recorder is not None:
+            self._recorder.close()
+        self._recorder = TraceWriter(record_path)
+        self._recorder.write(TraceRecord("session", "session", (host, port, hf2), {}))
+        new_session = Session(
+            host,
+            port,
+            hf2=hf2,
+            connection=RecordingConnection(connection, self._recorder),
+        )
+        check_compatibility(new_session)
+        return new_session
+
     def _create_instrument(
         self, instrument_info: t.Dict[str, t.Any]
     ) -> t.Union[Session, DeviceType, ModuleType]:
@@ -356,7 +1114,7 @@ class BaseDevice(LabberDriver):
                 module = instrument_info["type"].lower()
                 module = module if module == "shfqa_sweeper" else f"{module}_module"
                 module = getattr(self._session.modules, f"create_{module}")()
-                self._session.connect_device(self.comCfg.getAddressString())
+                self._connect_device(self.comCfg.getAddressString())
                 module.device(self.comCfg.getAddressString())
                 return module
             except KeyError as error:
@@ -370,7 +1128,26 @@ class BaseDevice(LabberDriver):
                     " does not exist in toolkit."
                 ) from error
         logger.info("Created Instrument for Device %s", self.comCfg.getAddressString())
-        return self._session.connect_device(self.comCfg.getAddressString())
+        return self._connect_device(self.comCfg.getAddressString())
+
+    def _connect_device(self, serial: str) -> DeviceType:
+        """Connect a device.
+
+        Uses the prefetched device if the device is part of the prefetch list
+        of the session.
+
+        Args:
+            serial: Serial of the device.
+
+        Returns:
+            toolkit device object.
+        """
+        try:
+            device = prefetched_device(self._session, serial)
+        except Exception as error:
+            logger.error("%s: prefetch failed: %s", serial, error)
+            device = None
+        return device if device is not None else self._session.connect_device(serial)
 
     def _quant_to_path(self, quant_name: str) -> Path:
         """Convert Quantity name into its path representation
@@ -411,10 +1188,10 @@ class BaseDevice(LabberDriver):
             else self._quant_to_path(quant_name)
         )
         node_path = "/" + "/".join(node_path.parts[1:]).lower()
-        for parent_node, node_info in self._node_info.items():
-            if fnmatch.fnmatch(node_path, parent_node):
-                return node_info.get("driver", {})
-        return {}
+        if self._quant_info is not None:
+            return self._quant_info.get(node_path, {})
+        match = match_driver_info(self._node_info, node_path)
+        return {} if match is None else match[1]
 
     def _set_value_toolkit(
         self,
@@ -435,25 +1212,72 @@ class BaseDevice(LabberDriver):
                 on the device.
         """
         try:
-            # get enumerated value if there is one
-            if quant.cmd_def:
-                value = int(quant.cmd_def[quant.combo_defs.index(value)])
-            # VECTOR datatype value can also be a dictionary, where the value of the quant is "y" key.
-            if quant.datatype == 4:  # VECTOR enum value
-                if isinstance(value, dict):
-                    for vector_key in self._instrument_settings.get(
-                        "vector_quantity_value_map_array_keys", ["y"]
-                    ):
-                        if vector_key in value:
-                            value = value[vector_key]
-                            break
-            logger.info("%s: set %s", quant.name, value)
+            value = self._to_node_value(quant, value)
+            logger.info("%s: set %s", quant.name, PayloadSummary(value))
             self._instrument[quant.set_cmd](value)
             if wait_for and not self._transaction.is_running():
                 self._instrument[quant.set_cmd].wait_for_state_change(value)
         except Exception as error:
             logger.error("%s", error)
 
+    def _write_stale_values(self) -> None:
+        """Finish the set config and write the values that changed meanwhile.
+
+        Nodes that were skipped can be changed by the side effects of other
+        nodes of the set config (see `SetConfigPlanner.finish`).
+        """
+        try:
+            stale = self._config_planner.finish()
+        except Exception as error:
+            logger.error("Error during reading the skipped nodes: %s", error)
+            return
+        for path, value in stale.items():
+            logger.info("%s: changed by the set config, write %s", path, value)
+            try:
+                self._instrument[path](value)
+            except Exception as error:
+                logger.error("%s", error)
+
+    def _needs_write(self, quant: Quantity, value: t.Any) -> bool:
+        """Check if a value differs from the set config snapshot.
+
+        Args:
+            quant: Quant of the node.
+            value: Labber value.
+
+        Returns:
+            Flag if the node needs to be written.
+        """
+        try:
+            node_value = self._to_node_value(quant, value)
+        except Exception:
+            # invalid values are reported by the write
+            return True
+        return self._config_planner.needs_write(quant.set_cmd, node_value)
+
+    def _to_node_value(self, quant: Quantity, value: t.Any) -> t.Any:
+        """Convert a Labber value into the value of the node.
+
+        Args:
+            quant: Quant of the node.
+            value: Labber value.
+
+        Returns:
+            Value of the node.
+        """
+        # get enumerated value if there is one
+        if quant.cmd_def:
+            value = int(quant.cmd_def[quant.combo_defs.index(value)])
+        # VECTOR datatype value can also be a dictionary, where the value of the quant is "y" key.
+        if quant.datatype in [4, 6]:  # VECTOR and VECTOR_COMPLEX enum value
+            value = extract_vector(
+                value,
+                self._instrument_settings.get(
+                    "vector_quantity_value_map_array_keys", ["y"]
+                ),
+            )
+        return value
+
     @staticmethod
     def _csv_row_to_vector(csv_row: t.List[str]) -> t.Optional[NumpyArray]:
         """Convert a csv row into a numpy array.
@@ -554,24 +1378,70 @@ class BaseDevice(LabberDriver):
                 return np.array([], dtype=complex), call_empty
         return quant_value, call_empty
 
+    def _get_function_path(self, quant_name: str, node_info: t.Dict) -> Path:
+        """Get the resolved function path of a quantity.
+
+        The path only depends on the quantity and is therefore cached.
+
+        Args:
+            quant_name: Name of the quantity.
+            node_info: Node info of the quantity.
+
+        Returns:
+            Resolved path of the function.
+        """
+        function_path = self._function_paths.get(quant_name, None)
+        if function_path is None:
+            function_path = (
+                self._quant_to_path(quant_name) / node_info.get("function_path", ".")
+            ).resolve()
+            self._function_paths[quant_name] = function_path
+        return function_path
+
     def _get_toolkit_function(self, path_list: t.List[str]) -> t.Callable:
         """Convert a function path into a toolkit function object.
 
+        The function objects are cached per path until the instrument is
+        opened again.
+
         Args:
             path: Path of the function.
 
         Returns:
             toolkit function object.
         """
-        # get function object
-        function = self._instrument
-        for name in path_list:
-            if name.isnumeric():
-                function = function[int(name)]
-            else:
-                function = getattr(function, name.lower())
+        key = tuple(path_list)
+        function = self._toolkit_functions.get(key, None)
+        if function is None:
+            # get function object
+            function = self._instrument
+            for name in path_list:
+                if name.isnumeric():
+                    function = function[int(name)]
+                else:
+                    function = getattr(function, name.lower())
+            self._toolkit_functions[key] = function
         return function
 
+    def _resolve_toolkit_functions(self) -> None:
+        """Resolve the toolkit functions of all function quantities.
+
+        Resets the cache of the toolkit function objects, since they belong to
+        the previous instrument, and resolves all toolkit functions upfront.
+        """
+        self._toolkit_functions = {}
+        for quant_name in self.dQuantities:
+            node_info = self._get_node_info(quant_name)
+            # only user facing functions have arguments, the module functions
+            # are resolved internally
+            if "Args" not in self._function_info.get(node_info.get("function"), {}):
+                continue
+            function_path = self._get_function_path(quant_name, node_info)
+            try:
+                self._get_toolkit_function(function_path.parts[1:])
+            except Exception as error:
+                logger.debug("%s: %s", quant_name, error)
+
     def call_function(self, name: str, path: Path) -> None:
         """Call an process a function.
 
@@ -701,7 +1571,7 @@ class BaseDevice(LabberDriver):
             signals: Wildcard path for all result array quantities.
         """
         poll_result = self._instrument.raw_module.read(flat=True)
-        logger.debug("Get module results: %s", poll_result)
+        logger.debug("Get module results: %s", PayloadSummary(poll_result))
         if poll_result:
             # Loop through all signals and update values if they are available
             signal_paths = fnmatch.filter(
@@ -772,11 +1642,14 @@ class BaseDevice(LabberDriver):
             value = not self._instrument.raw_module.finished()
             self.setValue("Enable", value)
             logger.info("Enable: get %s", value)
+        elif enable and self._module_results is not None:
+            logger.info("Enable: module already armed")
         elif enable:
             logger.info("Enable: set 1")
             self._instrument.raw_module.execute()
         else:
             logger.info("Enable: set 0")
+            self._module_results = None
             self._instrument.raw_module.finish()
 
     def _call_toolkit_function(self, path: Path, func_info: t.Dict) -> None:
@@ -824,22 +1697,26 @@ class BaseDevice(LabberDriver):
 
         function = self._get_toolkit_function(path.parts[1:])
 
-        logger.info("%s: call with %s", self._path_to_quant(path), kwargs)
+        logger.info(
+            "%s: call with %s", self._path_to_quant(path), PayloadSummary(kwargs)
+        )
         try:
             return_values = function(**kwargs)
         except Exception as error:
             logger.error("%s", error)
             return
         logger.info(
-            "%s: returned %s", self._path_to_quant(path), str(return_values)[-10:]
+            "%s: returned %s",
+            self._path_to_quant(path),
+            PayloadSummary(return_values),
         )
 
         for relative_quant_name in func_info.get("Returns"):
             quant_path = (path / relative_quant_name).resolve()
             quant_name = self._path_to_quant(quant_path)
-            info = self._get_node_info(quant_path).get("return_value", "")
+            accessor = self._get_node_info(quant_path).get("return_value", Accessor(""))
             try:
-                value = eval("return_values" + info)
+                value = accessor(return_values)
             except Exception as error:
                 logger.error("%s", error)
                 value = self.getValue(quant_name)
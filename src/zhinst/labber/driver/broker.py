@@ -0,0 +1,604 @@
+"""Local broker that shares data server connections between driver processes.
+
+Labber runs every instrument driver in its own process. Without the broker each
+of them opens its own session to the data server, downloads its own node trees
+and polls independently. The broker keeps a single connection per data server
+and serves all driver processes on the same computer through a local socket.
+
+The broker transfers pickled objects. Clients are authenticated with a key.
+Unless a key is specified explicitly, a random key is generated once and
+stored in a file that is only readable by the current user.
+"""
+import collections
+import fnmatch
+import functools
+import ipaddress
+import itertools
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+import typing as t
+from concurrent.futures import Future
+from multiprocessing.managers import BaseManager
+from pathlib import Path
+
+import numpy as np
+from zhinst import core
+
+DEFAULT_PORT = 8020
+# Maximum number of poll results buffered per client and node
+MAX_BUFFERED_POLLS = 100
+# File with the authentication key that is used if none is specified
+AUTHKEY_FILE = Path.home() / ".zhinst-labber" / "broker_authkey"
+
+# ziDAQServer functions that are served by the broker through ``call``.
+_GET_FUNCTIONS = (
+    "getInt",
+    "getDouble",
+    "getString",
+    "getComplex",
+    "getSample",
+    "getDIO",
+    "listNodes",
+)
+_SET_FUNCTIONS = (
+    "set",
+    "setVector",
+    "setInt",
+    "setDouble",
+    "setString",
+    "setComplex",
+    "syncSetInt",
+    "syncSetDouble",
+    "syncSetString",
+    "sync",
+    "connectDevice",
+    "disconnectDevice",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def broker_authkey(authkey: t.Optional[str] = None) -> bytes:
+    """Authentication key of the broker.
+
+    If no key is specified the key is read from ``AUTHKEY_FILE``. The file is
+    created with a random key on first use and is only accessible by the
+    current user.
+
+    Args:
+        authkey: Explicit authentication key.
+
+    Returns:
+        Authentication key.
+    """
+    if authkey:
+        return authkey.encode()
+    try:
+        return AUTHKEY_FILE.read_text().strip().encode()
+    except FileNotFoundError:
+        pass
+    AUTHKEY_FILE.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    key = secrets.token_hex(32)
+    try:
+        fd = os.open(AUTHKEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # created by another process in the meantime
+        return AUTHKEY_FILE.read_text().strip().encode()
+    with os.fdopen(fd, "w") as file:
+        file.write(key)
+    logger.info("Created broker authentication key %s", AUTHKEY_FILE)
+    return key.encode()
+
+
+def is_loopback(host: str) -> bool:
+    """Check if an address only accepts connections from the local computer.
+
+    Args:
+        host: Host name or IP address.
+
+    Returns:
+        Flag if the address is a loopback address.
+    """
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def _request_key(name: str, args: t.Tuple, kwargs: t.Dict) -> str:
+    """Hashable key that identifies a request."""
+    return repr((name, args, sorted(kwargs.items())))
+
+
+def _merge_chunks(chunks: t.List[t.Any]) -> t.Any:
+    """Merge multiple poll results of the same node into a single one.
+
+    Array entries are concatenated, all other entries use the latest value.
+
+    Args:
+        chunks: Poll results in chronological order.
+
+    Returns:
+        Merged poll result.
+    """
+    if len(chunks) == 1 or not all(isinstance(chunk, dict) for chunk in chunks):
+        return chunks[-1]
+    merged = {}
+    for key, value in chunks[-1].items():
+        values = [chunk[key] for chunk in chunks if key in chunk]
+        if all(isinstance(v, np.ndarray) and v.ndim > 0 for v in values):
+            merged[key] = np.concatenate(values)
+        else:
+            merged[key] = value
+    return merged
+
+
+class SharedConnection:
+    """Single connection to a data server that is shared by all broker clients.
+
+    * Identical requests that are issued at the same time by different clients
+      are coalesced into a single request to the data server.
+    * Node trees (``listNodesJSON``) are only downloaded once.
+    * Wildcard gets (snapshots) are reused for ``snapshot_ttl`` seconds unless
+      a value is set in between.
+    * Subscriptions are reference counted and polled data is fanned out to
+      every client that subscribed to the node. Each client buffers at most
+      ``max_buffered_polls`` chunks per node, older chunks are dropped.
+
+    Since ``ziDAQServer`` is not thread safe all requests to the data server
+    are serialized. Subscriptions and polls use a separate connection with its
+    own lock, so that a running poll does not block the other requests.
+
+    Args:
+        host: Address of the data server.
+        port: Port of the data server.
+        api_level: API level of the connection.
+        snapshot_ttl: Time in seconds a wildcard get is reused.
+        max_buffered_polls: Maximum number of poll results that are buffered
+            per client and node.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        api_level: int,
+        snapshot_ttl: float,
+        max_buffered_polls: int = MAX_BUFFERED_POLLS,
+    ):
+        self._daq_server = core.ziDAQServer(host, port, api_level)
+        self._lock = threading.RLock()
+        self._poll_server: t.Optional[core.ziDAQServer] = None
+        self._poll_lock = threading.RLock()
+        self._api_level = api_level
+        self._max_buffered_polls = max_buffered_polls
+        self._pending_lock = threading.Lock()
+        self._pending: t.Dict[str, Future] = {}
+        self._node_docs: t.Dict[str, str] = {}
+        self._snapshots: t.Dict[str, t.Tuple[float, t.Any]] = {}
+        self._snapshot_ttl = snapshot_ttl
+        self._subscriptions: t.Dict[str, t.Set[int]] = {}
+        self._buffers: t.Dict[int, t.Dict[str, t.Deque[t.Any]]] = {}
+        self._overflowed: t.Set[int] = set()
+        self.host = host
+        self.port = port
+
+    def _call(self, name: str, *args, **kwargs) -> t.Any:
+        """Call a function of the underlying connection."""
+        with self._lock:
+            return getattr(self._daq_server, name)(*args, **kwargs)
+
+    def _poll_connection(self) -> core.ziDAQServer:
+        """Connection for subscriptions and polls. (poll lock must be held)"""
+        if self._poll_server is None:
+            self._poll_server = core.ziDAQServer(self.host, self.port, self._api_level)
+        return self._poll_server
+
+    def _coalesced(self, key: str, function: t.Callable[[], t.Any]) -> t.Any:
+        """Execute a request or wait for the identical one that is running.
+
+        Args:
+            key: Key that identifies the request.
+            function: Function that executes the request.
+
+        Returns:
+            Result of the request.
+        """
+        with self._pending_lock:
+            pending = self._pending.get(key)
+            is_owner = pending is None
+            if is_owner:
+                pending = self._pending[key] = Future()
+        if not is_owner:
+            return pending.result()
+        try:
+            result = function()
+        except Exception as error:
+            pending.set_exception(error)
+            raise
+        else:
+            pending.set_result(result)
+            return result
+        finally:
+            with self._pending_lock:
+                del self._pending[key]
+
+    def list_nodes_json(self, *args, **kwargs) -> str:
+        """Node documentation of the data server. (cached)"""
+        key = _request_key("listNodesJSON", args, kwargs)
+        if key not in self._node_docs:
+            self._node_docs[key] = self._coalesced(
+                key, lambda: self._call("listNodesJSON", *args, **kwargs)
+            )
+        return self._node_docs[key]
+
+    def get(self, name: str, *args, **kwargs) -> t.Any:
+        """Get function of the underlying connection.
+
+        Identical requests are coalesced and wildcard gets are reused for
+        ``snapshot_ttl`` seconds.
+
+        Args:
+            name: Name of the get function.
+        """
+        key = _request_key(name, args, kwargs)
+        is_snapshot = name == "get" and args and "*" in str(args[0])
+        if is_snapshot:
+            timestamp, value = self._snapshots.get(key, (None, None))
+            if timestamp is not None and time.monotonic() - timestamp < (
+                self._snapshot_ttl
+            ):
+                return value
+        value = self._coalesced(key, lambda: self._call(name, *args, **kwargs))
+        if is_snapshot:
+            self._snapshots[key] = (time.monotonic(), value)
+        return value
+
+    def set(self, name: str, *args, **kwargs) -> t.Any:
+        """Set function of the underlying connection.
+
+        Invalidates all cached snapshots (and node trees if the connected
+        devices change).
+
+        Args:
+            name: Name of the set function.
+        """
+        self._snapshots.clear()
+        if name in ["connectDevice", "disconnectDevice"]:
+            self._node_docs.clear()
+        return self._call(name, *args, **kwargs)
+
+    def get_as_event(self, path: str) -> None:
+        """Trigger an event for the node in all subscribed clients."""
+        with self._poll_lock:
+            self._poll_connection().getAsEvent(path)
+
+    def subscribe(self, client_id: int, path: str) -> None:
+        """Subscribe a client to a node.
+
+        The data server subscription is only done for the first client.
+
+        Args:
+            client_id: Id of the client.
+            path: Path of the node.
+        """
+        path = path.lower()
+        with self._poll_lock:
+            subscribers = self._subscriptions.setdefault(path, set())
+            if not subscribers:
+                self._poll_connection().subscribe(path)
+            subscribers.add(client_id)
+            self._buffers.setdefault(client_id, {})
+
+    def unsubscribe(self, client_id: int, path: str) -> None:
+        """Unsubscribe a client from all nodes matching a path.
+
+        The data server subscription is only removed with the last client.
+
+        Args:
+            client_id: Id of the client.
+            path: Path of the node(s) (wildcards are supported).
+        """
+        path = path.lower()
+        with self._poll_lock:
+            for sub_path in fnmatch.filter(list(self._subscriptions), path):
+                subscribers = self._subscriptions[sub_path]
+                subscribers.discard(client_id)
+                if not subscribers:
+                    self._poll_connection().unsubscribe(sub_path)
+                    del self._subscriptions[sub_path]
+
+    def poll(
+        self, client_id: int, recording_time: float, timeout: int, **kwargs
+    ) -> t.Dict[str, t.Any]:
+        """Poll the subscribed data for a client.
+
+        The data returned by the data server is distributed to all clients that
+        subscribed to it. The result contains the data of the client from this
+        and all previous polls of other clients since its last poll. Only
+        other polls wait for a running poll.
+
+        Args:
+            client_id: Id of the client.
+            recording_time: Recording time in seconds.
+            timeout: Timeout in milliseconds.
+
+        Returns:
+            Flat poll result of the client.
+        """
+        kwargs["flat"] = True
+        with self._poll_lock:
+            result = self._poll_connection().poll(recording_time, timeout, **kwargs)
+            for path, value in result.items():
+                path_lower = path.lower()
+                for sub_path, subscribers in self._subscriptions.items():
+                    if path_lower.startswith(sub_path + "/") or fnmatch.fnmatch(
+                        path_lower, sub_path
+                    ):
+                        for subscriber in subscribers:
+                            self._buffer(subscriber, path, value)
+            client_data = self._buffers.get(client_id, {})
+            self._buffers[client_id] = {}
+            self._overflowed.discard(client_id)
+        return {
+            path: _merge_chunks(list(chunks)) for path, chunks in client_data.items()
+        }
+
+    def _buffer(self, client_id: int, path: str, value: t.Any) -> None:
+        """Buffer a poll result for a client. (poll lock must be held)
+
+        Drops the oldest chunk if the buffer of the node is full.
+        """
+        chunks = self._buffers[client_id].get(path)
+        if chunks is None:
+            chunks = self._buffers[client_id][path] = collections.deque(
+                maxlen=self._max_buffered_polls
+            )
+        if len(chunks) == chunks.maxlen and client_id not in self._overflowed:
+            self._overflowed.add(client_id)
+            logger.warning(
+                "Client %d does not poll its subscribed data. Older data is "
+                "dropped.",
+                client_id,
+            )
+        chunks.append(value)
+
+    def release(self, client_id: int) -> None:
+        """Remove all subscriptions and buffered data of a client.
+
+        Args:
+            client_id: Id of the client.
+        """
+        self.unsubscribe(client_id, "*")
+        with self._poll_lock:
+            self._buffers.pop(client_id, None)
+            self._overflowed.discard(client_id)
+
+
+class ClientConnection:
+    """Broker side representation of a single client connection.
+
+    Each driver process gets its own instance. All instances for the same
+    data server share the same ``SharedConnection``.
+
+    Args:
+        shared: Shared connection to the data server.
+    """
+
+    EXPOSED = (
+        "call",
+        "get",
+        "listNodesJSON",
+        "getAsEvent",
+        "subscribe",
+        "unsubscribe",
+        "poll",
+    )
+    _ids = itertools.count()
+
+    def __init__(self, shared: SharedConnection):
+        self._shared = shared
+        self._id = next(self._ids)
+
+    def __del__(self):
+        self._shared.release(self._id)
+
+    def call(self, name: str, *args, **kwargs) -> t.Any:
+        """Call a function of the shared connection.
+
+        Args:
+            name: Name of the ``ziDAQServer`` function.
+
+        Raises:
+            AttributeError: If the function is not served by the broker.
+        """
+        if name in _GET_FUNCTIONS:
+            return self._shared.get(name, *args, **kwargs)
+        if name in _SET_FUNCTIONS:
+            return self._shared.set(name, *args, **kwargs)
+        raise AttributeError(f"{name} is not served by the broker.")
+
+    def get(self, *args, **kwargs) -> t.Any:
+        return self._shared.get("get", *args, **kwargs)
+
+    def listNodesJSON(self, *args, **kwargs) -> str:
+        return self._shared.list_nodes_json(*args, **kwargs)
+
+    def getAsEvent(self, path: str) -> None:
+        self._shared.get_as_event(path)
+
+    def subscribe(self, path: str) -> None:
+        self._shared.subscribe(self._id, path)
+
+    def unsubscribe(self, path: str) -> None:
+        self._shared.unsubscribe(self._id, path)
+
+    def poll(self, recording_time: float, timeout: int, **kwargs) -> t.Dict:
+        return self._shared.poll(self._id, recording_time, timeout, **kwargs)
+
+
+class Broker:
+    """Broker that manages one shared connection per data server.
+
+    Args:
+        snapshot_ttl: Time in seconds a wildcard get is reused.
+    """
+
+    def __init__(self, snapshot_ttl: float = 1.0):
+        self._snapshot_ttl = snapshot_ttl
+        self._connections: t.Dict[t.Tuple[str, int, int], SharedConnection] = {}
+        self._lock = threading.Lock()
+
+    def connection(self, host: str, port: int, api_level: int) -> ClientConnection:
+        """Create a new client connection to a data server.
+
+        Args:
+            host: Address of the data server.
+            port: Port of the data server.
+            api_level: API level of the connection.
+
+        Returns:
+            Client connection.
+        """
+        with self._lock:
+            key = (host, port, api_level)
+            if key not in self._connections:
+                logger.info("Data Server Session %s:%s", host, port)
+                self._connections[key] = SharedConnection(
+                    host, port, api_level, self._snapshot_ttl
+                )
+            return ClientConnection(self._connections[key])
+
+
+class _BrokerServerManager(BaseManager):
+    """Manager that serves the broker."""
+
+
+class _BrokerClientManager(BaseManager):
+    """Manager that connects to a running broker."""
+
+
+_BrokerClientManager.register("connection")
+
+
+class BrokerConnection:
+    """Connection to a data server through the broker.
+
+    Mimics the ``ziDAQServer`` interface so that it can be passed as connection
+    to a toolkit ``Session``. Functionality that can not be shared between
+    processes (e.g. LabOne modules) is served by a lazily created direct
+    connection to the data server.
+
+    Args:
+        proxy: Proxy of the client connection inside the broker.
+        host: Address of the data server.
+        port: Port of the data server.
+        api_level: API level of the connection.
+    """
+
+    def __init__(self, proxy: t.Any, host: str, port: int, api_level: int):
+        self._proxy = proxy
+        self._direct = None
+        self.host = host
+        self.port = port
+        self._api_level = api_level
+
+    def get(self, *args, **kwargs) -> t.Any:
+        return self._proxy.get(*args, **kwargs)
+
+    def listNodesJSON(self, *args, **kwargs) -> str:
+        return self._proxy.listNodesJSON(*args, **kwargs)
+
+    def getAsEvent(self, path: str) -> None:
+        self._proxy.getAsEvent(path)
+
+    def subscribe(self, path: str) -> None:
+        self._proxy.subscribe(path)
+
+    def unsubscribe(self, path: str) -> None:
+        self._proxy.unsubscribe(path)
+
+    def poll(self, recording_time: float, timeout: int, **kwargs) -> t.Dict:
+        return self._proxy.poll(recording_time, timeout, **kwargs)
+
+    def __getattr__(self, name: str) -> t.Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in _GET_FUNCTIONS or name in _SET_FUNCTIONS:
+            return functools.partial(self._proxy.call, name)
+        if self._direct is None:
+            logger.info(
+                "%s is not served by the broker. Open direct connection.", name
+            )
+            self._direct = core.ziDAQServer(self.host, self.port, self._api_level)
+        return getattr(self._direct, name)
+
+
+def connect_broker(
+    broker_info: t.Dict[str, t.Any], server_host: str, server_port: int, hf2: bool
+) -> BrokerConnection:
+    """Connect to a data server through a running broker.
+
+    Args:
+        broker_info: Settings info for the broker.
+            * host: Address of the broker. (default = "localhost")
+            * port: Port of the broker. (default = 8020)
+            * authkey: Authentication key of the broker. (default = key
+                stored in ``AUTHKEY_FILE``)
+        server_host: Address of the data server.
+        server_port: Port of the data server.
+        hf2: Flag if the data server is for hf2 device.
+
+    Returns:
+        Connection to the data server.
+    """
+    manager = _BrokerClientManager(
+        address=(
+            broker_info.get("host", "localhost"),
+            broker_info.get("port", DEFAULT_PORT),
+        ),
+        authkey=broker_authkey(broker_info.get("authkey", None)),
+    )
+    manager.connect()
+    api_level = 1 if hf2 else 6
+    proxy = manager.connection(server_host, server_port, api_level)
+    logger.info("Connected to broker %s", manager.address)
+    return BrokerConnection(proxy, server_host, server_port, api_level)
+
+
+def serve(
+    host: str = "localhost",
+    port: int = DEFAULT_PORT,
+    authkey: t.Optional[str] = None,
+    snapshot_ttl: float = 1.0,
+) -> None:
+    """Run the broker until the process is terminated.
+
+    Args:
+        host: Address the broker listens on.
+        port: Port the broker listens on.
+        authkey: Authentication key clients need to connect. (default = key
+            stored in ``AUTHKEY_FILE``)
+        snapshot_ttl: Time in seconds a wildcard get is reused.
+
+    Raises:
+        ValueError: If the broker listens on a non-loopback address without
+            an explicit authentication key.
+    """
+    if not authkey and not is_loopback(host):
+        raise ValueError(
+            f"Listening on {host} requires an explicit authentication key."
+        )
+    broker = Broker(snapshot_ttl)
+    _BrokerServerManager.register(
+        "connection", callable=broker.connection, exposed=ClientConnection.EXPOSED
+    )
+    manager = _BrokerServerManager(
+        address=(host, port), authkey=broker_authkey(authkey)
+    )
+    server = manager.get_server()
+    server.serve_forever()
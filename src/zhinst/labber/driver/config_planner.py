@@ -0,0 +1,171 @@
+"""Planner for the Labber set config operation.
+
+During a set config operation Labber sends the value of every quantity. The
+planner compares these values against a single snapshot of the instrument
+that is taken at the first call and only lets the nodes through that differ
+from the current state. Re-applying a configuration that the instrument
+already holds therefore only costs a single get.
+
+A write can change other nodes of the same node group (e.g. a range change
+rescales the other settings of the input). Once a node of a group is written,
+the snapshot values of that group are no longer trusted: later nodes of the
+group are written unconditionally and the nodes of the group that were
+skipped before are read again after the transaction.
+"""
+
+import logging
+import typing as t
+
+import numpy as np
+
+from zhinst.labber.driver.snapshot_manager import SnapshotManager
+from zhinst.labber.driver.vectors import extract_vector
+
+logger = logging.getLogger(__name__)
+
+# Relative tolerance for the comparison of floating point values. Covers the
+# rounding of nodes that are stored in single precision.
+FLOAT_TOLERANCE = 1e-7
+
+
+def _is_float(value: t.Any) -> bool:
+    """Flag if a value or array holds floating point or complex numbers."""
+    return np.issubdtype(np.asarray(value).dtype, np.inexact)
+
+
+def node_group(path: str) -> str:
+    """Node group of a node path, i.e. its parent path.
+
+    Args:
+        path: Path of the node (e.g. sigins/0/range).
+
+    Returns:
+        Lowercase path of the group (e.g. sigins/0).
+    """
+    return path.strip("/").lower().rsplit("/", 1)[0]
+
+
+def values_equal(current: t.Any, target: t.Any) -> bool:
+    """Compare the value of a node with a target value.
+
+    Floating point values are compared with the relative tolerance
+    ``FLOAT_TOLERANCE``.
+
+    Args:
+        current: Current (raw) value of the node.
+        target: Target value.
+
+    Returns:
+        Flag if the node already holds the target value.
+    """
+    if current is None or target is None:
+        return False
+    current = extract_vector(current)
+    target = extract_vector(target)
+    if isinstance(current, str) or isinstance(target, str):
+        return str(current) == str(target)
+    try:
+        current = np.asarray(current)
+        target = np.asarray(target)
+        if current.shape != target.shape:
+            return False
+        if _is_float(current) or _is_float(target):
+            return bool(np.allclose(current, target, rtol=FLOAT_TOLERANCE, atol=0))
+        return bool(np.array_equal(current, target))
+    except (TypeError, ValueError):
+        return False
+
+
+class SetConfigPlanner:
+    """Skips writes of a set config operation that would not change anything.
+
+    Args:
+        snapshot: Snapshot manager of the instrument.
+    """
+
+    def __init__(self, snapshot: SnapshotManager):
+        self._snapshot = snapshot
+        self._valid = False
+        self._written_groups: t.Set[str] = set()
+        self._skipped: t.Dict[str, t.Any] = {}
+        self.written = 0
+        self.skipped = 0
+
+    def start(self) -> None:
+        """Start a new set config operation.
+
+        Takes a new snapshot of the instrument and resets the counters. If the
+        snapshot fails all nodes are written.
+
+        Raises:
+            Exception: If the snapshot could not be taken.
+        """
+        self._valid = False
+        self._written_groups = set()
+        self._skipped = {}
+        self.written = 0
+        self.skipped = 0
+        self._snapshot.clear()
+        self._snapshot.refresh()
+        self._valid = True
+
+    def needs_write(self, path: str, value: t.Any) -> bool:
+        """Check if a node needs to be written.
+
+        Args:
+            path: Path of the node.
+            value: Value that should be written (enums already converted to
+                their integer value).
+
+        Returns:
+            Flag if the value differs from the snapshot.
+        """
+        group = node_group(path)
+        if self._valid and group not in self._written_groups:
+            try:
+                current = self._snapshot.get_value(path)
+            except Exception as error:
+                logger.debug("%s", error)
+                current = None
+            if values_equal(current, value):
+                self._skipped[path] = value
+                self.skipped += 1
+                return False
+        self._written_groups.add(group)
+        self.written += 1
+        return True
+
+    def finish(self) -> t.Dict[str, t.Any]:
+        """Finish the set config operation.
+
+        Reports the number of skipped writes and clears the snapshot since it
+        no longer reflects the state of the instrument. Skipped nodes of a
+        group that was written are read again.
+
+        Returns:
+            Values of the skipped nodes that changed by the written nodes and
+            therefore need to be written.
+        """
+        logger.info(
+            "Set config: %d nodes written, %d writes skipped",
+            self.written,
+            self.skipped,
+        )
+        self._snapshot.clear()
+        stale = {
+            path: value
+            for path, value in self._skipped.items()
+            if node_group(path) in self._written_groups
+        }
+        self._valid = False
+        self._skipped = {}
+        if not stale:
+            return {}
+        self._snapshot.refresh()
+        changed = {
+            path: value
+            for path, value in stale.items()
+            if not values_equal(self._snapshot.get_value(path), value)
+        }
+        self._snapshot.clear()
+        return changed
@@ -0,0 +1,259 @@
+"""Hardware loop support for AWG and QA devices.
+
+In a Labber hardware loop the driver receives the values of all sweep steps
+before the measurement starts. Instead of setting them one by one, the values
+are collected per AWG core and uploaded at once when the instrument is armed:
+
+* amplitude, phase and waveform index are uploaded as command table entries
+  (entry ``n`` corresponds to step ``n``). Values that are set outside of a
+  hardware loop are uploaded directly if they are set individually, and after
+  the transaction of a set config if they changed.
+* The number of steps is written into a user register, so that the sequencer
+  program knows how many entries it needs to play.
+
+Results of vector quantities are read once and split into one vector per step.
+
+LabOne modules (DAQ and sweeper) are started once for the whole hardware loop.
+Each step only reads its record from the buffered module results.
+"""
+
+import typing as t
+
+import numpy as np
+
+COMMAND_TABLE_KINDS = ("amplitude", "phase", "waveform")
+# Phase offset of the second HDAWG output for IQ modulation (in degrees)
+HDAWG_IQ_PHASE_OFFSET = -90.0
+# Module node that defines the number of records (one per step)
+MODULE_COUNT_NODES = {"daq": "count", "sweeper": "loopcount"}
+# Module node with the duration of a single record (in seconds)
+MODULE_DURATION_NODES = {"daq": "duration"}
+# Time a step waits for its record in addition to twice the record duration
+MODULE_TIMEOUT_MARGIN = 30.0
+
+
+def _hdawg_entry(index: int, values: t.Dict[str, float]) -> t.Dict[str, t.Any]:
+    """Command table entry in the HDAWG format.
+
+    The phase is applied to the first output. The second output follows with
+    the IQ phase offset.
+    """
+    entry: t.Dict[str, t.Any] = {"index": index}
+    if "waveform" in values:
+        entry["waveform"] = {"index": int(values["waveform"])}
+    if "amplitude" in values:
+        entry["amplitude0"] = {"value": values["amplitude"]}
+        entry["amplitude1"] = {"value": values["amplitude"]}
+    if "phase" in values:
+        entry["phase0"] = {"value": values["phase"]}
+        entry["phase1"] = {"value": values["phase"] + HDAWG_IQ_PHASE_OFFSET}
+    return entry
+
+
+def _shfsg_entry(index: int, values: t.Dict[str, float]) -> t.Dict[str, t.Any]:
+    """Command table entry in the SHFSG format."""
+    entry: t.Dict[str, t.Any] = {"index": index}
+    if "waveform" in values:
+        entry["waveform"] = {"index": int(values["waveform"])}
+    if "amplitude" in values:
+        amplitude = values["amplitude"]
+        entry["amplitude00"] = {"value": amplitude}
+        entry["amplitude01"] = {"value": -amplitude}
+        entry["amplitude10"] = {"value": amplitude}
+        entry["amplitude11"] = {"value": amplitude}
+    if "phase" in values:
+        entry["phase"] = {"value": values["phase"]}
+    return entry
+
+
+class HardwareLoop:
+    """Collects the values of a hardware loop.
+
+    Values that are set outside of a hardware loop are static and used for all
+    steps unless the same value is swept. Only the command tables of AWG cores
+    with swept or changed values are uploaded, the tables of the other cores
+    are left untouched.
+    """
+
+    def __init__(self):
+        self._static: t.Dict[str, t.Dict[str, float]] = {}
+        self._steps: t.Dict[str, t.Dict[str, np.ndarray]] = {}
+        self._results: t.Dict[str, t.List[np.ndarray]] = {}
+        self._pending: t.Set[str] = set()
+        self.n_seq = 0
+
+    def set_static(self, awg: str, kind: str, value: float) -> bool:
+        """Set a value that is used for all steps.
+
+        Args:
+            awg: Path of the AWG core.
+            kind: Kind of the value. (amplitude, phase, waveform)
+            value: Value.
+
+        Returns:
+            Flag if a previously set value changed.
+        """
+        static = self._static.setdefault(awg, {})
+        previous = static.get(kind, None)
+        static[kind] = value
+        if previous is None or previous == value:
+            return False
+        self._pending.add(awg)
+        return True
+
+    def mark_pending(self, awg: str) -> None:
+        """Mark the command table of an AWG core to be uploaded.
+
+        Args:
+            awg: Path of the AWG core.
+        """
+        self._pending.add(awg)
+
+    def set_step(
+        self, awg: str, kind: str, value: float, seq_no: int, n_seq: int
+    ) -> None:
+        """Set the value of a single step.
+
+        A different number of steps than the previous call starts a new loop.
+
+        Args:
+            awg: Path of the AWG core.
+            kind: Kind of the value. (amplitude, phase, waveform)
+            value: Value.
+            seq_no: Index of the step.
+            n_seq: Number of steps.
+        """
+        if n_seq != self.n_seq:
+            self._steps = {}
+            self.n_seq = n_seq
+        steps = self._steps.setdefault(awg, {})
+        if kind not in steps:
+            steps[kind] = np.full(n_seq, self._static.get(awg, {}).get(kind, np.nan))
+        steps[kind][seq_no] = value
+
+    @property
+    def has_steps(self) -> bool:
+        """Flag if values of a hardware loop are pending."""
+        return bool(self._steps)
+
+    @property
+    def is_pending(self) -> bool:
+        """Flag if values are not uploaded yet."""
+        return bool(self._pending) or self.has_steps
+
+    def uploaded(self) -> None:
+        """Mark all static values as uploaded."""
+        self._pending = set()
+
+    def reset_steps(self) -> None:
+        """Remove all values of the hardware loop."""
+        self._steps = {}
+        self.n_seq = 0
+
+    def command_tables(self, device_type: str) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """Command tables of the AWG cores with swept or changed values.
+
+        Args:
+            device_type: Type of the device.
+
+        Returns:
+            Command table (json dict) per AWG core.
+        """
+        create_entry = _hdawg_entry if device_type.startswith("HDAWG") else _shfsg_entry
+        tables = {}
+        for awg in sorted(self._pending | set(self._steps)):
+            static = self._static.get(awg, {})
+            steps = self._steps.get(awg, {})
+            entries = []
+            for index in range(max(self.n_seq, 1) if steps else 1):
+                values = dict(static)
+                for kind, table in steps.items():
+                    if not np.isnan(table[index]):
+                        values[kind] = float(table[index])
+                entries.append(create_entry(index, values))
+            tables[awg] = {"table": entries}
+        return tables
+
+    def split_result(
+        self, name: str, value: t.Any, seq_no: int, n_seq: int
+    ) -> np.ndarray:
+        """Result of a vector quantity for a single step.
+
+        The result is read once for the first step and split into ``n_seq``
+        vectors of equal length.
+
+        Args:
+            name: Name of the quantity.
+            value: Function that returns the result of all steps.
+            seq_no: Index of the step.
+            n_seq: Number of steps.
+
+        Returns:
+            Result of the step.
+        """
+        if seq_no == 0 or len(self._results.get(name, [])) != n_seq:
+            self._results[name] = np.array_split(np.asarray(value()), n_seq)
+        return self._results[name][seq_no]
+
+
+def _flatten_records(result: t.Any) -> t.List[t.Dict[str, t.Any]]:
+    """Flatten the nested record lists of a module result."""
+    if isinstance(result, list):
+        return [record for item in result for record in _flatten_records(item)]
+    return [result] if result else []
+
+
+class ModuleResults:
+    """Buffered results of a module that runs for a whole hardware loop.
+
+    The module keeps the history of all records (one record per step), so the
+    records of the latest read replace the buffered ones.
+
+    A step waits at most ``timeout`` seconds without receiving a new record.
+    After a timeout the following steps do not wait anymore.
+
+    Args:
+        n_seq: Number of steps.
+        duration: Duration of a single record in seconds. (0 = unknown)
+    """
+
+    def __init__(self, n_seq: int, duration: float = 0.0):
+        self.n_seq = n_seq
+        self.timeout = 2 * duration + MODULE_TIMEOUT_MARGIN
+        self.timed_out = False
+        self._records: t.Dict[str, t.List[t.Dict[str, t.Any]]] = {}
+
+    def update(self, poll_result: t.Dict[str, t.Any]) -> None:
+        """Update the buffer with the result of a module read.
+
+        Args:
+            poll_result: Flat result of the module read.
+        """
+        for signal, result in poll_result.items():
+            records = _flatten_records(result)
+            if len(records) >= len(self._records.get(signal, [])):
+                self._records[signal] = records
+
+    def available(self, signal: str) -> int:
+        """Number of records available for a signal.
+
+        Args:
+            signal: Subscribed node path.
+
+        Returns:
+            Number of buffered records.
+        """
+        return len(self._records.get(signal, []))
+
+    def get(self, signal: str, seq_no: int) -> t.Optional[t.Dict[str, t.Any]]:
+        """Record of a single step.
+
+        Args:
+            signal: Subscribed node path.
+            seq_no: Index of the step.
+
+        Returns:
+            Record of the step or None if it is not available.
+        """
+        records = self._records.get(signal, [])
+        return records[seq_no] if seq_no < len(records) else None
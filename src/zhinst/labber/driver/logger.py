@@ -1,11 +1,172 @@
+import copy
 import logging
+import queue
 import sys
+import time
 import typing as t
-from logging.handlers import RotatingFileHandler
+import zlib
+from collections.abc import Mapping
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import numpy as np
+from zhinst.toolkit import Waveforms
+
+
+def _array_summary(value: np.ndarray) -> str:
+    """Summarize a numpy array by its shape, dtype and a checksum.
+
+    Args:
+        value: Numpy array.
+
+    Returns:
+        Summary of the array.
+    """
+    try:
+        checksum = f"{zlib.crc32(np.ascontiguousarray(value).data):08x}"
+    except (TypeError, ValueError, BufferError):
+        checksum = "n/a"
+    return f"array(shape={value.shape}, dtype={value.dtype}, hash={checksum})"
+
+
+def summarize(value: t.Any) -> str:
+    """String representation of a value that is suitable for logging.
+
+    Numpy arrays and waveforms are reduced to their shape, dtype and a checksum
+    instead of being stringified element by element. Containers are summarized
+    recursively. All other values use their normal string representation.
+
+    Args:
+        value: Value that should be logged.
+
+    Returns:
+        Summary of the value.
+    """
+    if isinstance(value, np.ndarray):
+        return _array_summary(value)
+    if isinstance(value, Waveforms):
+        slots = ", ".join(f"{k}: {summarize(v)}" for k, v in value.items())
+        return f"Waveforms({slots})"
+    if isinstance(value, Mapping):
+        items = ", ".join(f"{k!r}: {summarize(v)}" for k, v in value.items())
+        return "{" + items + "}"
+    if isinstance(value, (list, tuple)):
+        items = ", ".join(summarize(v) for v in value)
+        return f"[{items}]" if isinstance(value, list) else f"({items})"
+    return str(value)
+
+
+class PayloadSummary:
+    """Lazy log argument for (potentially large) payloads.
+
+    The summary is only computed if the log record is actually emitted, which
+    keeps disabled log levels free of any formatting cost.
+
+    Args:
+        value: Payload that should be logged.
+    """
+
+    __slots__ = ("_value",)
+
+    def __init__(self, value: t.Any):
+        self._value = value
+
+    def __str__(self) -> str:
+        return summarize(self._value)
+
+    __repr__ = __str__
+
+
+class ErrorRateLimiter(logging.Filter):
+    """Filter that rate limits repeated identical errors.
+
+    An error message that was already emitted within the last ``interval``
+    seconds is dropped. The next time the message passes the filter it is
+    extended with the number of suppressed repetitions.
+
+    Args:
+        interval: Minimum time in seconds between two identical errors.
+    """
+
+    _MAX_ENTRIES = 1024
+
+    def __init__(self, interval: float = 10.0):
+        super().__init__()
+        self._interval = interval
+        self._seen: t.Dict[t.Tuple[int, str], t.List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.ERROR:
+            return True
+        now = time.monotonic()
+        message = record.getMessage()
+        entry = self._seen.get((record.levelno, message))
+        if entry is not None and now - entry[0] < self._interval:
+            entry[1] += 1
+            return False
+        if len(self._seen) >= self._MAX_ENTRIES:
+            self._seen = {
+                key: value
+                for key, value in self._seen.items()
+                if now - value[0] < self._interval
+            }
+        if entry is not None and entry[1]:
+            record.msg = f"{message} (repeated {entry[1]} times)"
+            record.args = None
+        self._seen[(record.levelno, message)] = [now, 0]
+        return True
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """Queue handler that emits its records on a background thread.
+
+    The handler only puts the records into a queue. A ``QueueListener`` owned
+    by the handler forwards them to the actual (blocking) handlers. The
+    messages are formatted by the background thread as well, so lazy
+    arguments like `PayloadSummary` do not cost any time on the calling
+    thread.
+
+    Args:
+        handlers: Handlers that should emit the records.
+    """
+
+    def __init__(self, *handlers: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        self._listener = QueueListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+        self._listener.start()
+        self._running = True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Prepare a record for the queue.
+
+        Unlike ``QueueHandler.prepare`` the message is not formatted. The
+        record keeps its arguments, which are evaluated when the background
+        thread emits it.
+
+        Args:
+            record: Log record.
+
+        Returns:
+            Copy of the record.
+        """
+        return copy.copy(record)
+
+    def close(self) -> None:
+        """Flush all pending records and close the underlying handlers."""
+        if self._running:
+            self._running = False
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+        super().close()
 
 
 def configure_logger(
-    logger_: logging.Logger, level: int, filepath: t.Optional[str] = None
+    logger_: logging.Logger,
+    level: int,
+    filepath: t.Optional[str] = None,
+    error_interval: float = 10.0,
 ) -> None:
     """Configure logger.
 
@@ -13,11 +174,21 @@ def configure_logger(
     Log to std out
     Configure rotating file handler to keep logging file size reasonable.
 
+    The handlers are not attached to the logger directly but served by a
+    background thread through a queue, so that logging calls do not block on
+    std out or the disk. Identical errors are rate limited.
+
     Args:
         logger_: Logger
         level: Log level
         filepath: Logging filepath
+        error_interval: Minimum time in seconds between two identical errors.
     """
+    # Remove handlers from a previous configuration
+    for handler in logger_.handlers[:]:
+        if isinstance(handler, BackgroundQueueHandler):
+            logger_.removeHandler(handler)
+            handler.close()
     # Set up logger
     formatter = logging.Formatter(
         "[%(asctime)s] %(levelname)s: %(message).200s",
@@ -26,11 +197,14 @@ def configure_logger(
     # always log to std out
     std_out_handler = logging.StreamHandler(sys.stdout)
     std_out_handler.setFormatter(formatter)
-    logger_.addHandler(std_out_handler)
+    handlers = [std_out_handler]
     # log to path if specified
     if filepath:
         # Maximum of 5 MB log files.
         file_handler = RotatingFileHandler(filepath, maxBytes=int(5e6), backupCount=10)
         file_handler.setFormatter(formatter)
-        logger_.addHandler(file_handler)
+        handlers.append(file_handler)
+    queue_handler = BackgroundQueueHandler(*handlers)
+    queue_handler.addFilter(ErrorRateLimiter(error_interval))
+    logger_.addHandler(queue_handler)
     logger_.setLevel(level)
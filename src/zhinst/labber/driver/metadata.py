@@ -0,0 +1,196 @@
+"""Precompiled quant metadata of the generated drivers.
+
+The driver information of the quants (e.g. the toolkit function of a quant)
+is defined in the global settings file with wildcard node paths. Without
+metadata the driver matches every quant against these paths at runtime.
+
+The generator resolves the driver information for all quants of a driver and
+stores it as a Python module with literals next to the driver. The driver loads
+this module instead of the global settings file. Python caches the compiled
+module (marshal) in ``__pycache__``, so loading it does not parse any JSON and
+looking up the driver information of a quant is a single dictionary read.
+
+The module contains:
+
+* METADATA_VERSION: Version of the metadata format.
+* PACKAGE_VERSION: Version of zhinst-labber the module was generated with.
+* SETTINGS_SIZE: Size of the global settings file the module was generated
+  from.
+* LABBER_DELIMITER: Delimiter of the Labber quant names.
+* LOG_LEVEL: Global log level.
+* FUNCTIONS: Toolkit function information.
+* DRIVER_INFO: Driver information, shared by multiple quants.
+* QUANTS: Index into DRIVER_INFO by the lowercase node path of a quant.
+
+The driver only uses the module if it was generated with the installed
+package version and global settings file. The global settings file ships with
+the package, so the package version identifies its content. The file size
+additionally detects local edits of the settings file. Both checks avoid
+reading the settings file when a driver is created. Otherwise it falls back to
+the global settings file.
+"""
+
+import fnmatch
+import importlib.util
+import logging
+import os
+import string
+import typing as t
+from pathlib import Path
+from types import ModuleType
+
+from zhinst.labber import __version__
+
+METADATA_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def settings_size(path: t.Union[str, Path]) -> t.Optional[int]:
+    """Size of the global settings file.
+
+    Args:
+        path: Path of the settings file.
+
+    Returns:
+        Size of the file in bytes or None if the file does not exist.
+    """
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
+def driver_node_info(
+    settings: t.Dict, base_type: str, instrument_type: str
+) -> t.Dict[str, t.Dict]:
+    """Node information of a driver by wildcard node path.
+
+    Args:
+        settings: Content of the global settings file.
+        base_type: Base type of the instrument. `device` | `module` |
+            `DataServer`
+        instrument_type: Type of the instrument (e.g: SHFQA4 or daq)
+
+    Returns:
+        Node information of the common and the instrument quants.
+    """
+    node_info = settings["common"].get("quants", {})
+    if instrument_type:
+        if base_type == "device":
+            dev_type = instrument_type.split("_")[0].rstrip(string.digits)
+            device_info = settings.get(dev_type, {}).get("quants", {})
+        else:
+            device_info = settings.get(instrument_type, {}).get("quants", {})
+        node_info = {**node_info, **device_info}
+    return node_info
+
+
+def match_driver_info(
+    node_info: t.Dict[str, t.Dict], node_path: str
+) -> t.Optional[t.Tuple[str, t.Dict[str, t.Any]]]:
+    """Driver information of a node path.
+
+    Args:
+        node_info: Node information by wildcard node path.
+        node_path: Lowercase node path of the quant.
+
+    Returns:
+        First matching wildcard node path and its driver information. None if
+        no path matches.
+    """
+    for pattern, info in node_info.items():
+        if fnmatch.fnmatch(node_path, pattern):
+            return pattern, info.get("driver", {})
+    return None
+
+
+def render_metadata(
+    settings: t.Dict,
+    base_type: str,
+    instrument_type: str,
+    node_paths: t.Iterable[str],
+    name: str,
+    settings_file_size: t.Optional[int],
+) -> str:
+    """Render the quant metadata module of a driver.
+
+    Args:
+        settings: Content of the global settings file.
+        base_type: Base type of the instrument. `device` | `module` |
+            `DataServer`
+        instrument_type: Type of the instrument (e.g: SHFQA4 or daq)
+        node_paths: Lowercase node paths of the quants of the driver.
+        name: Name of the driver.
+        settings_file_size: Size of the global settings file (see
+            `settings_size`).
+
+    Returns:
+        Content of the metadata module.
+    """
+    node_info = driver_node_info(settings, base_type, instrument_type)
+    patterns: t.Dict[str, int] = {}
+    quants: t.Dict[str, int] = {}
+    for node_path in node_paths:
+        match = match_driver_info(node_info, node_path)
+        if match is None or not match[1]:
+            continue
+        pattern = match[0]
+        quants[node_path] = patterns.setdefault(pattern, len(patterns))
+
+    lines = [
+        f'"""Quant metadata of the {name} Labber driver.',
+        "",
+        "Generated by zhinst-labber. Do not edit.",
+        '"""',
+        "",
+        f"METADATA_VERSION = {METADATA_VERSION!r}",
+        f"PACKAGE_VERSION = {__version__!r}",
+        f"SETTINGS_SIZE = {settings_file_size!r}",
+        f"LABBER_DELIMITER = {settings['misc']['labberDelimiter']!r}",
+        f"LOG_LEVEL = {settings['misc']['LogLevel']!r}",
+        "FUNCTIONS = {",
+    ]
+    lines += [f"    {k!r}: {v!r}," for k, v in settings.get("functions", {}).items()]
+    lines += ["}", "DRIVER_INFO = ("]
+    lines += [
+        f"    {node_info[pattern]['driver']!r},  # {pattern}" for pattern in patterns
+    ]
+    lines += [")", "QUANTS = {"]
+    lines += [f"    {k!r}: {v!r}," for k, v in quants.items()]
+    lines += ["}", ""]
+    return "\n".join(lines)
+
+
+def load_metadata(
+    path: t.Union[str, Path], settings_file: t.Union[str, Path]
+) -> t.Optional[ModuleType]:
+    """Load the quant metadata module of a driver.
+
+    Args:
+        path: Path of the metadata module.
+        settings_file: Path of the global settings file the driver uses.
+
+    Returns:
+        Metadata module. None if the module does not exist, has a different
+        format version or was generated with a different package version or
+        global settings file.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return None
+    spec = importlib.util.spec_from_file_location("zhinst_labber_quant_metadata", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if getattr(module, "METADATA_VERSION", None) != METADATA_VERSION:
+        return None
+    if getattr(module, "PACKAGE_VERSION", None) != __version__ or getattr(
+        module, "SETTINGS_SIZE", None
+    ) != settings_size(settings_file):
+        logger.info(
+            "%s was generated with a different version or settings file. "
+            "Using the global settings instead.",
+            path,
+        )
+        return None
+    return module
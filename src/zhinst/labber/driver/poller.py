@@ -0,0 +1,208 @@
+"""Background poller for read-only measurement nodes.
+
+The poller uses its own data server connection and a background thread that
+polls the subscribed nodes. The received data is stored in a double buffer per
+node. The background thread fills the back buffer while the driver reads the
+latest completed (front) buffer without waiting for the data server.
+"""
+
+import fnmatch
+import logging
+import threading
+import typing as t
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Recording time of a single poll in seconds
+POLL_TIME = 0.05
+
+
+def _to_vector(event: t.Any) -> t.Optional[np.ndarray]:
+    """Extract the vector of a polled event.
+
+    Args:
+        event: Single polled event of a node.
+
+    Returns:
+        Vector of the event or None if the event contains no vector.
+    """
+    if isinstance(event, dict):
+        for key in ("vector", "wave", "value"):
+            if key in event:
+                vector = np.asarray(event[key])
+                return vector[0] if vector.ndim > 1 else vector
+        if "x" in event and "y" in event:
+            return np.asarray(event["x"]) + 1j * np.asarray(event["y"])
+        return None
+    return np.asarray(event)
+
+
+class DoubleBuffer:
+    """Double buffer for the data of a single node.
+
+    Polled data is appended to the back buffer. As soon as the back buffer
+    contains ``size`` samples it is swapped with the front buffer. A size of 0
+    swaps the buffers after every polled event.
+
+    Args:
+        size: Number of samples of a completed buffer.
+    """
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self._back: t.List[np.ndarray] = []
+        self._back_size = 0
+        self._front: t.Optional[np.ndarray] = None
+        self.generation = 0
+        self._condition = threading.Condition()
+
+    def append(self, vector: np.ndarray) -> None:
+        """Append polled data to the back buffer.
+
+        Args:
+            vector: Polled data.
+        """
+        with self._condition:
+            self._back.append(vector)
+            self._back_size += len(vector)
+            if self._back_size < self.size:
+                return
+            front = (
+                self._back[0] if len(self._back) == 1 else np.concatenate(self._back)
+            )
+            self._front = front[-self.size :] if self.size else front
+            self._back = []
+            self._back_size = 0
+            self.generation += 1
+            self._condition.notify_all()
+
+    def get(
+        self, newer_than: int = 0, timeout: float = 0
+    ) -> t.Tuple[t.Optional[np.ndarray], int]:
+        """Latest completed buffer.
+
+        Args:
+            newer_than: Only return a buffer with a higher generation. Blocks
+                until such a buffer is available or the timeout is reached.
+            timeout: Maximum time to wait in seconds.
+
+        Returns:
+            Latest completed buffer (None if not available) and its generation.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.generation > newer_than, timeout=timeout
+            )
+            if self.generation <= newer_than:
+                return None, self.generation
+            return self._front, self.generation
+
+
+class BackgroundPoller:
+    """Background thread that polls read-only nodes into double buffers.
+
+    Args:
+        connection: Data server connection that is only used by the poller.
+    """
+
+    def __init__(self, connection: t.Any):
+        self._connection = connection
+        self._buffers: t.Dict[str, DoubleBuffer] = {}
+        self._returned: t.Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="zhinst-labber-poller", daemon=True
+        )
+
+    def __contains__(self, node: str) -> bool:
+        return node.lower() in self._buffers
+
+    def add(self, node: str, size: int = 0) -> None:
+        """Subscribe to a node.
+
+        Args:
+            node: Absolute node path.
+            size: Number of samples of a completed buffer (0 = every update).
+        """
+        node = node.lower()
+        self._buffers[node] = DoubleBuffer(size)
+        self._connection.subscribe(node)
+
+    def start(self) -> None:
+        """Start the background thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and unsubscribe all nodes."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        try:
+            self._connection.unsubscribe("*")
+        except Exception as error:
+            logger.error("%s", error)
+
+    def _run(self) -> None:
+        """Poll the data server until the poller is stopped."""
+        while not self._stop.is_set():
+            try:
+                result = self._connection.poll(
+                    POLL_TIME, int(POLL_TIME * 1000), flat=True
+                )
+            except Exception as error:
+                logger.error("%s", error)
+                self._stop.wait(POLL_TIME)
+                continue
+            for node, data in result.items():
+                buffer = self._buffers.get(node.lower(), None)
+                if buffer is None:
+                    continue
+                for event in data if isinstance(data, list) else [data]:
+                    vector = _to_vector(event)
+                    if vector is not None:
+                        buffer.append(vector)
+
+    def get(
+        self, node: str, fresh: bool = False, timeout: float = 1.0
+    ) -> t.Optional[np.ndarray]:
+        """Latest completed buffer of a node.
+
+        Returns at once if data is available. Blocks until data is available
+        or the timeout is reached if no data has been received yet or if
+        fresh data is required.
+
+        Args:
+            node: Absolute node path.
+            fresh: Flag if the data must be newer than the one returned by the
+                previous call.
+            timeout: Maximum time to wait in seconds.
+
+        Returns:
+            Latest completed buffer or None if no data is available.
+        """
+        node = node.lower()
+        newer_than = self._returned.get(node, 0) if fresh else 0
+        value, generation = self._buffers[node].get(newer_than, timeout)
+        if value is not None:
+            self._returned[node] = generation
+        return value
+
+
+def matching_config(
+    path: str, config: t.Dict[str, t.Dict[str, t.Any]]
+) -> t.Optional[t.Dict[str, t.Any]]:
+    """Poller configuration of the first matching quant pattern.
+
+    Args:
+        path: Path of the quant. (e.g. /scopes/0/wave)
+        config: Poller configuration per quant pattern.
+
+    Returns:
+        Configuration of the first matching pattern or None.
+    """
+    for pattern, pattern_config in config.items():
+        if fnmatch.fnmatch(path.lower(), pattern.lower()):
+            return pattern_config
+    return None
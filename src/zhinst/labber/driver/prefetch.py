@@ -0,0 +1,166 @@
+"""Concurrent connection of the devices of a data server session.
+
+Every Labber driver connects its device and downloads its node tree when it is
+opened. For setups with multiple devices on the same data server this happens
+sequentially. The prefetcher connects a list of devices and downloads their
+node trees in a thread pool as soon as the first driver of a session is opened.
+Later drivers only wait for their own device, which is usually already created.
+
+``ziDAQServer`` is not thread safe. The workers therefore connect the devices
+through short-lived dedicated connections to the data server, which are closed
+right afterwards. The device objects (and their node trees) are created on the
+shared session, the workers hold a lock while doing so.
+"""
+
+import logging
+import threading
+import time
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from zhinst import core
+from zhinst.labber.helper import device_interface
+from zhinst.toolkit import Session
+from zhinst.toolkit.driver.devices import DeviceType
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of devices that are connected at the same time
+MAX_WORKERS = 8
+
+# Prefetcher by data server address. Only the prefetcher of the latest session
+# to a data server is kept.
+_prefetchers: t.Dict[t.Tuple[str, int], "DevicePrefetcher"] = {}
+
+
+class DevicePrefetcher:
+    """Connects devices of a session concurrently.
+
+    Args:
+        session: Session to the data server.
+        max_workers: Maximum number of devices that are connected at the same
+            time.
+    """
+
+    def __init__(self, session: Session, max_workers: int = MAX_WORKERS):
+        self._session = session
+        self._max_workers = max_workers
+        self._executor: t.Optional[ThreadPoolExecutor] = None
+        self._futures: t.Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, serials: t.Iterable[str]) -> None:
+        """Start connecting devices in the background.
+
+        Devices that are already prefetched are ignored.
+
+        Args:
+            serials: Serials of the devices.
+        """
+        serials = [
+            serial.lower() for serial in serials if serial.lower() not in self._futures
+        ]
+        if not serials:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix="zhinst-labber-prefetch",
+            )
+        for serial in serials:
+            self._futures[serial] = self._executor.submit(self._connect, serial)
+
+    def _connect(self, serial: str) -> DeviceType:
+        """Connect a device and create its device object.
+
+        The device is connected through a dedicated data server connection.
+        The interface is selected the same way as in
+        `zhinst.toolkit.Session.connect_device` (see `device_interface`).
+
+        Args:
+            serial: Serial of the device.
+
+        Returns:
+            toolkit device object.
+
+        Raises:
+            KeyError: If the device is not found.
+            RuntimeError: If the connection failed.
+        """
+        start = time.perf_counter()
+        hf2 = self._session.is_hf2_server
+        daq_server = core.ziDAQServer(
+            self._session.server_host, self._session.server_port, 1 if hf2 else 6
+        )
+        try:
+            interface = device_interface(daq_server, serial, hf2)
+            daq_server.connectDevice(serial, interface)
+        finally:
+            daq_server.disconnect()
+        with self._lock:
+            if hf2:
+                device = self._session.connect_device(serial)
+            else:
+                device = self._session.devices[serial]
+        logger.debug(
+            "Prefetched %s in %.3fs", serial.upper(), time.perf_counter() - start
+        )
+        return device
+
+    def get(self, serial: str) -> t.Optional[DeviceType]:
+        """Get a prefetched device.
+
+        Blocks until the device object is created.
+
+        Args:
+            serial: Serial of the device.
+
+        Returns:
+            toolkit device object or None if the device is not prefetched.
+
+        Raises:
+            KeyError: If the device is not found.
+            RuntimeError: If the connection failed.
+        """
+        future = self._futures.get(serial.lower(), None)
+        if future is None:
+            return None
+        return future.result()
+
+
+def get_prefetcher(session: Session) -> DevicePrefetcher:
+    """Get the prefetcher of a session.
+
+    Args:
+        session: Session to the data server.
+
+    Returns:
+        Prefetcher that is shared by all drivers of the session.
+    """
+    key = (session.server_host, session.server_port)
+    prefetcher = _prefetchers.get(key, None)
+    if prefetcher is None or prefetcher._session is not session:
+        prefetcher = DevicePrefetcher(session)
+        _prefetchers[key] = prefetcher
+    return prefetcher
+
+
+def prefetched_device(session: Session, serial: str) -> t.Optional[DeviceType]:
+    """Get a prefetched device of a session.
+
+    Args:
+        session: Session to the data server.
+        serial: Serial of the device.
+
+    Returns:
+        toolkit device object or None if the device is not prefetched.
+
+    Raises:
+        KeyError: If the device is not found.
+        RuntimeError: If the connection failed.
+    """
+    key = (session.server_host, session.server_port)
+    prefetcher = _prefetchers.get(key, None)
+    if prefetcher is None or prefetcher._session is not session:
+        return None
+    return prefetcher.get(serial)
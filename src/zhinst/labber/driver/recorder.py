@@ -0,0 +1,386 @@
+"""Record and replay of the toolkit traffic of a driver.
+
+The recorder sits between toolkit and the data server connection and logs every
+request (node set/get, transaction, function and module calls) together with
+its timing into a compact binary trace. In addition the Labber operations that
+caused the traffic are recorded, so that a trace can be replayed offline: a
+``ReplayConnection`` answers the requests with the recorded values and
+``replay_trace`` drives the Labber operations against a driver that uses it.
+
+Warning:
+    Traces are stored with pickle. Only replay traces from trusted sources.
+"""
+
+import functools
+import pickle
+import struct
+import threading
+import time
+import typing as t
+from collections import defaultdict, deque
+from pathlib import Path
+
+from zhinst.labber.driver.logger import summarize
+
+TRACE_HEADER = b"ZILBTRC1"
+
+# ziDAQServer functions that create a LabOne module.
+MODULE_FACTORIES = (
+    "awgModule",
+    "dataAcquisitionModule",
+    "deviceSettings",
+    "impedanceModule",
+    "multiDeviceSyncModule",
+    "pidAdvisor",
+    "precompensationAdvisor",
+    "quantumAnalyzerModule",
+    "scopeModule",
+    "sweep",
+)
+
+
+class TraceRecord(t.NamedTuple):
+    """Single entry of a trace.
+
+    Attributes:
+        kind: Kind of the record. (session, labber, connection)
+        name: Name of the operation or function.
+        args: Positional arguments.
+        kwargs: Keyword arguments.
+        result: Result of the operation (or the raised exception).
+        duration: Duration of the operation in seconds.
+        is_error: Flag if the operation raised an exception.
+    """
+
+    kind: str
+    name: str
+    args: t.Tuple
+    kwargs: t.Dict[str, t.Any]
+    result: t.Any = None
+    duration: float = 0.0
+    is_error: bool = False
+
+
+class TraceWriter:
+    """Writes trace records into a binary file.
+
+    Each record is stored as a length prefixed pickle.
+
+    Args:
+        path: Path of the trace file.
+    """
+
+    def __init__(self, path: t.Union[str, Path]):
+        self._file = open(path, "wb")
+        self._file.write(TRACE_HEADER)
+        self._lock = threading.Lock()
+
+    def write(self, record: TraceRecord) -> None:
+        """Append a record to the trace.
+
+        Args:
+            record: Trace record.
+        """
+        try:
+            payload = pickle.dumps(tuple(record), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            record = record._replace(result=None)
+            payload = pickle.dumps(tuple(record), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._file.write(struct.pack("<I", len(payload)))
+            self._file.write(payload)
+
+    def flush(self) -> None:
+        """Flush the trace file."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the trace file."""
+        with self._lock:
+            self._file.close()
+
+
+def read_trace(path: t.Union[str, Path]) -> t.Iterator[TraceRecord]:
+    """Read all records of a trace.
+
+    Args:
+        path: Path of the trace file.
+
+    Returns:
+        Iterator over the trace records.
+
+    Raises:
+        ValueError: If the file is not a valid trace.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(TRACE_HEADER)) != TRACE_HEADER:
+            raise ValueError(f"{path} is not a valid zhinst-labber trace.")
+        while True:
+            length = file.read(4)
+            if len(length) < 4:
+                return
+            payload = file.read(struct.unpack("<I", length)[0])
+            yield TraceRecord(*pickle.loads(payload))
+
+
+def _call_key(name: str, args: t.Tuple, kwargs: t.Dict) -> str:
+    """Key that identifies a request independent of its position in a trace."""
+    return f"{name}{summarize(args)}{summarize(dict(sorted(kwargs.items())))}"
+
+
+class RecordingConnection:
+    """Connection wrapper that records all requests into a trace.
+
+    Mimics the interface of the wrapped object (``ziDAQServer`` or a LabOne
+    module). LabOne modules created through the connection are wrapped as well.
+
+    Args:
+        connection: Wrapped connection.
+        writer: Writer of the trace.
+        prefix: Prefix of the recorded function names.
+    """
+
+    def __init__(self, connection: t.Any, writer: TraceWriter, prefix: str = ""):
+        self._connection = connection
+        self._writer = writer
+        self._prefix = prefix
+        self._module_count = defaultdict(int)
+
+    @property
+    def host(self) -> str:
+        return self._connection.host
+
+    @property
+    def port(self) -> int:
+        return self._connection.port
+
+    def __getattr__(self, name: str) -> t.Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attribute = getattr(self._connection, name)
+        if not callable(attribute):
+            return attribute
+        full_name = self._prefix + name
+
+        @functools.wraps(attribute)
+        def recorded(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as error:
+                self._writer.write(
+                    TraceRecord(
+                        "connection",
+                        full_name,
+                        args,
+                        kwargs,
+                        error,
+                        time.perf_counter() - start,
+                        True,
+                    )
+                )
+                raise
+            duration = time.perf_counter() - start
+            if name in MODULE_FACTORIES:
+                index = self._module_count[name]
+                self._module_count[name] += 1
+                self._writer.write(
+                    TraceRecord("connection", full_name, args, kwargs, None, duration)
+                )
+                return RecordingConnection(
+                    result, self._writer, f"{full_name}[{index}]."
+                )
+            self._writer.write(
+                TraceRecord("connection", full_name, args, kwargs, result, duration)
+            )
+            return result
+
+        return recorded
+
+
+class ReplayConnection:
+    """Connection that answers requests with the values of a recorded trace.
+
+    Requests are matched by their name and arguments. Identical requests are
+    answered in the recorded order; if a request is issued more often than it
+    was recorded (e.g. while waiting for a state) the last answer is repeated.
+
+    Args:
+        records: Connection records of the trace.
+        host: Address of the recorded data server.
+        port: Port of the recorded data server.
+        prefix: Prefix of the replayed function names.
+    """
+
+    def __init__(
+        self,
+        records: t.Union[t.Dict[str, t.Deque[TraceRecord]], t.Iterable[TraceRecord]],
+        host: str = "localhost",
+        port: int = 8004,
+        prefix: str = "",
+    ):
+        if isinstance(records, dict):
+            self._records = records
+        else:
+            self._records = defaultdict(deque)
+            for record in records:
+                if record.kind == "connection":
+                    key = _call_key(record.name, record.args, record.kwargs)
+                    self._records[key].append(record)
+        self.host = host
+        self.port = port
+        self._prefix = prefix
+        self._module_count = defaultdict(int)
+
+    @classmethod
+    def from_file(cls, path: t.Union[str, Path]) -> "ReplayConnection":
+        """Create a replay connection from a trace file.
+
+        Args:
+            path: Path of the trace file.
+        """
+        records = list(read_trace(path))
+        session = next((r for r in records if r.kind == "session"), None)
+        host, port = session.args[:2] if session else ("localhost", 8004)
+        return cls(records, host, port)
+
+    def __getattr__(self, name: str) -> t.Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        full_name = self._prefix + name
+
+        def replayed(*args, **kwargs):
+            key = _call_key(full_name, args, kwargs)
+            queue = self._records.get(key)
+            if not queue:
+                raise RuntimeError(f"{full_name}{args} is not part of the trace.")
+            record = queue.popleft() if len(queue) > 1 else queue[0]
+            if record.is_error:
+                raise record.result
+            if name in MODULE_FACTORIES:
+                index = self._module_count[name]
+                self._module_count[name] += 1
+                return ReplayConnection(
+                    self._records,
+                    self.host,
+                    self.port,
+                    f"{full_name}[{index}].",
+                )
+            return record.result
+
+        return replayed
+
+
+class ReplayResult(t.NamedTuple):
+    """Timing of a replayed Labber operation.
+
+    Attributes:
+        operation: Name of the operation. (open, set, get, arm)
+        quant: Name of the quantity (empty if not applicable).
+        recorded: Duration of the operation during the recording in seconds.
+        replayed: Duration of the operation during the replay in seconds.
+    """
+
+    operation: str
+    quant: str
+    recorded: float
+    replayed: float
+
+
+def traced(operation: str, with_quant: bool = True) -> t.Callable:
+    """Decorator that records a Labber operation of a driver.
+
+    The operation is only recorded if the driver has an active recorder
+    (``_recorder``). The first argument of the operation is expected to be the
+    quantity if ``with_quant`` is set.
+
+    Operations that are called from within another traced operation (e.g. a
+    get of a read-only quantity during a set) are not recorded, since the
+    replay of the outer operation executes them again.
+
+    Args:
+        operation: Name of the operation.
+        with_quant: Flag if the first argument is a Labber quantity.
+    """
+
+    def decorator(method: t.Callable) -> t.Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            depth = getattr(self, "_trace_depth", 0)
+            self._trace_depth = depth + 1
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._trace_depth = depth
+                # The recorder can be created by the operation itself (open)
+                writer = getattr(self, "_recorder", None)
+                if writer is not None and depth == 0:
+                    recorded_args = args
+                    if with_quant and args:
+                        recorded_args = (getattr(args[0], "name", args[0]),) + args[1:]
+                    operation_code = getattr(self, "dOp", {}).get("operation")
+                    writer.write(
+                        TraceRecord(
+                            "labber",
+                            operation,
+                            recorded_args,
+                            {**kwargs, "_operation": operation_code},
+                            None,
+                            time.perf_counter() - start,
+                        )
+                    )
+                    writer.flush()
+
+        return wrapper
+
+    return decorator
+
+
+def replay_trace(driver: t.Any, path: t.Union[str, Path]) -> t.List[ReplayResult]:
+    """Replay the Labber operations of a trace on a driver.
+
+    The driver must be created with the same trace as ``replay_path`` in its
+    local settings, so that its session answers all requests with the recorded
+    values. Like Labber, the resulting values are stored in the quantities.
+
+    Args:
+        driver: Labber driver (``BaseDevice``).
+        path: Path of the trace file.
+
+    Returns:
+        Recorded and replayed duration of each Labber operation.
+    """
+    results = []
+    for record in read_trace(path):
+        if record.kind != "labber":
+            continue
+        kwargs = dict(record.kwargs)
+        driver.dOp = {"operation": kwargs.pop("_operation", None)}
+        args = list(record.args)
+        quant_name = ""
+        if record.name in ["set", "get"]:
+            quant_name = args[0]
+            args[0] = driver.getQuantity(quant_name)
+        start = time.perf_counter()
+        if record.name == "open":
+            driver.performOpen(*args, **kwargs)
+        elif record.name == "set":
+            value = driver.performSetValue(*args, **kwargs)
+            args[0].setValue(args[1] if value is None else value)
+        elif record.name == "get":
+            args[0].setValue(driver.performGetValue(*args, **kwargs))
+        elif record.name == "arm":
+            driver.performArm(*args, **kwargs)
+        elif record.name == "close":
+            driver.performClose(*args, **kwargs)
+        results.append(
+            ReplayResult(
+                record.name,
+                quant_name,
+                record.duration,
+                time.perf_counter() - start,
+            )
+        )
+    return results
@@ -36,7 +36,7 @@ class SnapshotManager:
                 be fetched with a single get command.
         """
         if not self._values:
-            self._values = self._nodetree["*"](parse=False, enum=False)
+            self.refresh()
         try:
             return self._values[self._nodetree[path]]
         except KeyError:
@@ -44,6 +44,10 @@ class SnapshotManager:
             print(f"{path} not found in snapshot")
             return None
 
+    def refresh(self) -> None:
+        """Take a new snapshot with a single get of all nodes."""
+        self._values = self._nodetree["*"](parse=False, enum=False)
+
     def clear(self) -> None:
         """Clears the current snapshot if there is any."""
         self._values = {}
@@ -0,0 +1,126 @@
+"""Compact binary storage of an instrument state.
+
+The state consists of the values of all settable nodes and the content of the
+files that are used by the functions of the driver (e.g. sequencer programs,
+waveforms or command tables). It is stored as a single numpy ``.npz`` archive.
+Vectors are stored as raw arrays in their native dtype. File contents are
+stored as content addressed blobs, i.e. identical files are only stored once.
+
+When a state is loaded the blobs are written into a ``<state>.blobs`` folder
+next to the state file. Since the file names are the hash of their content
+existing blobs are reused.
+"""
+
+import hashlib
+import typing as t
+from pathlib import Path
+
+import numpy as np
+
+from zhinst.labber.driver.vectors import extract_vector
+
+STATE_VERSION = 1
+
+
+def content_hash(data: bytes) -> str:
+    """Hash of a file content.
+
+    Args:
+        data: Content of the file.
+
+    Returns:
+        Hex digest of the content.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def _to_array(value: t.Any) -> t.Optional[np.ndarray]:
+    """Convert a raw node value into an array that can be stored.
+
+    Args:
+        value: Raw node value.
+
+    Returns:
+        Array of the value or None if the value can not be stored.
+    """
+    value = extract_vector(value)
+    if isinstance(value, dict):
+        return None
+    array = np.asarray(value)
+    if array.dtype.kind not in "biufcU":
+        return None
+    return array
+
+
+def save_state(
+    path: t.Union[str, Path],
+    nodes: t.Dict[str, t.Any],
+    files: t.Dict[str, Path],
+) -> None:
+    """Save a state into a file.
+
+    Args:
+        path: Path of the state file.
+        nodes: Raw values of the nodes.
+        files: Files of the quantities used by the functions.
+    """
+    arrays = {"version": np.array(STATE_VERSION)}
+    paths = []
+    for node, value in nodes.items():
+        array = _to_array(value)
+        if array is None:
+            continue
+        arrays[f"node_{len(paths)}"] = array
+        paths.append(node)
+    arrays["nodes"] = np.array(paths, dtype=str)
+    quant_names, hashes, suffixes = [], [], []
+    for quant_name, file_path in files.items():
+        data = Path(file_path).read_bytes()
+        digest = content_hash(data)
+        arrays[f"blob_{digest}"] = np.frombuffer(data, dtype=np.uint8)
+        quant_names.append(quant_name)
+        hashes.append(digest)
+        suffixes.append(Path(file_path).suffix)
+    arrays["files"] = np.array(quant_names, dtype=str)
+    arrays["file_hashes"] = np.array(hashes, dtype=str)
+    arrays["file_suffixes"] = np.array(suffixes, dtype=str)
+    with open(path, "wb") as file:
+        np.savez_compressed(file, **arrays)
+
+
+def load_state(
+    path: t.Union[str, Path],
+) -> t.Tuple[t.Dict[str, t.Any], t.Dict[str, Path]]:
+    """Load a state from a file.
+
+    The files of the state are restored into the ``<state>.blobs`` folder.
+
+    Args:
+        path: Path of the state file.
+
+    Returns:
+        Raw values of the nodes and restored files of the quantities.
+
+    Raises:
+        ValueError: If the file version is not supported.
+    """
+    path = Path(path)
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["version"])
+        if version != STATE_VERSION:
+            raise ValueError(f"Unsupported state version {version}")
+        nodes = {}
+        for index, node in enumerate(data["nodes"]):
+            value = data[f"node_{index}"]
+            nodes[str(node)] = value.item() if value.ndim == 0 else value
+        files = {}
+        blob_dir = path.with_suffix(".blobs")
+        for quant_name, digest, suffix in zip(
+            data["files"], data["file_hashes"], data["file_suffixes"]
+        ):
+            file_path = blob_dir / f"{digest}{suffix}"
+            if not file_path.exists():
+                blob_dir.mkdir(parents=True, exist_ok=True)
+                file_path.write_bytes(data[f"blob_{digest}"].tobytes())
+            files[str(quant_name)] = file_path
+    return nodes, files
@@ -0,0 +1,192 @@
+"""Streaming of demodulator samples.
+
+Instead of reading a single demodulator sample per GET, the sample node is
+subscribed once and polled into a buffer. A GET then returns a statistic over
+the samples of a time window or a fixed number of samples.
+"""
+
+import typing as t
+
+import numpy as np
+
+# Statistics that can be applied to the x and y values of the samples
+STATISTICS = {
+    "mean": np.mean,
+    "median": np.median,
+    "std": np.std,
+    "min": np.min,
+    "max": np.max,
+}
+SAMPLE_FIELDS = ("timestamp", "x", "y")
+# Recording time of a single poll in seconds
+POLL_TIME = 0.01
+# Time in seconds an acquisition may take longer than expected
+TIMEOUT_MARGIN = 1.0
+
+
+class SampleBuffer:
+    """Buffer for the samples of a single demodulator.
+
+    Polled chunks are only concatenated when the samples are accessed.
+    """
+
+    def __init__(self):
+        self._chunks: t.Dict[str, t.List[np.ndarray]] = {
+            field: [] for field in SAMPLE_FIELDS
+        }
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, sample: t.Dict[str, np.ndarray]) -> None:
+        """Append a polled demodulator sample.
+
+        Args:
+            sample: Polled sample (dict with timestamp, x and y arrays).
+        """
+        for field in SAMPLE_FIELDS:
+            self._chunks[field].append(np.asarray(sample[field]))
+        self._size += len(sample["timestamp"])
+
+    def clear(self) -> None:
+        """Remove all samples."""
+        for chunks in self._chunks.values():
+            chunks.clear()
+        self._size = 0
+
+    def duration(self) -> int:
+        """Time between the first and the last sample in clock ticks."""
+        if self._size < 2:
+            return 0
+        timestamps = self._chunks["timestamp"]
+        return int(timestamps[-1][-1]) - int(timestamps[0][0])
+
+    def samples(self) -> t.Dict[str, np.ndarray]:
+        """All buffered samples.
+
+        Returns:
+            Dictionary with the timestamp, x and y arrays.
+        """
+        result = {}
+        for field, chunks in self._chunks.items():
+            if len(chunks) != 1:
+                chunks[:] = [np.concatenate(chunks)] if chunks else []
+            result[field] = chunks[0] if chunks else np.array([])
+        return result
+
+
+class DemodStream:
+    """Stream of a demodulator sample node.
+
+    Args:
+        path: Absolute path of the sample node.
+        clockbase: Clockbase of the device in Hz.
+    """
+
+    def __init__(self, path: str, clockbase: float):
+        self.path = path
+        self.clockbase = clockbase
+        self.buffer = SampleBuffer()
+        self._consumed: t.Set[str] = set()
+        self._data: t.Optional[t.Dict[str, np.ndarray]] = None
+
+    def needs_acquisition(self, kind: str) -> bool:
+        """Flag if a new acquisition is needed to read a value.
+
+        Every value of an acquisition can be read once. This allows reading the
+        statistic and the raw vectors of the same acquisition.
+
+        Args:
+            kind: Kind of the value. (value, x, y, timestamp)
+        """
+        return self._data is None or kind in self._consumed
+
+    def read(self, kind: str) -> t.Dict[str, np.ndarray]:
+        """Samples of the latest acquisition.
+
+        Args:
+            kind: Kind of the value. (value, x, y, timestamp)
+
+        Returns:
+            Dictionary with the timestamp, x and y arrays.
+        """
+        self._consumed.add(kind)
+        return self._data
+
+    def is_complete(self, count: int, window: int) -> bool:
+        """Flag if the buffer contains enough samples.
+
+        Args:
+            count: Number of samples. (0 = not used)
+            window: Time window in clock ticks. (0 = not used)
+        """
+        if count > 0:
+            return len(self.buffer) >= count
+        if window > 0:
+            return self.buffer.duration() >= window
+        return len(self.buffer) > 0
+
+    def timeout(self, count: int, window: int, rate: float) -> float:
+        """Maximum time an acquisition may take.
+
+        Twice the expected duration plus ``TIMEOUT_MARGIN``.
+
+        Args:
+            count: Number of samples. (0 = not used)
+            window: Time window in clock ticks. (0 = not used)
+            rate: Sample rate of the demodulator in Hz.
+
+        Returns:
+            Timeout in seconds.
+        """
+        duration = 0.0
+        if count > 0:
+            duration = count / rate if rate > 0 else 0.0
+        elif window > 0:
+            duration = window / self.clockbase
+        return 2 * duration + TIMEOUT_MARGIN
+
+    def finish_acquisition(self, count: int, window: int) -> None:
+        """Store the samples of the acquisition and clear the buffer.
+
+        Args:
+            count: Number of samples. (0 = not used)
+            window: Time window in clock ticks. (0 = not used)
+        """
+        samples = self.buffer.samples()
+        self.buffer.clear()
+        if count > 0:
+            samples = {field: value[-count:] for field, value in samples.items()}
+        elif window > 0 and len(samples["timestamp"]):
+            start = int(samples["timestamp"][-1]) - window
+            mask = samples["timestamp"].astype(np.int64) >= start
+            samples = {field: value[mask] for field, value in samples.items()}
+        elif len(samples["timestamp"]):
+            samples = {field: value[-1:] for field, value in samples.items()}
+        self._data = samples
+        self._consumed = set()
+
+
+def apply_statistic(samples: t.Dict[str, np.ndarray], statistic: str) -> complex:
+    """Apply a statistic to the x and y values of samples.
+
+    Args:
+        samples: Dictionary with the x and y arrays.
+        statistic: Name of the statistic (see STATISTICS).
+
+    Returns:
+        Statistic of x and y as complex value.
+
+    Raises:
+        ValueError: If the statistic is unknown.
+    """
+    try:
+        function = STATISTICS[statistic.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown statistic {statistic}. Must be one of {list(STATISTICS)}"
+        ) from None
+    if not len(samples["x"]):
+        return complex(np.nan, np.nan)
+    return complex(function(samples["x"]), function(samples["y"]))
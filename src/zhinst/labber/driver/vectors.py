@@ -0,0 +1,62 @@
+"""Vector handling between toolkit and Labber.
+
+Vectors are passed through without copies and keep the native dtype of the
+device (e.g. complex64 QA results or int16 scope samples). A conversion is only
+done at the Labber boundary if Labber can not represent the dtype.
+"""
+
+import typing as t
+
+import numpy as np
+
+# Keys of dictionaries that contain the actual vector
+VECTOR_KEYS = ("vector", "wave", "value")
+# dtype kinds that are passed to Labber without conversion
+# (signed/unsigned integer, float, complex)
+NATIVE_KINDS = "iufc"
+
+
+def extract_vector(value: t.Any, keys: t.Sequence[str] = ()) -> t.Any:
+    """Extract the vector of a value without copying it.
+
+    Dictionaries (e.g. Labber traces or raw toolkit results) are reduced to
+    the first available key. The keys passed as argument take precedence over
+    the default vector keys. All other values are returned unchanged.
+
+    Args:
+        value: Raw value.
+        keys: Keys of a dictionary value that contain the vector.
+
+    Returns:
+        Vector of the value.
+    """
+    if not isinstance(value, dict):
+        return value
+    for key in (*keys, *VECTOR_KEYS):
+        if key in value:
+            return value[key]
+    return value
+
+
+def to_labber_vector(value: t.Any) -> t.Any:
+    """Convert a vector into a format that Labber accepts.
+
+    The native dtype is preserved and no copy is made if the dtype is numeric.
+    Multi dimensional results (e.g. scope waves with multiple channels) are
+    reduced to the first entry.
+
+    Args:
+        value: Vector.
+
+    Returns:
+        One dimensional numpy array. Values that are no vectors are returned
+        unchanged.
+    """
+    if not isinstance(value, (np.ndarray, list, tuple)):
+        return value
+    vector = np.asarray(value)
+    if vector.ndim > 1:
+        vector = vector[0]
+    if vector.dtype.kind not in NATIVE_KINDS:
+        vector = vector.astype(np.float64)
+    return vector
@@ -1 +1,4 @@
-from zhinst.labber.generator.generator import generate_labber_files
+from zhinst.labber.generator.generator import (
+    generate_labber_files,
+    generate_labber_files_offline,
+)
@@ -0,0 +1,489 @@
+"""Generation of the Labber drivers for multiple devices.
+
+The DataServer and module drivers only depend on the data server and are
+therefore generated once per data server. The drivers are rendered in a
+process pool, each worker uses its own session. The files are written by the
+calling process. Devices of the same data server, LabOne version, type and
+options share a driver. Their type, options and LabOne version are discovered
+first (without listing the nodes of the devices) and only one device per
+driver is rendered. Drivers that are up to date according to the manifest of
+the driver directory are not rendered again.
+
+Devices are either connected on a live data server or, if a node
+documentation is specified, generated offline (see
+:func:`zhinst.labber.generator.generator.generate_labber_files_offline`).
+"""
+
+import contextlib
+import json
+import time
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from zhinst.labber.generator.generator import (
+    DataServerConfig,
+    DeviceConfig,
+    ModuleConfig,
+    copy_static_files,
+    create_offline_server,
+    module_names,
+    open_manifest,
+    open_settings_file,
+    render_outdated_files,
+    write_outdated_files,
+)
+from zhinst.labber.generator.manifest import Manifest
+from zhinst.labber.helper import check_compatibility, device_interface
+from zhinst.labber.offline_server import offline_session
+from zhinst.toolkit import Session
+
+
+class DeviceEntry(t.NamedTuple):
+    """Device of a batch generation.
+
+    Args:
+        device_id: Zurich Instruments device ID. (e.g: dev1234)
+        server_host: DataServer host
+        server_port: DataServer port
+        interface: Interface the device should be connected to.
+        hf2: If the device is HF2.
+        nodedoc: Path to the node documentation JSON of the device. If
+            specified the driver is generated offline.
+        device_type: Device type of the node documentation. (e.g: SHFQA4)
+        options: Device options of the node documentation separated by a
+            new line.
+        labone_version: LabOne version of the node documentation.
+        module_nodedocs: Path to the node documentation JSON per module.
+    """
+
+    device_id: str
+    server_host: str = "localhost"
+    server_port: t.Optional[int] = None
+    interface: t.Optional[str] = None
+    hf2: bool = False
+    nodedoc: t.Optional[str] = None
+    device_type: t.Optional[str] = None
+    options: str = ""
+    labone_version: str = "24.10"
+    module_nodedocs: t.Optional[t.Dict[str, str]] = None
+
+
+class GenerationResult(t.NamedTuple):
+    """Result of the generation of a single driver group.
+
+    Args:
+        name: Name of the device or the data server.
+        duration: Generation time in seconds.
+        created: Created files.
+        upgraded: Upgraded files.
+        device_type: Device type of a device.
+        error: Error message if the generation failed.
+    """
+
+    name: str
+    duration: float
+    created: t.List[Path]
+    upgraded: t.List[Path]
+    device_type: t.Optional[str] = None
+    error: t.Optional[str] = None
+
+
+def load_inventory(path: t.Union[str, Path]) -> t.List[DeviceEntry]:
+    """Load an inventory file.
+
+    The inventory is a JSON list. Each entry is either a device ID or an object
+    with the fields of :class:`DeviceEntry`. Relative node documentation paths
+    are resolved relative to the inventory file.
+
+    .. code-block:: json
+
+        [
+            "dev1234",
+            {"device_id": "dev2345", "server_host": "192.168.1.10"},
+            {
+                "device_id": "dev3456",
+                "nodedoc": "nodedoc_dev3456.json",
+                "device_type": "SHFQA4"
+            }
+        ]
+
+    Args:
+        path: Path to the inventory file.
+
+    Returns:
+        Devices of the inventory.
+
+    Raises:
+        ValueError: If an entry is invalid.
+    """
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    if not isinstance(data, list):
+        raise ValueError(f"{path} must contain a list of devices.")
+    entries = []
+    for item in data:
+        if isinstance(item, str):
+            item = {"device_id": item}
+        if not isinstance(item, dict) or "device_id" not in item:
+            raise ValueError(f"Invalid inventory entry {item}.")
+        unknown = set(item) - set(DeviceEntry._fields)
+        if unknown:
+            raise ValueError(
+                f"Unknown inventory fields {', '.join(sorted(unknown))} "
+                f"for {item['device_id']}."
+            )
+        if item.get("nodedoc", None):
+            item["nodedoc"] = str(path.parent / item["nodedoc"])
+        if item.get("module_nodedocs", None):
+            item["module_nodedocs"] = {
+                module: str(path.parent / module_nodedoc)
+                for module, module_nodedoc in item["module_nodedocs"].items()
+            }
+        entries.append(DeviceEntry(**item))
+    return entries
+
+
+def server_key(entry: DeviceEntry) -> t.Tuple:
+    """Key of the data server of a device.
+
+    Devices with the same key share the DataServer and module drivers.
+
+    Args:
+        entry: Device entry.
+
+    Returns:
+        Hashable key of the data server.
+    """
+    key = (entry.server_host.lower(), entry.server_port, entry.hf2)
+    if entry.nodedoc is None:
+        return key
+    return key + (
+        entry.labone_version,
+        tuple(sorted((entry.module_nodedocs or {}).items())),
+    )
+
+
+@contextlib.contextmanager
+def _connection(entry: DeviceEntry) -> t.Iterator[Session]:
+    """Session on the data server of an entry.
+
+    Offline entries use a fake data server as connection.
+
+    Args:
+        entry: Device entry.
+    """
+    if entry.nodedoc is None:
+        yield Session(
+            server_host=entry.server_host,
+            server_port=entry.server_port,
+            hf2=entry.hf2,
+        )
+        return
+    if not entry.device_type:
+        raise ValueError(f"{entry.device_id}: nodedoc requires a device_type.")
+    server = create_offline_server(
+        entry.device_id,
+        entry.nodedoc,
+        entry.device_type,
+        server_host=entry.server_host,
+        options=entry.options,
+        labone_version=entry.labone_version,
+        module_nodedocs=entry.module_nodedocs,
+        server_port=entry.server_port,
+        hf2=entry.hf2,
+    )
+    with offline_session(server) as session:
+        yield session
+
+
+def _discover(
+    entry: DeviceEntry,
+) -> t.Tuple[t.Optional[t.Tuple], GenerationResult]:
+    """Discover the driver group of a device.
+
+    Devices of the same data server, LabOne version, device type and options
+    share a driver. Offline entries specify them. Live devices are connected
+    on the data server and only their features are read, their nodes are not
+    listed.
+
+    Args:
+        entry: Device entry.
+
+    Returns:
+        Hashable key of the driver group (None if the discovery failed) and
+        the result of the discovery.
+    """
+    start = time.perf_counter()
+    try:
+        if entry.nodedoc is not None:
+            if not entry.device_type:
+                raise ValueError(f"{entry.device_id}: nodedoc requires a device_type.")
+            device_type, options = entry.device_type, entry.options
+            labone_version = entry.labone_version
+        else:
+            session = Session(
+                server_host=entry.server_host,
+                server_port=entry.server_port,
+                hf2=entry.hf2,
+            )
+            serial = entry.device_id.lower()
+            session.daq_server.connectDevice(
+                serial,
+                entry.interface
+                or device_interface(session.daq_server, serial, session.is_hf2_server),
+            )
+            device_type = session.daq_server.getString(f"/{serial}/features/devtype")
+            try:
+                options = session.daq_server.getString(f"/{serial}/features/options")
+            except RuntimeError:
+                options = ""
+            labone_version = session.daq_server.getString("/zi/about/version")
+    except Exception as error:  # pylint: disable=broad-except
+        return None, GenerationResult(
+            entry.device_id.upper(),
+            time.perf_counter() - start,
+            [],
+            [],
+            error=str(error),
+        )
+    key = server_key(entry) + (labone_version, device_type.upper(), options)
+    return key, GenerationResult(
+        entry.device_id.upper(),
+        time.perf_counter() - start,
+        [],
+        [],
+        device_type=device_type,
+    )
+
+
+Rendered = t.Dict[str, t.Tuple[str, t.Dict[str, str]]]
+
+
+def _render_device(
+    entry: DeviceEntry, mode: str, driver_directory: str
+) -> t.Tuple[GenerationResult, Rendered]:
+    """Render the driver of a single device if it is not up to date.
+
+    Args:
+        entry: Device entry.
+        mode: Driver mode. `NORMAL` | `ADVANCED`.
+        driver_directory: Base directory for generated driver files.
+
+    Returns:
+        Result of the generation and the rendered drivers.
+    """
+    start = time.perf_counter()
+    try:
+        with _connection(entry) as session:
+            check_compatibility(session)
+            device = session.connect_device(entry.device_id, interface=entry.interface)
+            settings = open_settings_file()
+            rendered = render_outdated_files(
+                [DeviceConfig(device, session, settings, mode)],
+                settings,
+                open_manifest(driver_directory),
+            )
+            device_type = device.device_type
+    except Exception as error:  # pylint: disable=broad-except
+        return (
+            GenerationResult(
+                entry.device_id.upper(),
+                time.perf_counter() - start,
+                [],
+                [],
+                error=str(error),
+            ),
+            {},
+        )
+    result = GenerationResult(
+        entry.device_id.upper(),
+        time.perf_counter() - start,
+        [],
+        [],
+        device_type=device_type,
+    )
+    return result, rendered
+
+
+def _render_server(
+    entry: DeviceEntry, modules: t.List[str], mode: str, driver_directory: str
+) -> t.Tuple[GenerationResult, Rendered]:
+    """Render the DataServer and module drivers of a data server.
+
+    Only drivers that are not up to date are rendered.
+
+    Args:
+        entry: Device entry of a device on the data server.
+        modules: Toolkit modules to render.
+        mode: Driver mode. `NORMAL` | `ADVANCED`.
+        driver_directory: Base directory for generated driver files.
+
+    Returns:
+        Result of the generation and the rendered drivers.
+    """
+    name = f"DataServer {entry.server_host}"
+    if entry.server_port:
+        name += f":{entry.server_port}"
+    start = time.perf_counter()
+    try:
+        with _connection(entry) as session:
+            settings = open_settings_file()
+            configs = [DataServerConfig(session, settings, mode)]
+            configs += [
+                ModuleConfig(module, session, settings, mode) for module in modules
+            ]
+            rendered = render_outdated_files(
+                configs, settings, open_manifest(driver_directory)
+            )
+    except Exception as error:  # pylint: disable=broad-except
+        return (
+            GenerationResult(
+                name, time.perf_counter() - start, [], [], error=str(error)
+            ),
+            {},
+        )
+    return GenerationResult(name, time.perf_counter() - start, [], []), rendered
+
+
+def _run(
+    function: t.Callable,
+    jobs: t.List[t.Tuple],
+    executor: t.Optional[ProcessPoolExecutor],
+    driver_directory: str,
+    manifest: Manifest,
+    upgrade: bool,
+    written: t.Set[str],
+) -> t.List[GenerationResult]:
+    """Render the jobs and write their files.
+
+    Drivers that were already written by a previous job are skipped.
+
+    Args:
+        function: Function that renders the files of a job.
+        jobs: Arguments of the jobs.
+        executor: Process pool. None renders the jobs in the current process.
+        driver_directory: Base directory for generated driver files.
+        manifest: Manifest of the driver directory. Updated in place.
+        upgrade: Overwrite existing drivers
+        written: Drivers that were already written. Updated in place.
+
+    Returns:
+        Results in the order of the jobs.
+    """
+    if executor is None or len(jobs) <= 1:
+        rendered = [function(*job) for job in jobs]
+    else:
+        rendered = list(executor.map(function, *zip(*jobs)))
+    results = []
+    for result, drivers in rendered:
+        drivers = {
+            name: driver for name, driver in drivers.items() if name not in written
+        }
+        written.update(drivers)
+        created, upgraded = write_outdated_files(
+            drivers, driver_directory, manifest, upgrade
+        )
+        results.append(result._replace(created=created, upgraded=upgraded))
+    return results
+
+
+def generate_labber_files_batch(
+    driver_directory: str,
+    mode: str,
+    devices: t.List[DeviceEntry],
+    upgrade: bool = False,
+    max_workers: t.Optional[int] = None,
+) -> t.List[GenerationResult]:
+    """Generate Labber files for multiple devices.
+
+    The device drivers are generated in a process pool. The DataServer and
+    module drivers are generated once per data server afterwards, with the
+    modules required by all its devices. Devices of the same data server,
+    LabOne version, type and options share a driver, which is rendered from one
+    of them. Failing devices do not stop the generation of the others, their
+    error is part of the result.
+
+    Args:
+        driver_directory: Base directory for generated driver files.
+        mode: Driver mode. `NORMAL` | `ADVANCED`.
+        devices: Devices for which the drivers are generated.
+        upgrade: Overwrite existing drivers
+        max_workers: Number of processes. Defaults to the number of CPUs.
+            1 generates all drivers in the current process.
+
+    Returns:
+        Result per device, per data server and of the static drivers.
+    """
+    written: t.Set[str] = set()
+    settings = open_settings_file()
+    manifest = open_manifest(driver_directory)
+    with contextlib.ExitStack() as stack:
+        executor = None
+        if max_workers != 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers))
+        if executor is None or len(devices) <= 1:
+            discovered = [_discover(entry) for entry in devices]
+        else:
+            discovered = list(executor.map(_discover, devices))
+        results = [result for _, result in discovered]
+        groups: t.Dict[t.Tuple, t.List[int]] = {}
+        for index, (key, _) in enumerate(discovered):
+            if key is not None:
+                groups.setdefault(key, []).append(index)
+        # One device per group is rendered. The next one is only rendered if
+        # it failed.
+        while groups:
+            indexes = [group.pop(0) for group in groups.values()]
+            rendered = _run(
+                _render_device,
+                [(devices[index], mode, driver_directory) for index in indexes],
+                executor,
+                driver_directory,
+                manifest,
+                upgrade,
+                written,
+            )
+            for index, result in zip(indexes, rendered):
+                results[index] = result._replace(
+                    duration=results[index].duration + result.duration
+                )
+            groups = {
+                key: group
+                for (key, group), result in zip(groups.items(), rendered)
+                if group and result.error is not None
+            }
+        servers: t.Dict[t.Tuple, t.Tuple[DeviceEntry, t.List[str]]] = {}
+        for entry, result in zip(devices, results):
+            if result.error is not None:
+                continue
+            _, modules = servers.setdefault(server_key(entry), (entry, []))
+            # TODO: When hf2 option enabled:
+            # RuntimeError: Unsupported API level for specified server
+            if entry.hf2:
+                continue
+            for module in module_names(settings, result.device_type):
+                if module not in modules:
+                    modules.append(module)
+        results += _run(
+            _render_server,
+            [
+                (entry, modules, mode, driver_directory)
+                for entry, modules in servers.values()
+            ],
+            executor,
+            driver_directory,
+            manifest,
+            upgrade,
+            written,
+        )
+    manifest.save()
+    start = time.perf_counter()
+    created, upgraded = copy_static_files(driver_directory)
+    results.append(
+        GenerationResult(
+            "Static drivers", time.perf_counter() - start, created, upgraded
+        )
+    )
+    return results
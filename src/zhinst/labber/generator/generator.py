@@ -1,24 +1,26 @@
 import configparser
-import fnmatch
+import io
 import json
+import re
+import shutil
 import typing as t
+import warnings
 from collections import OrderedDict
-from distutils.dir_util import copy_tree
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 import natsort
 
 from zhinst.labber import __version__
 from zhinst.labber.code_generator.drivers import generate_labber_device_driver_code
+from zhinst.labber.driver.metadata import render_metadata, settings_size
 from zhinst.labber.helper import check_compatibility
 from zhinst.labber.generator.conf import LabberConfiguration
-from zhinst.labber.generator.helpers import (
-    delete_device_from_node_path,
-    match_in_dict_keys,
-    match_in_list,
-)
+from zhinst.labber.generator.helpers import PatternSet, delete_device_from_node_path
+from zhinst.labber.generator.ini import write_ini
+from zhinst.labber.generator.manifest import Manifest, content_hash, file_hash
 from zhinst.labber.generator.quants import NodeQuant, Quant, QuantGenerator
 from zhinst.labber.helper import check_compatibility
+from zhinst.labber.offline_server import FakeDataServer, offline_session
 from zhinst.toolkit import Session
 from zhinst.toolkit.nodetree import Node
 
@@ -39,21 +41,28 @@ class LabberConfig:
 
     def __init__(self, root: Node, name: str, env_settings: dict, mode="NORMAL"):
         self._root = root
+        self._mode = mode
         self._env_settings = LabberConfiguration(name, mode, env_settings)
         self._quant_gen = QuantGenerator(list(root._root.raw_dict.keys()))
         self._tk_name = name
         self._name = name
         self._general_settings = {}
         self._settings = {}
+        self._ignored_nodes = PatternSet(self._env_settings.ignored_nodes)
+        self._settings_quants = PatternSet(self._env_settings.quants)
+        self._quant_sections = PatternSet(self._env_settings.quant_sections)
+        self._quant_groups = PatternSet(
+            self._env_settings.quant_groups, lambda pattern: pattern.replace("<n>", "*")
+        )
 
     def _update_section(self, quant: str, defs: t.Dict) -> t.Dict:
         """Update quant section.
 
         Returns:
             Defs with updated section from `env_settings`."""
-        _, section = match_in_dict_keys(quant, self.env_settings.quant_sections)
-        if section:
-            defs["section"] = section
+        pattern = self._quant_sections.match(quant)
+        if pattern is not None and self.env_settings.quant_sections[pattern]:
+            defs["section"] = self.env_settings.quant_sections[pattern]
         return defs
 
     def _update_group(self, quant: str, defs: t.Dict) -> t.Dict:
@@ -71,17 +80,13 @@ class LabberConfig:
         Returns:
             Defs with updated group key from `env_settings`.
         """
-        indexes = [part for part in quant.split("/") if part.isnumeric()]
-        for pattern, group in self.env_settings.quant_groups.copy().items():
-            pattern = pattern.replace("<n>", "*")
-            r = fnmatch.fnmatch(
-                quant.strip("/").lower(), f"{pattern.strip('/').lower()}*"
-            )
-            if r:
-                cnt = group.count("<n>")
-                path = group.replace("<n>", "{}")
-                defs["group"] = path.format(*[indexes[idx] for idx in range(cnt)])
-                break
+        pattern = self._quant_groups.match(quant)
+        if pattern is not None:
+            indexes = [part for part in quant.split("/") if part.isnumeric()]
+            group = self.env_settings.quant_groups[pattern]
+            cnt = group.count("<n>")
+            path = group.replace("<n>", "{}")
+            defs["group"] = path.format(*[indexes[idx] for idx in range(cnt)])
         return defs
 
     def _generate_node_quants(self) -> t.Dict:
@@ -92,10 +97,7 @@ class LabberConfig:
         """
         quants = {}
         for info in self._root._root.raw_dict.values():
-            if match_in_list(
-                delete_device_from_node_path(info["Node"]),
-                self.env_settings.ignored_nodes,
-            ):
+            if self._ignored_nodes.match(delete_device_from_node_path(info["Node"])):
                 continue
             try:
                 sec = NodeQuant(info)
@@ -115,10 +117,9 @@ class LabberConfig:
         # Added nodes from configuration if the node exists but is not available
         custom_quants = self.env_settings.quants.copy()
         for node_quant, node_defs in nodes.copy().items():
-            settings_quant, settings_defs = match_in_dict_keys(
-                node_quant, self.env_settings.quants
-            )
+            settings_quant = self._settings_quants.match(node_quant)
             if settings_quant:
+                settings_defs = self.env_settings.quants[settings_quant]
                 [
                     nodes[node_quant].pop(node_defs, None)
                     for conf in settings_defs["conf"].values()
@@ -151,13 +152,60 @@ class LabberConfig:
                     nodes.update(Quant(path, self._update_group(path, conf)).as_dict())
         return nodes
 
+    def input_hash(self) -> str:
+        """Hash of the inputs of the generated files.
+
+        The inputs are the available nodes, the driver settings and the
+        general settings (which include the LabOne, package and settings file
+        version). Device serials are removed from the node paths, since they
+        are not part of the generated files.
+
+        Returns:
+            Hex digest of the inputs.
+        """
+        data = json.dumps(
+            [
+                self.name,
+                self._mode.upper(),
+                list(self._root._root.raw_dict.values()),
+                self.settings,
+                self.general_settings,
+            ],
+            sort_keys=True,
+            # toolkit adds parser functions to the node info
+            default=lambda _: None,
+        )
+        return content_hash(re.sub(r"/DEV\d+", "", data, flags=re.IGNORECASE))
+
     def generated_code(self) -> str:
         """Generated labber code
 
         Returns:
             Labber driver code for the current object.
         """
-        return generate_labber_device_driver_code(self._name, self.settings_filename)
+        return generate_labber_device_driver_code(
+            self._name, self.settings_filename, self.metadata_filename
+        )
+
+    def metadata(self, config: t.Dict[str, t.Dict], delim: str) -> str:
+        """Quant metadata module of the driver.
+
+        Args:
+            config: Labber configuration of the driver (see `config`).
+            delim: Delimiter of the Labber quant names.
+
+        Returns:
+            Content of the metadata module.
+        """
+        instrument = self.settings["instrument"]
+        return render_metadata(
+            self.env_settings.json_settings,
+            instrument.get("base_type", ""),
+            instrument.get("type", ""),
+            (_driver_node_path(title, delim) for title in config),
+            self.name,
+            settings_size(SETTINGS_FILE),
+        )
 
     def config(self) -> t.Dict[str, t.Dict]:
         """Labber configuration as a Python dictionary.
@@ -180,6 +228,11 @@ class LabberConfig:
         """Settings filename."""
         return "settings.json"
 
+    @property
+    def metadata_filename(self) -> str:
+        """Quant metadata filename."""
+        return "quant_metadata.py"
+
     @property
     def name(self) -> str:
         """Name of the config driver."""
@@ -319,25 +372,110 @@ def _path_to_labber_section(path: str, delim: str) -> str:
     return path.strip("/").replace("/", delim)
 
 
+def _to_title_keep_uppercase(s: str) -> str:
+    """Title a lowercase string, keep other strings as they are."""
+    if s.islower():
+        return s.title()
+    return s
+
+
+def _section_buckets(
+    data: t.Mapping[str, dict], order: t.Dict[str, t.List[str]]
+) -> t.List[t.List[str]]:
+    """Bucket the quants by their section in a single pass.
+
+    The buckets are in the order of `order["sections"]`, followed by a bucket
+    for the quants of all other sections. The order of the quants within a
+    bucket is preserved.
+
+    Returns:
+        Quant names per bucket.
+    """
+    if "sections" not in order:
+        return [list(data)]
+    positions: t.Dict[str, int] = {}
+    for section in order["sections"]:
+        positions.setdefault(section.lower(), len(positions))
+    buckets: t.List[t.List[str]] = [[] for _ in range(len(positions) + 1)]
+    for key, value in data.items():
+        buckets[positions.get(value.get("section", "").lower(), -1)].append(key)
+    return buckets
+
+
 def order_labber_config(
     data: OrderedDict, order: t.Dict[str, t.List[str]]
 ) -> OrderedDict:
-    data = data.copy()
-    data_ = OrderedDict()
-    if not "sections" in order:
-        return data
-    while data:
-        for section in order["sections"]:
-            r = {
-                k: v
-                for k, v in data.items()
-                if v.get("section", "").lower() == section.lower()
-            }
-            data_.update(r)
-            [data.pop(k) for k in r.keys()]
-        data_.update(data)
-        data.clear()
-    return data_
+    """Order the quants by the order of their sections.
+
+    Quants of sections that are not in `order["sections"]` are placed at the
+    end.
+
+    Returns:
+        Ordered data
+    """
+    if "sections" not in order:
+        return data.copy()
+    return OrderedDict(
+        (key, data[key]) for bucket in _section_buckets(data, order) for key in bucket
+    )
+
+
+def _format_quant(quant: dict, delim: str) -> t.Dict[str, str]:
+    """Format the entries of a quant into Labber format.
+
+    Returns:
+        Formatted entries
+    """
+    formatted = {}
+    for key, value in quant.items():
+        if key.lower() == "permission":
+            continue
+        if key not in ("set_cmd", "get_cmd", "tooltip", "datatype"):
+            key = _path_to_labber_section(str(key), delim)
+            value = _path_to_labber_section(str(value), delim)
+        if key.lower() in ("label", "group", "section"):
+            key = _to_title_keep_uppercase(key)
+            value = _to_title_keep_uppercase(value)
+        formatted[key] = value
+    return formatted
+
+
+def _labber_section(title: str, delim: str) -> str:
+    """Labber section of a quant.
+
+    Returns:
+        Section title in Labber format.
+    """
+    title_ = str(title)
+    if not title == "General settings":
+        title_ = _to_title_keep_uppercase(title_)
+    return _path_to_labber_section(title_, delim)
+
+
+def _driver_node_path(title: str, delim: str) -> str:
+    """Node path of a quant as used by the driver.
+
+    Returns:
+        Lowercase node path of the Labber section of the quant.
+    """
+    parts = PurePosixPath("/", *_labber_section(title, delim).lower().split(delim))
+    return "/" + "/".join(parts.parts[1:])
+
+
+def iter_labber_format(
+    data: dict, delim: str, order: t.Dict[str, t.List[str]]
+) -> t.Iterator[t.Tuple[str, t.Dict[str, str]]]:
+    """Iterate over the data in Labber format.
+
+    The quants are bucketed by section, naturally sorted within their bucket
+    and formatted one at a time.
+
+    Yields:
+        Formatted title and entries of each quant.
+    """
+    for bucket in _section_buckets(data, order):
+        for title in natsort.natsorted(bucket):
+            yield _labber_section(title, delim), _format_quant(data[title], delim)
 
 
 def conf_to_labber_format(
@@ -352,35 +490,7 @@ def conf_to_labber_format(
     Returns:
         Formatted data
     """
-
-    def _to_title_keep_uppercase(s: str) -> str:
-        if s.islower():
-            return s.title()
-        return s
-
-    sorted_keys = natsort.natsorted(list(data.keys()))
-    data = OrderedDict({k: data[k] for k in sorted_keys}.items())
-    data = order_labber_config(data, order)
-
-    for title, quant in data.copy().items():
-        title_ = str(title)
-        if not title == "General settings":
-            title_ = _to_title_keep_uppercase(title_)
-        title_ = _path_to_labber_section(title_, delim)
-
-        data.pop(title, None)
-        data[title_] = {}
-        for key, value in quant.items():
-            if key.lower() == "permission":
-                continue
-            if key not in ["set_cmd", "get_cmd", "tooltip", "datatype"]:
-                key = _path_to_labber_section(str(key), delim)
-                value = _path_to_labber_section(str(value), delim)
-            if key.lower() in ["label", "group", "section"]:
-                key = _to_title_keep_uppercase(key)
-                value = _to_title_keep_uppercase(value)
-            data[title_].update({key: value})
-    return data
+    return OrderedDict(iter_labber_format(data, delim, order))
 
 
 def dict_to_config(
@@ -393,8 +503,7 @@ def dict_to_config(
 
     The data will be formatted and then set as config sections.
     """
-    data = conf_to_labber_format(data, delim, order)
-    for title, items in data.items():
+    for title, items in iter_labber_format(data, delim, order):
         config.add_section(title)
         for name, value in items.items():
             config.set(title, name, value)
@@ -420,22 +529,22 @@ class Filehandler:
     def write_to_file(self, path: Path, filehandler: t.Callable) -> None:
         """Write to file.
 
+        The content is rendered in memory first. Existing files are only
+        overwritten if the content changed.
+
         Args:
             path: Filepath
             filehandler: Handler to be called for saving the file
         """
-        if self._upgrade:
-            if not path.exists():
-                self._created_files.append(path)
-            else:
-                self._upgraded_files.append(path)
-            with open(path, "w", encoding="utf-8") as file:
-                filehandler(file)
-        else:
-            if not path.exists():
-                with open(path, "w", encoding="utf-8") as file:
-                    filehandler(file)
-                self._created_files.append(path)
+        content = io.StringIO()
+        filehandler(content)
+        created, upgraded = write_rendered_files(
+            {str(path.relative_to(self._root_dir.parent)): content.getvalue()},
+            str(self._root_dir.parent),
+            self._upgrade,
+        )
+        self._created_files += created
+        self._upgraded_files += upgraded
 
     def write_settings_file(self) -> None:
         """Write settings file (.*json-format)."""
@@ -447,14 +556,20 @@ class Filehandler:
     def write_config_file(self, delim: str) -> None:
         """Write configuration file (*.ini-format)."""
         path = self._root_dir / f"{self._config.name}.ini"
-        config = configparser.ConfigParser()
-        dict_to_config(
-            config,
+        sections = iter_labber_format(
             self._config.config(),
             delim=delim,
             order=self._config.env_settings.quant_order,
         )
-        self.write_to_file(path, lambda x: config.write(x))
+        self.write_to_file(path, lambda x: write_ini(x, sections))
+
+    def write_metadata_file(self, delim: str) -> None:
+        """Write quant metadata module (*.py-format)."""
+        path = self._root_dir / self._config.metadata_filename
+        config = self._config.config()
+        self.write_to_file(
+            path, lambda x: x.write(self._config.metadata(config, delim))
+        )
 
     def write_python_driver(self) -> None:
         """Write Python driver file (*.py-format)."""
@@ -472,17 +587,217 @@ class Filehandler:
         return self._created_files
 
 
+# Toolkit modules and the data server function that creates the LabOne module
+MODULE_FACTORIES = {"daq": "dataAcquisitionModule", "sweeper": "sweep"}
+
+
+SETTINGS_FILE = Path(__file__).parent.parent / "resources/settings.json"
+
+
 def open_settings_file() -> dict:
     """Open settings file.
 
     Returns:
         Contents of the opened settings file.
     """
-    settings_file = Path(__file__).parent.parent / "resources/settings.json"
-    with open(settings_file, "r") as json_f:
+    with open(SETTINGS_FILE, "r") as json_f:
         return json.load(json_f)
 
 
+def open_manifest(driver_directory: str) -> Manifest:
+    """Open the manifest of a driver directory.
+
+    Args:
+        driver_directory: Base directory for generated driver files.
+
+    Returns:
+        Manifest for the current settings file.
+    """
+    return Manifest(driver_directory, file_hash(SETTINGS_FILE))
+
+
+def module_names(settings: dict, device_type: str) -> t.List[str]:
+    """Toolkit modules that are generated for a device type.
+
+    Args:
+        settings: Contents of the settings file.
+        device_type: Device type. (e.g: SHFQA4)
+
+    Returns:
+        Names of the toolkit modules.
+    """
+    modules: t.List[str] = settings["misc"]["ziModules"].copy()
+    if "SHF" not in device_type:
+        modules.remove("shfqa_sweeper")
+    else:
+        modules.remove("sweeper")
+    return modules
+
+
+def render_labber_files(config: LabberConfig, settings: dict) -> t.Dict[str, str]:
+    """Render the Labber files of a configuration in memory.
+
+    Args:
+        config: Labber configuration.
+        settings: Contents of the settings file.
+
+    Returns:
+        Content of the files by their path relative to the driver directory.
+    """
+    data = config.config()
+    delim = settings["misc"]["labberDelimiter"]
+    ini_file = io.StringIO()
+    write_ini(
+        ini_file,
+        iter_labber_format(data, delim=delim, order=config.env_settings.quant_order),
+    )
+    return {
+        f"{config.name}/{config.name}.ini": ini_file.getvalue(),
+        f"{config.name}/{config.name}.py": config.generated_code(),
+        f"{config.name}/{config.metadata_filename}": config.metadata(data, delim),
+        f"{config.name}/{config.settings_filename}": json.dumps(
+            config.settings, indent=2
+        ),
+    }
+
+
+def write_rendered_files(
+    files: t.Dict[str, str], driver_directory: str, upgrade: bool = False
+) -> t.Tuple[t.List[Path], t.List[Path]]:
+    """Write rendered files.
+
+    Existing files are only overwritten if `upgrade` is enabled and their
+    content changed.
+
+    Args:
+        files: Content of the files by their path relative to the driver
+            directory.
+        driver_directory: Base directory for generated driver files.
+        upgrade: Overwrite existing drivers
+
+    Returns:
+        Created and upgraded files.
+    """
+    created_files = []
+    upgraded_files = []
+    for name, content in files.items():
+        path = Path(driver_directory) / name
+        if path.exists():
+            if not upgrade or file_hash(path) == content_hash(content):
+                continue
+            upgraded_files.append(path)
+        else:
+            path.parent.mkdir(exist_ok=True)
+            created_files.append(path)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+    return created_files, upgraded_files
+
+
+def render_outdated_files(
+    configs: t.List[LabberConfig], settings: dict, manifest: Manifest
+) -> t.Dict[str, t.Tuple[str, t.Dict[str, str]]]:
+    """Render the configurations that are not up to date.
+
+    Args:
+        configs: Labber configurations.
+        settings: Contents of the settings file.
+        manifest: Manifest of the driver directory.
+
+    Returns:
+        Input hash and rendered files by configuration name.
+    """
+    rendered = {}
+    for config in configs:
+        input_hash = config.input_hash()
+        if not manifest.is_current(config.name, input_hash):
+            rendered[config.name] = (input_hash, render_labber_files(config, settings))
+    return rendered
+
+
+def write_outdated_files(
+    rendered: t.Dict[str, t.Tuple[str, t.Dict[str, str]]],
+    driver_directory: str,
+    manifest: Manifest,
+    upgrade: bool = False,
+) -> t.Tuple[t.List[Path], t.List[Path]]:
+    """Write rendered configurations and update the manifest.
+
+    Args:
+        rendered: Input hash and rendered files by configuration name.
+        driver_directory: Base directory for generated driver files.
+        manifest: Manifest of the driver directory.
+        upgrade: Overwrite existing drivers
+
+    Returns:
+        Created and upgraded files.
+    """
+    created_files = []
+    upgraded_files = []
+    for name, (input_hash, files) in rendered.items():
+        created, upgraded = write_rendered_files(files, driver_directory, upgrade)
+        created_files += created
+        upgraded_files += upgraded
+        manifest.update(name, input_hash, files)
+    return created_files, upgraded_files
+
+
+def write_labber_files(
+    configs: t.List[LabberConfig],
+    driver_directory: str,
+    settings: dict,
+    upgrade: bool = False,
+) -> t.Tuple[t.List[Path], t.List[Path]]:
+    """Write the Labber files of the configurations.
+
+    Configurations whose inputs and files did not change since the last
+    generation are skipped.
+
+    Args:
+        configs: Labber configurations.
+        driver_directory: Base directory for generated driver files.
+        settings: Contents of the settings file.
+        upgrade: Overwrite existing drivers
+
+    Returns:
+        Created and upgraded files.
+    """
+    manifest = open_manifest(driver_directory)
+    rendered = render_outdated_files(configs, settings, manifest)
+    files = write_outdated_files(rendered, driver_directory, manifest, upgrade)
+    manifest.save()
+    return files
+
+
+def copy_static_files(driver_directory: str) -> t.Tuple[t.List[Path], t.List[Path]]:
+    """Copy the static drivers.
+
+    Only files that do not exist or whose content changed are copied.
+
+    Args:
+        driver_directory: Base directory for generated driver files.
+
+    Returns:
+        Created and upgraded files.
+    """
+    generated_files = []
+    upgraded_files = []
+    static_dir = (Path(__file__).parents[1] / "static_drivers").absolute()
+    for static_file in sorted(static_dir.rglob("*")):
+        if not static_file.is_file() or "__pycache__" in static_file.parts:
+            continue
+        path = Path(driver_directory) / static_file.relative_to(static_dir)
+        if path.exists():
+            if path.read_bytes() == static_file.read_bytes():
+                continue
+            upgraded_files.append(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            generated_files.append(path)
+        shutil.copyfile(static_file, path)
+    return generated_files, upgraded_files
+
+
 def generate_labber_files(
     driver_directory: str,
     mode: str,
@@ -508,12 +823,37 @@ def generate_labber_files(
         hf2: If the device is HF2.
     """
     session = Session(server_host=server_host, server_port=server_port, hf2=hf2)
+    return _generate_session_files(
+        session, driver_directory, mode, device_id, interface, upgrade, hf2
+    )
+
+
+def _generate_session_files(
+    session: Session,
+    driver_directory: str,
+    mode: str,
+    device_id: str,
+    interface: t.Optional[str],
+    upgrade: bool,
+    hf2: t.Optional[bool],
+):
+    """Generate Labber files for a device on the data server of a session.
+
+    Args:
+        session: Toolkit session.
+        driver_directory: Base directory for generated driver files.
+        mode: Driver mode. `NORMAL` | `ADVANCED`.
+        device_id: Zurich Instruments device ID. (e.g: dev1234)
+        interface: Interface the device should be connected to.
+        upgrade: Overwrite existing drivers
+        hf2: If the device is HF2.
+
+    Returns:
+        Created and upgraded files.
+    """
     check_compatibility(session)
     dev = session.connect_device(device_id, interface=interface)
 
-    # Files generated to echo
-    generated_files = []
-    upgraded_files = []
     # Settings file
     json_settings = open_settings_file()
 
@@ -525,29 +865,143 @@ def generate_labber_files(
     # TODO: When hf2 option enabled:
     # RuntimeError: Unsupported API level for specified server
     if not hf2:
-        modules: t.List[str] = json_settings["misc"]["ziModules"].copy()
-        if "SHF" not in dev.device_type:
-            modules.remove("shfqa_sweeper")
-        else:
-            modules.remove("sweeper")
-        configs += [ModuleConfig(mod, session, json_settings, mode) for mod in modules]
-    for config in configs:
-        filegen = Filehandler(config, root_dir=driver_directory, upgrade=upgrade)
-        filegen.write_config_file(delim=json_settings["misc"]["labberDelimiter"])
-        filegen.write_python_driver()
-        filegen.write_settings_file()
-        generated_files += filegen.created_files
-        upgraded_files += filegen.upgraded_files
-
-    # static files
-    existing_files = [path for path in Path(driver_directory).rglob("*")]
-    static_files = copy_tree(
-        (Path(__file__).parents[1] / "static_drivers").absolute(), driver_directory
+        configs += [
+            ModuleConfig(mod, session, json_settings, mode)
+            for mod in module_names(json_settings, dev.device_type)
+        ]
+    # Files generated to echo
+    generated_files, upgraded_files = write_labber_files(
+        configs, driver_directory, json_settings, upgrade
     )
-    for static_file in static_files:
-        if Path(static_file) in existing_files:
-            upgraded_files.append(Path(static_file))
-        else:
-            generated_files.append(Path(static_file))
+    generated, upgraded = copy_static_files(driver_directory)
+    return generated_files + generated, upgraded_files + upgraded
 
-    return generated_files, upgraded_files
+
+def create_offline_server(
+    device_id: str,
+    nodedoc: t.Union[str, Path],
+    device_type: str,
+    server_host: str = "localhost",
+    options: str = "",
+    labone_version: str = "24.10",
+    module_nodedocs: t.Optional[t.Dict[str, t.Union[str, Path]]] = None,
+    server_port: t.Optional[int] = None,
+    hf2: bool = False,
+) -> FakeDataServer:
+    """Create a fake data server that serves a saved node documentation.
+
+    Args:
+        device_id: Zurich Instruments device ID. (e.g: dev1234)
+        nodedoc: Path to the node documentation JSON of the device.
+        device_type: Device type. (e.g: SHFQA4)
+        server_host: DataServer host the generated drivers connect to.
+        options: Device options separated by a new line.
+        labone_version: LabOne version of the data server.
+        module_nodedocs: Path to the node documentation JSON per module.
+            (e.g: {"daq": "nodedoc_daq.json"}).
+        server_port: DataServer port the generated drivers connect to.
+        hf2: If the device is HF2.
+
+    Returns:
+        Fake data server with the device.
+
+    Raises:
+        ValueError: If a module has no corresponding LabOne module.
+    """
+    factory_nodedocs = {}
+    for module, module_nodedoc in (module_nodedocs or {}).items():
+        if module not in MODULE_FACTORIES:
+            raise ValueError(
+                f"Unknown module {module}. "
+                f"Available modules: {', '.join(MODULE_FACTORIES)}"
+            )
+        factory_nodedocs[MODULE_FACTORIES[module]] = Path(module_nodedoc)
+    # Same port resolution as the toolkit session
+    port = server_port if server_port else 8004
+    if hf2 and port == 8004:
+        port = 8005
+    server = FakeDataServer(
+        server_host,
+        port,
+        hf2=hf2,
+        module_nodedocs=factory_nodedocs,
+        version=labone_version,
+    )
+    server.add_device(device_id, Path(nodedoc), device_type.upper(), options=options)
+    return server
+
+
+def generate_labber_files_offline(
+    driver_directory: str,
+    mode: str,
+    device_id: str,
+    nodedoc: t.Union[str, Path],
+    device_type: str,
+    server_host: str = "localhost",
+    options: str = "",
+    labone_version: str = "24.10",
+    module_nodedocs: t.Optional[t.Dict[str, t.Union[str, Path]]] = None,
+    upgrade: bool = False,
+    server_port: t.Optional[int] = None,
+    hf2: bool = False,
+):
+    """Generate Labber files from a saved node documentation.
+
+    No data server or device is needed. The node documentation (the output
+    of ``listNodesJSON``) is served by a fake data server, so the generated
+    files are the same as the ones generated with a live device of the same
+    type, options and LabOne version.
+
+    Args:
+        driver_directory: Base directory for generated driver files.
+        mode: Driver mode. `NORMAL` | `ADVANCED`.
+        device_id: Zurich Instruments device ID. (e.g: dev1234)
+        nodedoc: Path to the node documentation JSON of the device.
+        device_type: Device type. (e.g: SHFQA4)
+        server_host: DataServer host the generated drivers connect to.
+        options: Device options separated by a new line.
+        labone_version: LabOne version of the data server.
+        module_nodedocs: Path to the node documentation JSON per module.
+            (e.g: {"daq": "nodedoc_daq.json"}). Modules without node
+            documentation only contain the quants of the settings file.
+        upgrade: Overwrite existing drivers
+        server_port: DataServer port the generated drivers connect to.
+        hf2: If the device is HF2.
+
+    Raises:
+        ValueError: If a module has no corresponding LabOne module.
+
+    Warns:
+        UserWarning: If module drivers are generated for modules without node
+            documentation. They differ from the ones generated with a live
+            data server.
+    """
+    server = create_offline_server(
+        device_id,
+        nodedoc,
+        device_type,
+        server_host=server_host,
+        options=options,
+        labone_version=labone_version,
+        module_nodedocs=module_nodedocs,
+        server_port=server_port,
+        hf2=hf2,
+    )
+    if not hf2:
+        missing = [
+            module
+            for module in module_names(open_settings_file(), device_type.upper())
+            if module in MODULE_FACTORIES and module not in (module_nodedocs or {})
+        ]
+        if missing:
+            warnings.warn(
+                f"No node documentation for the module(s) {', '.join(missing)}. "
+                "Their drivers only contain the quants of the settings file and "
+                "differ from the ones generated with a live data server.",
+                UserWarning,
+                stacklevel=2,
+            )
+    with offline_session(server) as session:
+        return _generate_session_files(
+            session, driver_directory, mode, device_id, None, upgrade, hf2
+        )
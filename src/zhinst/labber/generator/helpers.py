@@ -1,4 +1,5 @@
 import fnmatch
+import functools
 import re
 import typing as t
 
@@ -69,6 +70,56 @@ def delete_device_from_node_path(path: str) -> str:
     return re.sub(r"/DEV(\d+)", "", path.upper())[0:]
 
 
+class PatternSet:
+    """Precompiled set of wildcard patterns.
+
+    All patterns are combined into a single regular expression. A target
+    matches a pattern if it matches ``<pattern>*``. The comparison is case
+    insensitive and ignores leading and trailing slashes. If multiple patterns
+    match the first one wins.
+
+    Args:
+        patterns: Wildcard patterns (fnmatch syntax).
+        normalize: Function that is applied to each pattern before it is
+            compiled (e.g. to replace placeholders with wildcards).
+    """
+
+    def __init__(
+        self,
+        patterns: t.Iterable[str],
+        normalize: t.Optional[t.Callable[[str], str]] = None,
+    ):
+        self.patterns = list(patterns)
+        expressions = []
+        for idx, pattern in enumerate(self.patterns):
+            pattern = normalize(pattern) if normalize else pattern
+            expression = fnmatch.translate(f"{pattern.strip('/').lower()}*")
+            expressions.append(f"(?P<p{idx}>{expression})")
+        self._regex = re.compile("|".join(expressions)) if expressions else None
+
+    def match(self, target: str) -> t.Optional[str]:
+        """First pattern that matches the target.
+
+        Args:
+            target: Target path.
+
+        Returns:
+            Matching pattern or None if no pattern matches.
+        """
+        if self._regex is None:
+            return None
+        match = self._regex.match(target.strip("/").lower())
+        if match is None:
+            return None
+        return self.patterns[int(match.lastgroup[1:])]
+
+
+@functools.lru_cache(maxsize=32)
+def _pattern_set(patterns: t.Tuple[str, ...]) -> PatternSet:
+    """Cached pattern set of a tuple of patterns."""
+    return PatternSet(patterns)
+
+
 def match_in_dict_keys(target: str, data: dict) -> t.Tuple[str, t.Any]:
     """Find matches for target in data keys.
 
@@ -76,10 +127,10 @@ def match_in_dict_keys(target: str, data: dict) -> t.Tuple[str, t.Any]:
         Key, value pair of the data if the target matches a key in data.
         Otherwise empty string and None
     """
-    for k, v in data.items():
-        if fnmatch.fnmatch(target.strip("/").lower(), f"{k.strip('/').lower()}*"):
-            return k, v
-    return "", None
+    key = _pattern_set(tuple(data)).match(target)
+    if key is None:
+        return "", None
+    return key, data[key]
 
 
 def match_in_list(target: str, data: t.List[str]) -> str:
@@ -89,7 +140,5 @@ def match_in_list(target: str, data: t.List[str]) -> str:
         Item of the data where the target matches.
         Otherwise empty string.
     """
-    for item in data:
-        if fnmatch.fnmatch(target.strip("/").lower(), f"{item.strip('/').lower()}*"):
-            return item
-    return ""
+    item = _pattern_set(tuple(data)).match(target)
+    return "" if item is None else item
@@ -0,0 +1,47 @@
+"""Streaming writer for the Labber configuration files (*.ini-format).
+
+The writer produces the same output as `configparser.ConfigParser.write`
+without building the configuration in memory first. Sections are written as
+soon as they are produced.
+"""
+
+import configparser
+import typing as t
+
+_INTERPOLATION = configparser.BasicInterpolation()
+
+
+def write_ini(
+    file: t.TextIO, sections: t.Iterable[t.Tuple[str, t.Mapping[str, str]]]
+) -> None:
+    """Write sections in the format of `configparser.ConfigParser`.
+
+    Option names are converted to lowercase. If an option is defined multiple
+    times within a section, the last value is written at the position of the
+    first definition.
+
+    Args:
+        file: Text file the sections are written to.
+        sections: Title and options of each section.
+
+    Raises:
+        DuplicateSectionError: If a section is defined multiple times.
+        ValueError: If a value contains an invalid interpolation syntax.
+    """
+    titles = set()
+    for title, items in sections:
+        if title in titles:
+            raise configparser.DuplicateSectionError(title)
+        titles.add(title)
+        options: t.Dict[str, str] = {}
+        for name, value in items.items():
+            if "%" in value:
+                _INTERPOLATION.before_set(None, title, name, value)
+            options[name.lower()] = value
+        lines = [f"[{title}]\n"]
+        lines += [
+            "{} = {}\n".format(name, value.replace("\n", "\n\t"))
+            for name, value in options.items()
+        ]
+        lines.append("\n")
+        file.write("".join(lines))
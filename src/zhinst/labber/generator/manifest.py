@@ -0,0 +1,123 @@
+"""Manifest of the generated drivers.
+
+The manifest is stored in the driver directory and contains for every
+generated driver the hash of its inputs (node documentation, device and
+data server information) and the hash of every generated file. A driver whose
+inputs did not change and whose files are unchanged on disk does not need to
+be rendered again.
+
+The manifest is only valid for the manifest format, the package version and
+the settings file it was created with.
+"""
+
+import hashlib
+import json
+import typing as t
+from pathlib import Path
+
+from zhinst.labber import __version__
+
+MANIFEST_FILENAME = ".zhinst_labber_manifest.json"
+# Increase if the generated files of a driver change, existing manifests are
+# invalid afterwards.
+MANIFEST_FORMAT = 4
+
+
+def content_hash(content: str) -> str:
+    """Hash of a text file content.
+
+    Args:
+        content: Content of the file.
+
+    Returns:
+        Hex digest of the content.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def file_hash(path: Path) -> t.Optional[str]:
+    """Hash of a text file on disk.
+
+    The file is read in text mode, so the hash is the same as the hash of the
+    content it was written with.
+
+    Args:
+        path: Path of the file.
+
+    Returns:
+        Hex digest of the content or None if the file does not exist.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return content_hash(file.read())
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+class Manifest:
+    """Manifest of the drivers in a driver directory.
+
+    Args:
+        driver_directory: Base directory of the generated driver files.
+        settings_hash: Hash of the settings file used for the generation.
+    """
+
+    def __init__(self, driver_directory: t.Union[str, Path], settings_hash: str):
+        self._root = Path(driver_directory)
+        self._path = self._root / MANIFEST_FILENAME
+        self._header = {
+            "format": MANIFEST_FORMAT,
+            "version": __version__,
+            "settings": settings_hash,
+        }
+        self._drivers: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self._changed = False
+        try:
+            with open(self._path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if all(data.get(key, None) == value for key, value in self._header.items()):
+            self._drivers = data.get("drivers", {})
+
+    def is_current(self, name: str, input_hash: str) -> bool:
+        """Check if a driver is up to date.
+
+        Args:
+            name: Name of the driver.
+            input_hash: Hash of the current inputs of the driver.
+
+        Returns:
+            True if the inputs are unchanged and all files are unchanged on
+            disk.
+        """
+        entry = self._drivers.get(name, None)
+        if entry is None or entry["inputs"] != input_hash:
+            return False
+        return all(
+            file_hash(self._root / file) == digest
+            for file, digest in entry["files"].items()
+        )
+
+    def update(self, name: str, input_hash: str, files: t.Dict[str, str]) -> None:
+        """Update the entry of a driver.
+
+        Args:
+            name: Name of the driver.
+            input_hash: Hash of the inputs of the driver.
+            files: Content of the generated files by their path relative to
+                the driver directory.
+        """
+        self._drivers[name] = {
+            "inputs": input_hash,
+            "files": {file: content_hash(content) for file, content in files.items()},
+        }
+        self._changed = True
+
+    def save(self) -> None:
+        """Save the manifest if it changed."""
+        if not self._changed:
+            return
+        with open(self._path, "w", encoding="utf-8") as file:
+            json.dump({**self._header, "drivers": self._drivers}, file, indent=2)
+        self._changed = False
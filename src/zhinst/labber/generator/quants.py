@@ -1,8 +1,59 @@
+import itertools
 import re
 import typing as t
 
 from zhinst.labber.generator import helpers
 
+# Node types that require polling and are not supported by Labber
+NOT_ALLOWED_TYPES = frozenset(
+    [
+        "ZIPWAWave",
+        "ZITriggerSample",
+        "ZICntSample",
+        "ZIScopeWave",
+        "ZIAuxInSample",
+        "ZIImpedanceSample",
+    ]
+)
+# Last node path segments of nodes with a boolean value
+BOOLEAN_NODES = frozenset(
+    [
+        "enable",
+        "single",
+        "on",
+        "busy",
+        "ready",
+        "reset",
+        "preampenable",
+        "locked",
+        "keepalive",
+        "forcetrigger",
+        "triggered",
+        "endless",
+        "preview",
+        "findlevel",
+        "clearwave",
+        "clearweight",
+        "force",
+        "trigforce",
+    ]
+)
+# Last node path segments of nodes with a string value
+STRING_NODES = frozenset(["alias", "serial", "devtype", "fwrevision", "revision"])
+# Node units without a Labber unit
+NO_UNITS = frozenset(["none", "dependent", "many", "boolean"])
+# Labber datatypes of the node types
+DATATYPES = {
+    "double": "DOUBLE",
+    "string": "STRING",
+    "zivectordata": "VECTOR",
+    "ziadvisorwave": "VECTOR",
+    "zidemodsample": "COMPLEX",
+    "zidiosample": "COMPLEX",
+    "complex double": "COMPLEX",
+    "complex": "VECTOR_COMPLEX",
+}
+
 
 class Quant:
     """Quant representation of a node-like path.
@@ -12,6 +63,8 @@ class Quant:
         defs: Quant definitions in Labber format.
     """
 
+    __slots__ = ("_quant", "_quant_parts", "_defs")
+
     def __init__(self, quant: str, defs: t.Dict[str, str]):
         self._quant = quant.strip("/")
         self._quant_parts = self._quant.split("/")
@@ -37,16 +90,7 @@ class Quant:
     @property
     def group(self) -> str:
         """Quant group."""
-        path = [x for x in self._quant_parts if not x.isnumeric()]
-        if len([x for x in self._quant_parts if x.isnumeric()]) > 1:
-            idx_ = 0
-            for idx, c in enumerate(self._quant_parts):
-                if c.isnumeric():
-                    idx_ = idx
-            return "/".join(path[: idx_ - 1])
-        if len(path) > 1:
-            return "/".join(path[:-1])
-        return "/".join(path)
+        return _group(self._quant_parts)
 
     @property
     def set_cmd(self) -> str:
@@ -63,10 +107,8 @@ class Quant:
         """Quant section."""
         digit = re.search(r"\d", self._quant)
         if digit is not None:
-            digit = digit.group(0)
-            return "".join(list(self._quant)[: self._quant.find(digit) + 1])
-        else:
-            return self.title.split("/")[0]
+            return self._quant[: digit.start() + 1]
+        return self._quant_parts[0]
 
     def as_dict(self) -> t.Dict[str, t.Dict[str, str]]:
         """Quant as a Python dictionary.
@@ -76,27 +118,55 @@ class Quant:
         """
         defs = self._defs.copy()
         defs.pop("suffix", None)
-        if self.suffix:
-            label = self.title + "/" + self.suffix
+        suffix = self.suffix
+        if suffix:
+            label = self._quant + "/" + suffix
         else:
-            label = self.title
+            label = self._quant
         res = {
             "label": label,
             "group": self.group,
             "section": self.section,
-            "set_cmd": self.set_cmd,
-            "get_cmd": self.get_cmd,
+            "set_cmd": self._quant,
+            "get_cmd": self._quant,
             "permission": "WRITE",
         }
         res.update(defs)
         return {label: res}
 
 
+def _group(path_parts: t.List[str]) -> str:
+    """Group of a node path.
+
+    Node path indexes are removed from the group representation.
+
+    Args:
+        path_parts: Segments of the node path.
+
+    Returns:
+        Group of the node path.
+    """
+    path = [x for x in path_parts if not x.isnumeric()]
+    if len(path) < len(path_parts) - 1:
+        idx_ = 0
+        for idx, c in enumerate(path_parts):
+            if c.isnumeric():
+                idx_ = idx
+        return "/".join(path[: idx_ - 1])
+    if len(path) > 1:
+        return "/".join(path[:-1])
+    return "/".join(path)
+
+
 class NodeQuant:
     """Zurich instruments node information as a Labber quant.
 
     Node information is transformed into a Labber suitable format.
 
+    The permission, datatype and unit are evaluated once when the quant is
+    created. The combo definitions and the tooltip are evaluated together on
+    first access.
+
     Args:
         node_info: Node information.
 
@@ -112,6 +182,19 @@ class NodeQuant:
             }
     """
 
+    __slots__ = (
+        "_node_info",
+        "_node_path",
+        "_node_path_no_prefix",
+        "_path_parts",
+        "_properties",
+        "_permission",
+        "_datatype",
+        "_unit",
+        "_combo_defs",
+        "_tooltip",
+    )
+
     def __init__(self, node_info: t.Dict):
         self._validate_node_info(node_info)
         self._node_info = node_info
@@ -122,6 +205,11 @@ class NodeQuant:
         self._node_path_no_prefix = self._node_path.strip("/")
         self._path_parts = self._node_path_no_prefix.split("/")
         self._properties = node_info.get("Properties", "").lower()
+        self._permission = self._evaluate_permission()
+        self._datatype = self._evaluate_datatype()
+        self._unit = self._evaluate_unit()
+        self._combo_defs: t.Optional[t.Dict[str, str]] = None
+        self._tooltip: t.Optional[str] = None
 
     def _validate_node_info(self, node_info: t.Dict) -> None:
         """Validate Node info.
@@ -134,15 +222,7 @@ class NodeQuant:
         Raises:
             ValueError: Value(s) are not supported.
         """
-        not_allowed_types = [
-            "ZIPWAWave",
-            "ZITriggerSample",
-            "ZICntSample",
-            "ZIScopeWave",
-            "ZIAuxInSample",
-            "ZIImpedanceSample",
-        ]
-        if node_info.get("Type", None) in not_allowed_types:
+        if node_info.get("Type", None) in NOT_ALLOWED_TYPES:
             raise ValueError(f"Node type {node_info.get('Type', None)} not allowed.")
 
     @staticmethod
@@ -159,6 +239,70 @@ class NodeQuant:
             return v2[0].strip('"'), v[-1]
         return "", v[0]
 
+    def _evaluate_permission(self) -> str:
+        """Quant permission from the node properties."""
+        if "read" in self._properties and "write" in self._properties:
+            return "BOTH"
+        if "read" in self._properties:
+            return "READ"
+        if "write" in self._properties:
+            return "WRITE"
+        return "NONE"
+
+    def _evaluate_datatype(self) -> str:
+        """Labber datatype from the node type."""
+        unit = self._node_info.get("Type", "").lower()
+        if not unit:
+            return ""
+        if "enumerated" in unit:
+            return "COMBO"
+        name = self._path_parts[-1].lower()
+        if name in BOOLEAN_NODES:
+            return "BOOLEAN"
+        if name in STRING_NODES:
+            return "STRING"
+        if "integer" in unit:
+            return "DOUBLE"
+        return DATATYPES.get(unit, "STRING")
+
+    def _evaluate_unit(self) -> t.Optional[str]:
+        """Labber unit from the node unit."""
+        # HF2 does not have Unit.
+        unit = self._node_info.get("Unit", None)
+        if not unit or unit.lower() in NO_UNITS:
+            return None
+        unit = unit.replace("%", " percent").replace("'", "")
+        # Remove degree signs etc.
+        return unit.encode("ascii", "ignore").decode()
+
+    def _evaluate_options(self) -> None:
+        """Evaluate the combo definitions and the tooltip.
+
+        Both are built in a single pass over the node options.
+        """
+        read_only = self._permission == "READ"
+        with_defs = not (read_only and "enumerated" in self._node_info["Type"].lower())
+        defs = {}
+        items = []
+        for idx, (k, v) in enumerate(self._node_info["Options"].items(), 1):
+            value, desc = self._enum_description(v)
+            if with_defs:
+                defs[f"cmd_def_{idx}"] = str(k)
+                defs[f"combo_def_{idx}"] = value if value else str(k)
+            if read_only:
+                items.append(f"{k}: {desc}")
+            else:
+                items.append(f"{value if value else k}: {desc}")
+        description = self._node_info["Description"]
+        if read_only and self._datatype in ("STRING", "COMBO"):
+            description = "<p><b>READ-ONLY!</p></b>" + description
+        self._combo_defs = defs
+        self._tooltip = helpers.tooltip(
+            description,
+            enum=items,
+            node=self._node_path_no_prefix.upper(),
+        )
+
     @property
     def filtered_node_path(self) -> str:
         """Filtered node path without device prefix."""
@@ -167,19 +311,14 @@ class NodeQuant:
     @property
     def permission(self) -> str:
         """Quant permission."""
-        if "read" in self._properties and "write" in self._properties:
-            return "BOTH"
-        if "read" in self._properties:
-            return "READ"
-        if "write" in self._properties:
-            return "WRITE"
-        return "NONE"
+        return self._permission
 
     @property
     def show_in_measurement_dlg(self) -> t.Optional[str]:
         """Show in measurement dialog."""
-        if self.datatype in ["VECTOR", "COMPLEX", "VECTOR_COMPLEX"]:
-            if "result" in self.label.lower() or "wave" in self.label.lower():
+        if self._datatype in ("VECTOR", "COMPLEX", "VECTOR_COMPLEX"):
+            label = self._node_path_no_prefix.lower()
+            if "result" in label or "wave" in label:
                 return "True"
 
     @property
@@ -198,16 +337,7 @@ class NodeQuant:
 
         Node path indexes are removed from the group representation.
         """
-        path = [x for x in self._path_parts if not x.isnumeric()]
-        if len([x for x in self._path_parts if x.isnumeric()]) > 1:
-            idx_ = 0
-            for idx, c in enumerate(self._path_parts):
-                if c.isnumeric():
-                    idx_ = idx
-            return "/".join(path[: idx_ - 1])
-        if len(path) > 1:
-            return "/".join(path[:-1])
-        return "/".join(path)
+        return _group(self._path_parts)
 
     @property
     def label(self) -> str:
@@ -235,15 +365,9 @@ class NodeQuant:
                     "combo_def_n": 1
                 }
         """
-        if "enumerated" in self._node_info["Type"].lower():
-            if self.permission == "READ":
-                return {}
-        defs = {}
-        for idx, (k, v) in enumerate(self._node_info["Options"].items(), 1):
-            value, _ = self._enum_description(v)
-            defs[f"cmd_def_{idx}"] = str(k)
-            defs[f"combo_def_{idx}"] = value if value else str(k)
-        return defs
+        if self._combo_defs is None:
+            self._evaluate_options()
+        return self._combo_defs
 
     @property
     def tooltip(self) -> str:
@@ -254,21 +378,9 @@ class NodeQuant:
         For COMBO and READ-only quants, a bolded text to highlight READ-ONLY
         is used.
         """
-        items = []
-        description = self._node_info["Description"]
-        for k, v in self._node_info["Options"].items():
-            value, desc = self._enum_description(v)
-            if self.permission == "READ":
-                items.append(f"{k}: {desc}")
-            else:
-                items.append(f"{value if value else k}: {desc}")
-        if self.permission == "READ" and self.datatype in ["STRING", "COMBO"]:
-            description = "<p><b>READ-ONLY!</p></b>" + description
-        return helpers.tooltip(
-            description,
-            enum=items,
-            node=self._node_path_no_prefix.upper(),
-        )
+        if self._tooltip is None:
+            self._evaluate_options()
+        return self._tooltip
 
     @property
     def unit(self) -> t.Optional[str]:
@@ -276,60 +388,12 @@ class NodeQuant:
 
         Special characters are ignored or replaced in the string representation.
         """
-        # HF2 does not have Unit.
-        unit = self._node_info.get("Unit", None)
-        if not unit:
-            return None
-        if unit.lower() in ["none", "dependent", "many", "boolean"]:
-            return None
-        unit = self._node_info["Unit"].replace("%", " percent").replace("'", "")
-        # Remove degree signs etc.
-        return unit.encode("ascii", "ignore").decode()
+        return self._unit
 
     @property
     def datatype(self) -> str:
         """Node datatype to Labber datatypes."""
-        unit = self._node_info.get("Type", "").lower()
-        if not unit:
-            return ""
-        if "enumerated" in unit:
-            return "COMBO"
-        boolean_nodes = [
-            "enable",
-            "single",
-            "on",
-            "busy",
-            "ready",
-            "reset",
-            "preampenable",
-            "locked",
-            "keepalive",
-            "forcetrigger",
-            "triggered",
-            "endless",
-            "preview",
-            "findlevel",
-            "clearwave",
-            "clearweight",
-            "force",
-            "trigforce",
-        ]
-        if self._path_parts[-1].lower() in boolean_nodes:
-            return "BOOLEAN"
-        string_nodes = ["alias", "serial", "devtype", "fwrevision", "revision"]
-        if self._path_parts[-1].lower() in string_nodes:
-            return "STRING"
-        if unit == "double" or "integer" in unit:
-            return "DOUBLE"
-        if unit == "string":
-            return "STRING"
-        if unit in ["zivectordata", "ziadvisorwave"]:
-            return "VECTOR"
-        if unit in ["zidemodsample", "zidiosample", "complex double"]:
-            return "COMPLEX"
-        if unit in ["complex"]:
-            return "VECTOR_COMPLEX"
-        return "STRING"
+        return self._datatype
 
     @property
     def set_cmd(self) -> t.Optional[str]:
@@ -363,42 +427,71 @@ class NodeQuant:
         Returns:
             Dictionary where the keys and values are in a Labber format.
         """
+        permission = self._permission
+        datatype = self._datatype
         d = {}
         d["section"] = self.section.lower()
         d["group"] = self.group.lower()
-        d["label"] = self.label.lower()
-        if self.datatype:
-            if self.permission == "READ" and self.datatype == "COMBO":
+        d["label"] = self._node_path_no_prefix.lower()
+        if datatype:
+            if permission == "READ" and datatype == "COMBO":
                 d["datatype"] = "DOUBLE"
             else:
-                d["datatype"] = self.datatype
-        if self.unit:
-            d["unit"] = self.unit
+                d["datatype"] = datatype
+        if self._unit:
+            d["unit"] = self._unit
         d["tooltip"] = self.tooltip
         d.update(self.combo_defs)
-        if not (self.permission == "READ" and self.datatype in ["COMBO", "STRING"]):
-            d["permission"] = self.permission
-        if self.set_cmd:
-            d["set_cmd"] = self.set_cmd
-        if self.get_cmd:
-            d["get_cmd"] = self.get_cmd
-        if self.show_in_measurement_dlg:
-            d["show_in_measurement_dlg"] = self.show_in_measurement_dlg
-        if self.datatype in ["VECTOR", "VECTOR_COMPLEX"]:
+        if not (permission == "READ" and datatype in ("COMBO", "STRING")):
+            d["permission"] = permission
+        if "write" in self._properties:
+            d["set_cmd"] = self._node_path_no_prefix
+        if "read" in self._properties:
+            d["get_cmd"] = self._node_path_no_prefix
+        show_in_measurement_dlg = self.show_in_measurement_dlg
+        if show_in_measurement_dlg:
+            d["show_in_measurement_dlg"] = show_in_measurement_dlg
+        if datatype in ("VECTOR", "VECTOR_COMPLEX"):
             d["x_name"] = "Length"
             d["x_unit"] = "Sample"
-        return {self.filtered_node_path.lower(): d}
+        return {self._node_path.lower(): d}
 
 
 class QuantGenerator:
     """Quant generator.
 
+    An index of all numeric path segments is built once. The number of
+    indexes of a wildcard is therefore a single lookup.
+
     Args:
         quants: List of quants in node-like format.
     """
 
     def __init__(self, quants: t.List[str]) -> None:
         self.quants = list(map(helpers.delete_device_from_node_path, quants))
+        self._indexes = self._build_index(self.quants)
+
+    @staticmethod
+    def _build_index(quants: t.List[str]) -> t.Dict[t.Tuple[str, ...], t.Set[str]]:
+        """Index of the numeric path segments.
+
+        Args:
+            quants: List of quant paths.
+
+        Returns:
+            Indexes per parent path. Parent paths are lowercase path segments
+            where all numeric segments are replaced with a wildcard.
+        """
+        indexes: t.Dict[t.Tuple[str, ...], t.Set[str]] = {}
+        for quant in quants:
+            parent: t.List[str] = []
+            for segment in quant.strip("/").lower().split("/"):
+                if segment.isnumeric():
+                    indexes.setdefault(tuple(parent), set()).add(segment)
+                    parent.append("*")
+                else:
+                    parent.append(segment)
+        return indexes
 
     @staticmethod
     def find_nth_occurrence(s: str, target: str, n: int) -> int:
@@ -415,52 +508,24 @@ class QuantGenerator:
             return -1
         return s.find(target, s.find(target) + n)
 
-    @staticmethod
-    def path_from_indexes(
-        quant_original: str,
-        quant: str,
-        i: int,
-        indexes: t.List[int],
-        quants: t.List[str],
-    ) -> t.List[str]:
-        """Recursively generate quant path from given indexes.
+    def _index_count(self, quant: str, n: int) -> int:
+        """Number of indexes of the nth wildcard on the device.
 
         Args:
-            quant_original: Original quant
-            quant: Traveled quant
-            i: Index of the wildcard *
-            indexes: Number of indexes added to wildcard
-            quants: List of quant paths
+            quant: Quant node-like path.
+            n: Number of the wildcard.
 
         Returns:
-            List of generated quant paths.
+            Number of indexes.
         """
-        for x in range(indexes[i]):
-            idx = QuantGenerator.find_nth_occurrence(quant_original, "*", i)
-            q_list = list(quant)
-            if idx != -1:
-                q_list[idx] = str(x)
-                try:
-                    quants = QuantGenerator.path_from_indexes(
-                        quant_original, "".join(q_list), i + 1, indexes, quants
-                    )
-                except IndexError:
-                    quants.append("".join(q_list))
-        return quants
-
-    @staticmethod
-    def _to_regex(s: str) -> str:
-        """Quant to regex.
-
-        Wildcard `*` is replaced with any numbers and case is ignored.
-
-        Args:
-            s: String to be transformed into regex.
-        Returns:
-            Regex of the input string."""
-        s = s.replace("/", r"\/")
-        s = s.replace("*", r"[0-9]+")
-        return "(?i)" + s
+        parent = []
+        for segment in quant.strip("/").lower().split("/"):
+            if segment == "*":
+                if n == 0:
+                    return len(self._indexes.get(tuple(parent), ()))
+                n -= 1
+            parent.append("*" if segment == "*" or segment.isnumeric() else segment)
+        return 0
 
     def quant_paths(
         self, quant: str, indexes: t.List[t.Union[str, int]]
@@ -479,23 +544,16 @@ class QuantGenerator:
         wc_count = quant.count("*")
         if wc_count == 0:
             return [quant]
-        if not indexes:
-            indexes = ["dev" for _ in range(wc_count)]
-        if wc_count > len(indexes):
-            diff = wc_count - len(indexes)
-            indexes += ["dev" for _ in range(diff)]
-
-        idxs = []
-        for enum, idx in enumerate(indexes):
-            # Get the number of indexes from device.
-            if idx == "dev":
-                paths = set()
-                idx_pos = self.find_nth_occurrence(quant, "*", enum) + 1
-                p = re.compile(self._to_regex(quant[:idx_pos]))
-                for path in list(filter(p.match, self.quants)):
-                    paths.add(re.findall(r"[0-9]+", path)[enum])
-                idxs.append(len(paths))
-            else:
-                # Add any number of indexes.
-                idxs.append(idx)
-        return self.path_from_indexes(quant, quant, 0, idxs, [])
+        indexes = list(indexes) + ["dev"] * (wc_count - len(indexes))
+        if len(indexes) > wc_count:
+            return []
+        counts = [
+            self._index_count(quant, n) if idx == "dev" else idx
+            for n, idx in enumerate(indexes)
+        ]
+        parts = quant.split("*")
+        return [
+            parts[0]
+            + "".join(f"{value}{part}" for value, part in zip(values, parts[1:]))
+            for values in itertools.product(*(range(count) for count in counts))
+        ]
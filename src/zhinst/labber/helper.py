@@ -1,8 +1,10 @@
 import csv
+import json
 import typing as t
 from pathlib import Path
 
 from packaging import version
+from zhinst import core
 from zhinst.toolkit import Session, Waveforms
 
 
@@ -78,3 +80,33 @@ def check_compatibility(session: Session) -> None:
             f"LabOne version {current_version} is not supported by the Labber driver. "
             f"Please use LabOne version {LAST_SUPPORTED_VERSION} or lower."
         )
+
+
+def device_interface(daq_server: core.ziDAQServer, serial: str, hf2: bool) -> str:
+    """Interface a device is connected through.
+
+    The interface is selected the same way as in
+    `zhinst.toolkit.Session.connect_device`.
+
+    Args:
+        daq_server: Connection to the data server.
+        serial: Serial of the device.
+        hf2: If the data server is a HF2 data server.
+
+    Returns:
+        Interface of the device.
+
+    Raises:
+        KeyError: If the device is not found.
+    """
+    if hf2:
+        return "USB"
+    dev_info = json.loads(daq_server.getString("/zi/devices"))[serial.upper()]
+    interface = dev_info["INTERFACE"]
+    if interface == "none":
+        interface = (
+            "1GbE"
+            if "1GbE" in dev_info["INTERFACES"]
+            else dev_info["INTERFACES"].split(",")[0]
+        )
+    return interface
@@ -0,0 +1,799 @@
+"""In-process fake of the LabOne data server.
+
+The fake mimics the parts of ``zhinst.core.ziDAQServer`` (and the LabOne
+modules) that are used by zhinst-toolkit and the Labber driver. The available
+nodes are taken from nodedoc JSON files (the output of ``listNodesJSON``), which
+allows to run and benchmark the driver and the generator on real or synthetic
+devices without any hardware or network connection.
+
+Node values are stored in memory. Demodulator samples and module results are
+generated from a seeded random generator so that runs are reproducible.
+
+The generator uses the fake to generate drivers offline (see
+:func:`offline_session`). The test utilities in ``zhinst.labber.testing``
+additionally replace ``zhinst.core.ziDAQServer`` with the fake.
+"""
+
+import copy
+import fnmatch
+import json
+import re
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from zhinst.toolkit import Session
+from zhinst.toolkit.driver.modules import shfqa_sweeper
+
+from zhinst.labber.driver.recorder import MODULE_FACTORIES
+
+NodeDoc = t.Dict[str, t.Dict[str, t.Any]]
+
+CLOCKBASE = 60e6
+
+_ZI_NODEDOC = {
+    "/zi/about/dataserver": {"Type": "String", "Properties": "Read"},
+    "/zi/about/version": {"Type": "String", "Properties": "Read"},
+    "/zi/about/revision": {"Type": "Integer (64 bit)", "Properties": "Read"},
+    "/zi/config/open": {"Type": "Integer (enumerated)", "Properties": "Read, Write"},
+    "/zi/config/port": {"Type": "Integer (64 bit)", "Properties": "Read, Write"},
+    "/zi/devices": {"Type": "String", "Properties": "Read"},
+    "/zi/devices/connected": {"Type": "String", "Properties": "Read"},
+    "/zi/devices/visible": {"Type": "String", "Properties": "Read"},
+}
+
+
+def load_nodedoc(nodedoc: t.Union[str, Path, NodeDoc]) -> NodeDoc:
+    """Load a nodedoc.
+
+    Args:
+        nodedoc: Path to a nodedoc JSON file, the JSON string itself or an
+            already loaded nodedoc.
+
+    Returns:
+        Nodedoc with lower case node paths.
+    """
+    if isinstance(nodedoc, Path) or (
+        isinstance(nodedoc, str) and not nodedoc.lstrip().startswith("{")
+    ):
+        nodedoc = Path(nodedoc).read_text(encoding="UTF-8")
+    if isinstance(nodedoc, str):
+        nodedoc = json.loads(nodedoc)
+    return {path.lower(): info for path, info in nodedoc.items()}
+
+
+def scale_nodedoc(nodedoc: NodeDoc, copies: int) -> NodeDoc:
+    """Create a synthetic (larger) nodedoc by duplicating indexed nodes.
+
+    All nodes with an index in their path (e.g. ``/dev1234/demods/0/rate``) are
+    duplicated ``copies`` times by replacing their first index. Nodes without
+    an index are taken over unchanged.
+
+    Args:
+        nodedoc: Nodedoc of a real device.
+        copies: Number of copies of each indexed node.
+
+    Returns:
+        Synthetic nodedoc.
+    """
+    scaled = {}
+    for path, info in load_nodedoc(nodedoc).items():
+        match = re.search(r"/(\d+)(/|$)", path)
+        if not match:
+            scaled[path] = info
+            continue
+        for index in range(copies):
+            new_path = f"{path[:match.start(1)]}{index}{path[match.end(1):]}"
+            new_info = dict(info)
+            new_info["Node"] = new_path.upper()
+            scaled[new_path] = new_info
+    return scaled
+
+
+def _default_value(info: t.Dict[str, t.Any]) -> t.Any:
+    """Default value for a node based on its type."""
+    node_type = info.get("Type", "")
+    if "Integer" in node_type:
+        if info.get("Options"):
+            return int(next(iter(info["Options"])))
+        return 0
+    if node_type == "Double":
+        return 0.0
+    if node_type == "Complex Double":
+        return 0j
+    if node_type == "String":
+        return ""
+    if node_type in ["ZIVectorData", "ZIAdvisorWave"]:
+        return np.array([], dtype=np.float64)
+    return None
+
+
+def _convert(info: t.Dict[str, t.Any], value: t.Any) -> t.Any:
+    """Convert a set value into the type of the node."""
+    node_type = info.get("Type", "")
+    if "Integer" in node_type:
+        return int(value)
+    if node_type == "Double":
+        return float(value)
+    if node_type == "Complex Double":
+        return complex(value)
+    if node_type == "String":
+        return value if isinstance(value, str) else str(value)
+    if node_type == "ZIVectorData":
+        return np.asarray(value)
+    return value
+
+
+def _match_nodes(paths: t.Iterable[str], pattern: str) -> t.List[str]:
+    """Nodes matching a (wildcard) path.
+
+    A path without a wildcard matches the node itself and all its sub nodes.
+    """
+    pattern = pattern.lower().rstrip("/")
+    if "*" in pattern or "?" in pattern:
+        return fnmatch.filter(paths, pattern)
+    prefix = pattern + "/"
+    return [path for path in paths if path == pattern or path.startswith(prefix)]
+
+
+class _NodeStore:
+    """Thread safe storage of node information and values.
+
+    Args:
+        nodedoc: Nodedoc of the stored nodes.
+        latency: Latency in seconds that is added to every request. Either a
+            single value or a value per function name (``"default"`` is used
+            for all functions that are not specified).
+    """
+
+    def __init__(
+        self,
+        nodedoc: NodeDoc,
+        latency: t.Union[float, t.Dict[str, float]] = 0.0,
+    ):
+        self._lock = threading.RLock()
+        self._nodes: NodeDoc = {}
+        self._values: t.Dict[str, t.Any] = {}
+        self._timestamps: t.Dict[str, int] = {}
+        self._start = time.perf_counter()
+        self._latency = latency
+        self.add_nodes(nodedoc)
+
+    def add_nodes(self, nodedoc: NodeDoc) -> None:
+        """Add nodes to the store.
+
+        Args:
+            nodedoc: Nodedoc of the nodes.
+        """
+        with self._lock:
+            for path, info in load_nodedoc(nodedoc).items():
+                info = dict(info)
+                info.setdefault("Node", path.upper())
+                info.setdefault("Description", "")
+                info.setdefault("Unit", "None")
+                self._nodes[path] = info
+                self._values.setdefault(path, _default_value(info))
+                self._timestamps.setdefault(path, 0)
+
+    def _delay(self, function: str) -> None:
+        latency = self._latency
+        if isinstance(latency, dict):
+            latency = latency.get(function, latency.get("default", 0.0))
+        if latency:
+            time.sleep(latency)
+
+    def timestamp(self) -> int:
+        """Current timestamp in clock ticks."""
+        return int((time.perf_counter() - self._start) * CLOCKBASE)
+
+    def info(self, path: str) -> t.Dict[str, t.Any]:
+        try:
+            return self._nodes[path.lower()]
+        except KeyError:
+            raise RuntimeError(f"Path {path} not found") from None
+
+    def paths(self, pattern: str) -> t.List[str]:
+        return _match_nodes(self._nodes, pattern)
+
+    def set(self, path: str, value: t.Any) -> t.List[str]:
+        """Set the value of all matching nodes.
+
+        Returns:
+            Changed nodes.
+        """
+        paths = self.paths(path)
+        if not paths:
+            raise RuntimeError(f"Path {path} not found")
+        timestamp = self.timestamp()
+        with self._lock:
+            for node in paths:
+                self._values[node] = _convert(self._nodes[node], value)
+                self._timestamps[node] = timestamp
+        return paths
+
+    def value(self, path: str) -> t.Any:
+        path = path.lower()
+        self.info(path)
+        return self._values[path]
+
+    def entry(self, path: str) -> t.Any:
+        """Raw entry of a node as returned by ``get``."""
+        value = self._values[path]
+        timestamp = self._timestamps[path]
+        if self._nodes[path].get("Type") == "ZIVectorData":
+            return [{"timestamp": timestamp, "flags": 0, "vector": value}]
+        if isinstance(value, dict):
+            return value
+        return {"timestamp": np.array([timestamp]), "value": np.array([value])}
+
+    def list_nodes_json(self, path: str) -> str:
+        return json.dumps({node: self._nodes[node] for node in self.paths(path)})
+
+    def list_nodes(self, path: str) -> t.List[str]:
+        return [self._nodes[node]["Node"] for node in self.paths(path)]
+
+    def get(self, path: str, flat: bool = False, settingsonly: bool = False) -> dict:
+        with self._lock:
+            paths = self.paths(path)
+            if settingsonly:
+                paths = [
+                    node
+                    for node in paths
+                    if "Setting" in self._nodes[node].get("Properties", "")
+                ]
+            result = {node: self.entry(node) for node in paths}
+        if flat:
+            return result
+        nested = {}
+        for node, value in result.items():
+            level = nested
+            segments = node.strip("/").split("/")
+            for segment in segments[:-1]:
+                level = level.setdefault(segment, {})
+            level[segments[-1]] = value
+        return nested
+
+
+class FakeModule:
+    """Fake of a LabOne module (``zhinst.core.ModuleBase``).
+
+    The module progresses linearly from 0 to 1 within ``duration`` seconds after
+    ``execute`` is called. ``read`` returns random data for all subscribed
+    signals.
+
+    Args:
+        name: Name of the module (e.g. ``"dataAcquisitionModule"``).
+        nodedoc: Nodedoc of the module.
+        duration: Time in seconds the module needs to finish.
+        latency: Latency that is added to every request.
+        seed: Seed for the random data.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        nodedoc: t.Optional[NodeDoc] = None,
+        *,
+        duration: float = 0.0,
+        latency: t.Union[float, t.Dict[str, float]] = 0.0,
+        seed: int = 0,
+    ):
+        self.name = name
+        self._store = _NodeStore(nodedoc or {}, latency)
+        self._duration = duration
+        self._started = None
+        self._finished = True
+        self._subscribed: t.List[str] = []
+        self._rng = np.random.default_rng(seed)
+
+    def listNodesJSON(self, path: str = "*", *args, **kwargs) -> str:
+        self._store._delay("listNodesJSON")
+        return self._store.list_nodes_json(path)
+
+    def listNodes(self, path: str = "*", *args, **kwargs) -> t.List[str]:
+        self._store._delay("listNodes")
+        return self._store.list_nodes(path)
+
+    def get(self, path: str, flat: bool = False) -> dict:
+        self._store._delay("get")
+        return self._store.get(path, flat=flat)
+
+    def getInt(self, path: str) -> int:
+        self._store._delay("getInt")
+        return int(self._store.value(path))
+
+    def getDouble(self, path: str) -> float:
+        self._store._delay("getDouble")
+        return float(self._store.value(path))
+
+    def getString(self, path: str) -> str:
+        self._store._delay("getString")
+        return str(self._store.value(path))
+
+    def set(self, path: t.Union[str, t.List[t.Tuple[str, t.Any]]], value=None):
+        self._store._delay("set")
+        if isinstance(path, (list, tuple)):
+            for sub_path, sub_value in path:
+                self._store.set(sub_path, sub_value)
+        else:
+            self._store.set(path, value)
+
+    def subscribe(self, path: t.Union[str, t.List[str]]) -> None:
+        paths = [path] if isinstance(path, str) else path
+        for signal in paths:
+            if signal.lower() not in self._subscribed:
+                self._subscribed.append(signal.lower())
+
+    def unsubscribe(self, path: t.Union[str, t.List[str]]) -> None:
+        paths = [path] if isinstance(path, str) else path
+        for signal in paths:
+            self._subscribed = [
+                sub
+                for sub in self._subscribed
+                if sub != signal.lower() and not fnmatch.fnmatch(sub, signal.lower())
+            ]
+
+    def execute(self) -> None:
+        self._store._delay("execute")
+        self._started = time.perf_counter()
+        self._finished = False
+
+    def finish(self) -> None:
+        self._finished = True
+
+    def clear(self) -> None:
+        self._finished = True
+
+    def progress(self) -> np.ndarray:
+        if self._started is None:
+            return np.array([0.0])
+        if self._finished or not self._duration:
+            return np.array([1.0])
+        elapsed = time.perf_counter() - self._started
+        return np.array([min(1.0, elapsed / self._duration)])
+
+    def finished(self) -> bool:
+        if not self._finished and self.progress()[0] >= 1:
+            self._finished = True
+        return self._finished
+
+    def _result_length(self) -> int:
+        for node in ["/grid/cols", "/samplecount", "/length"]:
+            try:
+                length = int(self._store.value(node))
+            except (RuntimeError, TypeError, ValueError):
+                continue
+            if length > 0:
+                return length
+        return 100
+
+    def read(self, flat: bool = False) -> dict:
+        """Random result for every subscribed signal."""
+        self._store._delay("read")
+        length = self._result_length()
+        timestamp = self._store.timestamp()
+        result = {}
+        for signal in self._subscribed:
+            header = {"systemtime": np.array([int(time.time() * 1e6)])}
+            if self.name == "sweep":
+                data = {
+                    "header": header,
+                    "grid": np.linspace(0, 1, length),
+                    "x": self._rng.normal(size=length),
+                    "y": self._rng.normal(size=length),
+                }
+                data["r"] = np.abs(data["x"] + 1j * data["y"])
+                data["phase"] = np.angle(data["x"] + 1j * data["y"])
+                result[signal] = [[data]]
+            else:
+                result[signal] = [
+                    {
+                        "header": header,
+                        "timestamp": np.array([[timestamp] * length]),
+                        "value": self._rng.normal(size=(1, length)),
+                    }
+                ]
+        return result
+
+
+class FakeDataServer:
+    """Fake of ``zhinst.core.ziDAQServer`` based on nodedoc files.
+
+    Devices are added with their nodedoc and become visible to the data
+    server. ``connectDevice`` connects them. Apart from normal node access the
+    fake supports transactions (``set`` with a list), subscriptions and
+    ``poll`` (including generated demodulator samples) and LabOne modules.
+
+    Every request can be delayed by a configurable latency to simulate a
+    network connection.
+
+    Args:
+        host: Address of the data server.
+        port: Port of the data server.
+        hf2: Flag if the data server should act as a HF2 data server.
+        latency: Latency in seconds added to every request. Either a single
+            value or a value per function name (``"default"`` is used for all
+            functions that are not specified).
+        module_nodedocs: Nodedoc per module function name
+            (e.g. ``{"dataAcquisitionModule": "nodedoc_daq.json"}``).
+        module_duration: Time in seconds a module needs to finish.
+        version: LabOne version of the data server.
+        seed: Seed for the generated data.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8004,
+        *,
+        hf2: bool = False,
+        latency: t.Union[float, t.Dict[str, float]] = 0.0,
+        module_nodedocs: t.Optional[t.Dict[str, t.Union[str, Path, NodeDoc]]] = None,
+        module_duration: float = 0.0,
+        version: str = "24.10",
+        seed: int = 0,
+    ):
+        self.host = host
+        self.port = port
+        self._latency = latency
+        self._store = _NodeStore(_ZI_NODEDOC, latency)
+        self._devices: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self._subscribed: t.List[str] = []
+        self._events: t.Dict[str, t.List[t.Any]] = {}
+        self._last_poll: t.Dict[str, int] = {}
+        self._module_nodedocs = {
+            name: load_nodedoc(nodedoc)
+            for name, nodedoc in (module_nodedocs or {}).items()
+        }
+        self._module_duration = module_duration
+        self._seed = seed
+        self._rng = np.random.default_rng(seed)
+        self._store.set(
+            "/zi/about/dataserver",
+            (
+                "Zurich Instruments HF2 Data Server"
+                if hf2
+                else "Zurich Instruments Data Server"
+            ),
+        )
+        self._store.set("/zi/about/version", version)
+        self._store.set("/zi/config/port", port)
+        self._update_device_nodes()
+
+    def add_device(
+        self,
+        serial: str,
+        nodedoc: t.Union[str, Path, NodeDoc],
+        device_type: str,
+        options: str = "",
+        interfaces: str = "1GbE",
+    ) -> None:
+        """Add a device to the data server.
+
+        The device is visible but not connected. The device id in the nodedoc
+        is replaced by ``serial``, so that one nodedoc can be used for multiple
+        devices.
+
+        Args:
+            serial: Serial of the device.
+            nodedoc: Nodedoc of the device.
+            device_type: Device type (e.g. ``"SHFQA4"``).
+            options: Device options separated by a new line.
+            interfaces: Available interfaces separated by comma.
+        """
+        serial = serial.lower()
+        nodedoc = load_nodedoc(nodedoc)
+        renamed = {}
+        for path, info in nodedoc.items():
+            new_path = re.sub(r"^/[^/]+", f"/{serial}", path)
+            info = dict(info)
+            info["Node"] = new_path.upper()
+            renamed[new_path] = info
+        features = {
+            f"/{serial}/features/devtype": {"Type": "String", "Properties": "Read"},
+            f"/{serial}/features/options": {"Type": "String", "Properties": "Read"},
+            f"/{serial}/features/serial": {"Type": "String", "Properties": "Read"},
+        }
+        self._store.add_nodes({**features, **renamed})
+        self._store.set(f"/{serial}/features/devtype", device_type)
+        self._store.set(f"/{serial}/features/options", options)
+        self._store.set(f"/{serial}/features/serial", serial)
+        self._devices[serial] = {
+            "connected": False,
+            "interfaces": interfaces,
+            "device_type": device_type,
+        }
+        self._update_device_nodes()
+
+    def _update_device_nodes(self) -> None:
+        devices = {
+            serial.upper(): {
+                "DEVICETYPE": info["device_type"],
+                "INTERFACE": (
+                    info["interfaces"].split(",")[0] if info["connected"] else "none"
+                ),
+                "INTERFACES": info["interfaces"],
+                "CONNECTED": int(info["connected"]),
+                "STATUSFLAGS": 0,
+            }
+            for serial, info in self._devices.items()
+        }
+        self._store.set("/zi/devices", json.dumps(devices))
+        self._store.set(
+            "/zi/devices/connected",
+            ",".join(s for s, i in self._devices.items() if i["connected"]),
+        )
+        self._store.set("/zi/devices/visible", ",".join(self._devices))
+
+    def _device(self, path: str) -> str:
+        serial = path.lower().strip("/").split("/")[0]
+        if serial in self._devices and not self._devices[serial]["connected"]:
+            raise RuntimeError(f"Device {serial} is not connected.")
+        return serial
+
+    def connectDevice(self, serial: str, interface: str = "", *args) -> None:
+        self._store._delay("connectDevice")
+        serial = serial.lower()
+        if serial not in self._devices:
+            raise RuntimeError(f"Device {serial} not found.")
+        self._devices[serial]["connected"] = True
+        self._update_device_nodes()
+
+    def disconnect(self) -> None:
+        # All connections share the state of the fake, nothing to close
+        self._store._delay("disconnect")
+
+    def disconnectDevice(self, serial: str) -> None:
+        self._store._delay("disconnectDevice")
+        if serial.lower() in self._devices:
+            self._devices[serial.lower()]["connected"] = False
+            self._update_device_nodes()
+
+    def listNodesJSON(self, path: str, *args, **kwargs) -> str:
+        self._store._delay("listNodesJSON")
+        self._device(path)
+        return self._store.list_nodes_json(path)
+
+    def listNodes(self, path: str, *args, **kwargs) -> t.List[str]:
+        self._store._delay("listNodes")
+        self._device(path)
+        return self._store.list_nodes(path)
+
+    def get(
+        self, path: str, *args, flat: bool = False, settingsonly: bool = True, **kwargs
+    ) -> dict:
+        self._store._delay("get")
+        self._device(path)
+        self._refresh_samples(self._store.paths(path))
+        return self._store.get(path, flat=flat, settingsonly=settingsonly)
+
+    def getInt(self, path: str) -> int:
+        self._store._delay("getInt")
+        return int(self._store.value(path))
+
+    def getDouble(self, path: str) -> float:
+        self._store._delay("getDouble")
+        return float(self._store.value(path))
+
+    def getString(self, path: str) -> str:
+        self._store._delay("getString")
+        return str(self._store.value(path))
+
+    def getComplex(self, path: str, *args, **kwargs) -> complex:
+        self._store._delay("getComplex")
+        return complex(self._store.value(path))
+
+    def getSample(self, path: str, *args, **kwargs) -> dict:
+        self._store._delay("getSample")
+        self._refresh_samples([path.lower()])
+        return self._store.value(path)
+
+    def getDIO(self, path: str, *args, **kwargs) -> dict:
+        self._store._delay("getDIO")
+        return self._store.value(path) or {
+            "timestamp": np.array([self._store.timestamp()]),
+            "dio": np.array([0]),
+        }
+
+    def _set(self, path: str, value: t.Any) -> None:
+        self._device(path)
+        for node in self._store.set(path, value):
+            if node in self._subscribed:
+                self._events.setdefault(node, []).append(self._store.entry(node))
+
+    def set(self, path: t.Union[str, t.List[t.Tuple[str, t.Any]]], value=None, **_):
+        """Set a node or a list of nodes (transaction)."""
+        self._store._delay("set")
+        if isinstance(path, (list, tuple)):
+            with self._store._lock:
+                for sub_path, sub_value in path:
+                    self._set(sub_path, sub_value)
+        else:
+            self._set(path, value)
+
+    def _sync_set(self, path: str, value: t.Any) -> t.Any:
+        self._set(path, value)
+        return self._store.value(path)
+
+    def setInt(self, path: str, value: int) -> None:
+        self.set(path, value)
+
+    def setDouble(self, path: str, value: float) -> None:
+        self.set(path, value)
+
+    def setString(self, path: str, value: str) -> None:
+        self.set(path, value)
+
+    def setComplex(self, path: str, value: complex) -> None:
+        self.set(path, value)
+
+    def setVector(self, path: str, value: t.Any, **_) -> None:
+        self.set(path, value)
+
+    def syncSetInt(self, path: str, value: int) -> int:
+        self._store._delay("syncSetInt")
+        return self._sync_set(path, value)
+
+    def syncSetDouble(self, path: str, value: float) -> float:
+        self._store._delay("syncSetDouble")
+        return self._sync_set(path, value)
+
+    def syncSetString(self, path: str, value: str) -> str:
+        self._store._delay("syncSetString")
+        return self._sync_set(path, value)
+
+    def sync(self) -> None:
+        self._store._delay("sync")
+
+    def subscribe(self, path: t.Union[str, t.List[str]]) -> None:
+        self._store._delay("subscribe")
+        paths = [path] if isinstance(path, str) else path
+        timestamp = self._store.timestamp()
+        for pattern in paths:
+            for node in self._store.paths(pattern):
+                if node not in self._subscribed:
+                    self._subscribed.append(node)
+                    self._last_poll[node] = timestamp
+
+    def unsubscribe(self, path: t.Union[str, t.List[str]]) -> None:
+        self._store._delay("unsubscribe")
+        paths = [path] if isinstance(path, str) else path
+        for pattern in paths:
+            for node in _match_nodes(self._subscribed, pattern):
+                self._subscribed.remove(node)
+                self._events.pop(node, None)
+                self._last_poll.pop(node, None)
+
+    def getAsEvent(self, path: str) -> None:
+        self._store._delay("getAsEvent")
+        for node in self._store.paths(path):
+            if node in self._subscribed:
+                self._events.setdefault(node, []).append(self._store.entry(node))
+
+    def _demod_rate(self, node: str) -> float:
+        try:
+            return float(self._store.value(node.rsplit("/", 1)[0] + "/rate")) or 1e3
+        except RuntimeError:
+            return 1e3
+
+    def _generate_samples(self, node: str, start: int, stop: int) -> dict:
+        """Generate demodulator samples between two timestamps."""
+        rate = self._demod_rate(node)
+        count = max(int((stop - start) / CLOCKBASE * rate), 0)
+        timestamps = start + (np.arange(1, count + 1) * CLOCKBASE / rate).astype(
+            np.uint64
+        )
+        frequency = 0.0
+        try:
+            frequency = float(
+                self._store.value(node.rsplit("/", 3)[0] + "/oscs/0/freq")
+            )
+        except RuntimeError:
+            pass
+        return {
+            "timestamp": timestamps,
+            "x": 1e-3 + 1e-6 * self._rng.standard_normal(count),
+            "y": 1e-6 * self._rng.standard_normal(count),
+            "frequency": np.full(count, frequency),
+            "phase": np.zeros(count),
+            "dio": np.zeros(count, dtype=np.uint32),
+            "trigger": np.zeros(count, dtype=np.uint32),
+            "auxin0": np.zeros(count),
+            "auxin1": np.zeros(count),
+        }
+
+    def _refresh_samples(self, paths: t.List[str]) -> None:
+        """Update the latest value of sample nodes."""
+        for node in paths:
+            if self._store._nodes[node].get("Type") != "ZIDemodSample":
+                continue
+            stop = self._store.timestamp()
+            start = stop - int(CLOCKBASE / self._demod_rate(node))
+            samples = self._generate_samples(node, start, stop)
+            self._store._values[node] = samples
+            self._store._timestamps[node] = stop
+
+    def poll(
+        self,
+        recording_time: float,
+        timeout: int,
+        flags: int = 0,
+        flat: bool = False,
+    ) -> dict:
+        """Poll the data of all subscribed nodes.
+
+        Demodulator samples are generated for the time since the last poll,
+        other nodes return their value changes (set or getAsEvent).
+        """
+        self._store._delay("poll")
+        if recording_time > 0:
+            time.sleep(recording_time)
+        stop = self._store.timestamp()
+        result = {}
+        for node in self._subscribed:
+            if self._store._nodes[node].get("Type") == "ZIDemodSample":
+                samples = self._generate_samples(node, self._last_poll[node], stop)
+                if len(samples["timestamp"]):
+                    self._last_poll[node] = int(samples["timestamp"][-1])
+                    result[node] = samples
+            elif self._events.get(node):
+                events = self._events.pop(node)
+                if self._store._nodes[node].get("Type") == "ZIVectorData":
+                    result[node] = [event[0] for event in events]
+                else:
+                    result[node] = {
+                        "timestamp": np.concatenate([e["timestamp"] for e in events]),
+                        "value": np.concatenate([e["value"] for e in events]),
+                    }
+        if flat:
+            return result
+        nested = {}
+        for node, value in result.items():
+            level = nested
+            segments = node.strip("/").split("/")
+            for segment in segments[:-1]:
+                level = level.setdefault(segment, {})
+            level[segments[-1]] = value
+        return nested
+
+    def __getattr__(self, name: str) -> t.Any:
+        if name not in MODULE_FACTORIES:
+            raise AttributeError(name)
+
+        def create_module(*args, **kwargs):
+            self._store._delay(name)
+            return FakeModule(
+                name,
+                copy.deepcopy(self._module_nodedocs.get(name, {})),
+                duration=self._module_duration,
+                latency=self._latency,
+                seed=self._seed,
+            )
+
+        return create_module
+
+
+@contextmanager
+def offline_session(server: FakeDataServer) -> t.Iterator[Session]:
+    """Toolkit session that uses a fake data server as its connection.
+
+    ``zhinst.core`` is not patched. Only the SHFQA sweeper module of toolkit,
+    which opens a connection of its own, is served by the fake within the
+    context.
+
+    Args:
+        server: Fake data server.
+    """
+
+    def connect(*args, **kwargs):
+        return server
+
+    original = shfqa_sweeper.ziDAQServer
+    shfqa_sweeper.ziDAQServer = connect
+    try:
+        yield Session.from_existing_connection(server)
+    finally:
+        shfqa_sweeper.ziDAQServer = original
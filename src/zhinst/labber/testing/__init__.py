@@ -0,0 +1,9 @@
+"""Test and benchmark utilities for the Labber driver and generator."""
+
+from zhinst.labber.testing.fake_data_server import (
+    FakeDataServer,
+    FakeModule,
+    fake_data_server,
+    load_nodedoc,
+    scale_nodedoc,
+)
@@ -0,0 +1,36 @@
+"""Fake LabOne data server for tests and benchmarks.
+
+The fake itself is implemented in :mod:`zhinst.labber.offline_server`.
+"""
+
+import typing as t
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from zhinst.labber.offline_server import (
+    FakeDataServer,
+    FakeModule,
+    load_nodedoc,
+    scale_nodedoc,
+)
+
+
+@contextmanager
+def fake_data_server(server: FakeDataServer) -> t.Iterator[FakeDataServer]:
+    """Context manager that replaces ``zhinst.core.ziDAQServer`` with a fake.
+
+    All connections created within the context (e.g. by a toolkit session or
+    the Labber driver) use the passed fake data server.
+
+    Args:
+        server: Fake data server.
+    """
+
+    def connect(*args, **kwargs):
+        return server
+
+    with patch("zhinst.core.ziDAQServer", side_effect=connect), patch(
+        "zhinst.toolkit.driver.modules.shfqa_sweeper.ziDAQServer",
+        side_effect=connect,
+    ):
+        yield server
@@ -0,0 +1,305 @@
+import json
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from click.testing import CliRunner
+
+from zhinst.labber.cli_script import main
+from zhinst.labber.generator import batch
+from zhinst.labber.generator.batch import (
+    DeviceEntry,
+    GenerationResult,
+    generate_labber_files_batch,
+    load_inventory,
+    server_key,
+)
+from zhinst.labber.generator.generator import generate_labber_files_offline
+from zhinst.labber.generator.manifest import MANIFEST_FILENAME
+from zhinst.labber.testing import FakeDataServer, fake_data_server
+
+
+def _read_tree(root):
+    return {
+        path.relative_to(root): path.read_bytes()
+        for path in sorted(Path(root).rglob("*"))
+        if path.is_file() and path.name != MANIFEST_FILENAME
+    }
+
+
+@pytest.fixture
+def module_nodedocs(data_dir):
+    return {
+        "daq": str(data_dir / "nodedoc_daq_test.json"),
+        "sweeper": str(data_dir / "nodedoc_sweeper_test.json"),
+    }
+
+
+def test_load_inventory(tmp_path):
+    inventory = tmp_path / "devices.json"
+    inventory.write_text(
+        json.dumps(
+            [
+                "dev1234",
+                {"device_id": "dev2345", "server_host": "10.0.0.1", "hf2": True},
+                {
+                    "device_id": "dev3456",
+                    "nodedoc": "nodedoc.json",
+                    "device_type": "SHFQA4",
+                    "module_nodedocs": {"daq": "daq.json"},
+                },
+            ]
+        )
+    )
+    assert load_inventory(inventory) == [
+        DeviceEntry("dev1234"),
+        DeviceEntry("dev2345", server_host="10.0.0.1", hf2=True),
+        DeviceEntry(
+            "dev3456",
+            nodedoc=str(tmp_path / "nodedoc.json"),
+            device_type="SHFQA4",
+            module_nodedocs={"daq": str(tmp_path / "daq.json")},
+        ),
+    ]
+
+    inventory.write_text(json.dumps([{"device_id": "dev1234", "foo": 1}]))
+    with pytest.raises(ValueError) as error:
+        load_inventory(inventory)
+    assert "foo" in str(error.value)
+    inventory.write_text(json.dumps([{"server_host": "localhost"}]))
+    with pytest.raises(ValueError):
+        load_inventory(inventory)
+    inventory.write_text(json.dumps({"device_id": "dev1234"}))
+    with pytest.raises(ValueError):
+        load_inventory(inventory)
+
+
+def test_server_key():
+    assert server_key(DeviceEntry("dev1234")) == server_key(DeviceEntry("dev2345"))
+    assert server_key(DeviceEntry("dev1234")) != server_key(
+        DeviceEntry("dev1234", server_host="10.0.0.1")
+    )
+    assert server_key(
+        DeviceEntry("dev1234", nodedoc="a.json", labone_version="23.10")
+    ) != server_key(DeviceEntry("dev1234", nodedoc="a.json", labone_version="24.10"))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_generate_labber_files_batch(data_dir, module_nodedocs, tmp_path, max_workers):
+    uhfli = str(data_dir / "nodedoc_dev1234_uhfli.json")
+    shfqa = str(data_dir / "nodedoc_dev1234_shfqa.json")
+    devices = [
+        DeviceEntry(
+            "dev1234",
+            nodedoc=uhfli,
+            device_type="UHFLI",
+            module_nodedocs=module_nodedocs,
+        ),
+        DeviceEntry(
+            "dev1235",
+            nodedoc=uhfli,
+            device_type="UHFLI",
+            module_nodedocs=module_nodedocs,
+        ),
+        DeviceEntry(
+            "dev2345",
+            nodedoc=shfqa,
+            device_type="SHFQA4",
+            module_nodedocs=module_nodedocs,
+        ),
+        DeviceEntry("dev9999", nodedoc=shfqa),
+    ]
+    (tmp_path / "batch").mkdir()
+    results = generate_labber_files_batch(
+        str(tmp_path / "batch"), "NORMAL", devices, max_workers=max_workers
+    )
+    assert [result.name for result in results] == [
+        "DEV1234",
+        "DEV1235",
+        "DEV2345",
+        "DEV9999",
+        "DataServer localhost",
+        "Static drivers",
+    ]
+    assert all(isinstance(result, GenerationResult) for result in results)
+    assert [len(result.created) for result in results[:4]] == [4, 0, 4, 0]
+    assert results[1].error is None
+    assert "device_type" in results[3].error
+    # DataServer + daq + sweeper + shfqa_sweeper
+    assert len(results[4].created) == 4 * 4
+    assert all(result.duration >= 0 for result in results)
+
+    # Same output as the single device generation
+    expected = tmp_path / "single"
+    expected.mkdir()
+    for entry in devices[::2][:2]:
+        generate_labber_files_offline(
+            str(expected),
+            "NORMAL",
+            entry.device_id,
+            entry.nodedoc,
+            entry.device_type,
+            module_nodedocs=module_nodedocs,
+        )
+    assert _read_tree(tmp_path / "batch") == _read_tree(expected)
+
+    # Existing files are only overwritten with upgrade and if they changed
+    results = generate_labber_files_batch(
+        str(tmp_path / "batch"), "NORMAL", devices[:1], max_workers=max_workers
+    )
+    assert not any(result.created or result.upgraded for result in results)
+    ini = (
+        tmp_path / "batch" / "Zurich_Instruments_UHFLI" / "Zurich_Instruments_UHFLI.ini"
+    )
+    ini.write_text("modified")
+    results = generate_labber_files_batch(
+        str(tmp_path / "batch"),
+        "NORMAL",
+        devices[:1],
+        upgrade=True,
+        max_workers=max_workers,
+    )
+    assert results[0].upgraded == [ini]
+    assert not any(result.created or result.upgraded for result in results[1:])
+    assert _read_tree(tmp_path / "batch") == _read_tree(expected)
+
+
+def test_generate_labber_files_batch_groups(data_dir, module_nodedocs, tmp_path):
+    uhfli = str(data_dir / "nodedoc_dev1234_uhfli.json")
+    devices = [
+        DeviceEntry(
+            "dev1233",
+            nodedoc=str(tmp_path / "missing.json"),
+            device_type="UHFLI",
+            module_nodedocs=module_nodedocs,
+        ),
+        DeviceEntry(
+            "dev1234",
+            nodedoc=uhfli,
+            device_type="UHFLI",
+            module_nodedocs=module_nodedocs,
+        ),
+        DeviceEntry(
+            "dev1235",
+            nodedoc=uhfli,
+            device_type="UHFLI",
+            module_nodedocs=module_nodedocs,
+        ),
+        DeviceEntry(
+            "dev1236",
+            nodedoc=uhfli,
+            device_type="UHFLI",
+            options="MF",
+            module_nodedocs=module_nodedocs,
+        ),
+        DeviceEntry(
+            "dev1237",
+            nodedoc=uhfli,
+            device_type="UHFLI",
+            options="MF",
+            labone_version="23.10",
+            module_nodedocs=module_nodedocs,
+        ),
+    ]
+    with mock.patch(
+        "zhinst.labber.generator.batch._render_device",
+        wraps=batch._render_device,
+    ) as render:
+        results = generate_labber_files_batch(
+            str(tmp_path), "NORMAL", devices, max_workers=1
+        )
+    # One device per data server, LabOne version, type and options, the next
+    # one if it failed
+    assert [call.args[0].device_id for call in render.call_args_list] == [
+        "dev1233",
+        "dev1236",
+        "dev1237",
+        "dev1234",
+    ]
+    assert results[0].error is not None
+    assert [len(result.created) for result in results[1:4]] == [4, 0, 4]
+    assert [result.device_type for result in results[1:5]] == ["UHFLI"] * 4
+    assert all(result.error is None for result in results[1:])
+
+
+def test_generate_labber_files_batch_live(data_dir, tmp_path):
+    server = FakeDataServer()
+    for serial in ["dev1234", "dev1235"]:
+        server.add_device(
+            serial, data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI", options="MF"
+        )
+    with fake_data_server(server), mock.patch.object(
+        server, "listNodesJSON", wraps=server.listNodesJSON
+    ) as list_nodes:
+        results = generate_labber_files_batch(
+            str(tmp_path),
+            "NORMAL",
+            [DeviceEntry("dev1234"), DeviceEntry("dev1235")],
+            max_workers=1,
+        )
+    assert [result.error for result in results] == [None] * 4
+    assert [len(result.created) for result in results[:2]] == [4, 0]
+    assert (tmp_path / "Zurich_Instruments_UHFLI_MF").exists()
+    assert not any("dev1235" in str(call) for call in list_nodes.call_args_list)
+
+
+@mock.patch("zhinst.labber.cli_script.generate_labber_files_batch")
+def test_cli_script_batch(mock_batch, tmp_path):
+    mock_batch.return_value = [
+        GenerationResult("DEV1234", 1.5, [Path("foo")], []),
+        GenerationResult("DataServer localhost", 0.5, [], [Path("bar")]),
+        GenerationResult("Static drivers", 0.0, [], []),
+    ]
+    inventory = tmp_path / "devices.json"
+    inventory.write_text(json.dumps(["dev2345"]))
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [
+            "batch",
+            str(tmp_path),
+            "dev1234",
+            "--server_host=10.0.0.1",
+            f"--inventory={inventory}",
+            "--jobs=4",
+        ],
+    )
+    assert result.exit_code == 0
+    mock_batch.assert_called_once_with(
+        driver_directory=str(tmp_path),
+        mode="NORMAL",
+        devices=[
+            DeviceEntry("dev1234", server_host="10.0.0.1"),
+            DeviceEntry("dev2345"),
+        ],
+        upgrade=False,
+        max_workers=4,
+    )
+    assert "Generated file: foo" in result.output
+    assert "Upgraded file: bar" in result.output
+    assert "DEV1234                  1.50s  1 generated, 0 upgraded" in result.output
+    assert "Static drivers           0.00s  up to date" in result.output
+
+    mock_batch.return_value = [
+        GenerationResult("DEV1234", 1.5, [], [], error="Device not found")
+    ]
+    result = runner.invoke(main, ["batch", str(tmp_path), "dev1234"])
+    assert result.exit_code == 1
+    assert "failed: Device not found" in result.output
+
+    result = runner.invoke(main, ["batch", str(tmp_path), "dev1234", "--no-summary"])
+    assert result.exit_code == 1
+    assert "Summary:" not in result.output
+    assert "DEV1234 failed: Device not found" in result.output
+
+
+def test_cli_script_batch_errors(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(main, ["batch", str(tmp_path)])
+    assert result.exit_code == 2
+    assert "Specify DEVICE_IDS or --inventory." in result.output
+
+    inventory = tmp_path / "devices.json"
+    inventory.write_text(json.dumps([{"foo": "bar"}]))
+    result = runner.invoke(main, ["batch", str(tmp_path), f"--inventory={inventory}"])
+    assert result.exit_code == 2
@@ -111,6 +111,18 @@ def test_cli_script_no_files(mock_gen):
         assert "Error: It appears that the driver already exists" in result.output
 
 
+@mock.patch("zhinst.labber.cli_script.generate_labber_files", return_value=[[], []])
+def test_cli_script_up_to_date(mock_gen):
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        result = runner.invoke(
+            main, ["setup", tmpdirname, "dev1234", "localhost", "--upgrade"]
+        )
+        assert result.exit_code == 0
+        assert "The drivers are up to date." in result.output
+        assert "Error" not in result.output
+
+
 @mock.patch("zhinst.labber.cli_script.generate_labber_files")
 def test_cli_script_setup_errors(mock_gen):
     runner = CliRunner()
@@ -132,3 +144,100 @@ def test_cli_script_setup_errors(mock_gen):
         mock_gen.assert_not_called()
         assert result.exit_code == 2
         assert "Error: Missing argument 'SERVER_HOST'." in result.output
+
+
+@mock.patch(
+    "zhinst.labber.cli_script.generate_labber_files_offline",
+    return_value=[["bar"], []],
+)
+@mock.patch("zhinst.labber.cli_script.generate_labber_files")
+def test_cli_script_setup_offline(mock_gen, mock_offline, tmp_path):
+    nodedoc = tmp_path / "nodedoc.json"
+    nodedoc.write_text("{}")
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [
+            "setup",
+            str(tmp_path),
+            "dev1234",
+            "localhost",
+            f"--nodedoc={nodedoc}",
+            "--device_type=UHFLI",
+            "--options=MF, AWG",
+            "--labone_version=23.10",
+            "--module_nodedoc",
+            "DAQ=daq.json",
+        ],
+    )
+    assert result.exit_code == 0
+    mock_gen.assert_not_called()
+    mock_offline.assert_called_once_with(
+        driver_directory=str(tmp_path),
+        mode="NORMAL",
+        device_id="dev1234",
+        nodedoc=str(nodedoc),
+        device_type="UHFLI",
+        server_host="localhost",
+        options="MF\nAWG",
+        labone_version="23.10",
+        module_nodedocs={"daq": "daq.json"},
+        upgrade=False,
+        server_port=None,
+        hf2=False,
+    )
+    assert "Generated file: bar" in result.output
+
+
+@mock.patch("zhinst.labber.cli_script.generate_labber_files_offline")
+def test_cli_script_setup_offline_errors(mock_offline, tmp_path):
+    nodedoc = tmp_path / "nodedoc.json"
+    nodedoc.write_text("{}")
+    runner = CliRunner()
+    command = ["setup", str(tmp_path), "dev1234", "localhost"]
+
+    result = runner.invoke(main, command + [f"--nodedoc={nodedoc}"])
+    assert result.exit_code == 2
+    assert "--nodedoc requires --device_type." in result.output
+
+    result = runner.invoke(main, command + ["--device_type=UHFLI"])
+    assert result.exit_code == 2
+
+    result = runner.invoke(
+        main,
+        command
+        + [f"--nodedoc={nodedoc}", "--device_type=UHFLI", "--module_nodedoc=daq"],
+    )
+    assert result.exit_code == 2
+    assert "MODULE=FILE" in result.output
+
+    result = runner.invoke(
+        main,
+        command
+        + [f"--nodedoc={nodedoc}", "--device_type=UHFLI", "--module_nodedoc=foo=a"],
+    )
+    assert result.exit_code == 2
+    assert "Unknown module foo" in result.output
+    mock_offline.assert_not_called()
+
+
+@mock.patch("zhinst.labber.cli_script.serve")
+def test_cli_script_broker(mock_serve):
+    runner = CliRunner()
+    result = runner.invoke(main, ["broker"])
+    assert result.exit_code == 0
+    mock_serve.assert_called_once_with(
+        host="localhost", port=8020, authkey=None, snapshot_ttl=1.0
+    )
+
+    # remote access requires an explicit key
+    mock_serve.reset_mock()
+    result = runner.invoke(main, ["broker", "--host", "0.0.0.0"])
+    assert result.exit_code != 0
+    assert "--authkey" in result.output
+    mock_serve.assert_not_called()
+    result = runner.invoke(main, ["broker", "--host", "0.0.0.0", "--authkey", "key"])
+    assert result.exit_code == 0
+    mock_serve.assert_called_once_with(
+        host="0.0.0.0", port=8020, authkey="key", snapshot_ttl=1.0
+    )
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+
+import pytest
+
+from zhinst.labber.code_generator.drivers import (
+    DEVICE_TEMPLATE,
+    TEMPLATE_DIR,
+    generate_labber_device_driver_code,
+)
+
+
+def test_device_template_up_to_date():
+    pytest.importorskip("black")
+    pytest.importorskip("autoflake")
+    pytest.importorskip("jinja2")
+    from zhinst.labber.code_generator.drivers import build_device_template
+
+    assert DEVICE_TEMPLATE.read_text(encoding="utf-8") == build_device_template(), (
+        "device_template.py.tmpl is outdated. Update it with "
+        "zhinst.labber.code_generator.drivers.write_device_template()"
+    )
+
+
+@pytest.mark.parametrize(
+    "classname, settings_file",
+    [
+        ("Zurich_Instruments_UHFLI", "settings.json"),
+        ("Zurich_Instruments_SHFQA4_" + "OPTION_" * 20, "settings.json"),
+        ("DataServer", "$HOME/settings.json"),
+    ],
+)
+def test_generate_labber_device_driver_code(classname, settings_file):
+    black = pytest.importorskip("black")
+    autoflake = pytest.importorskip("autoflake")
+    jinja2 = pytest.importorskip("jinja2")
+
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=TEMPLATE_DIR))
+    expected = env.get_template("device_template.py.j2").render(
+        {
+            "class": {"name": classname},
+            "settings_file": settings_file,
+            "metadata_file": "quant_metadata.py",
+        }
+    )
+    expected = black.format_str(expected, mode=black.FileMode())
+    expected = autoflake.fix_code(expected, remove_all_unused_imports=True)
+    assert generate_labber_device_driver_code(classname, settings_file) == expected
+
+
+def test_generate_code_without_formatters():
+    code = (
+        "import sys\n"
+        "from zhinst.labber.code_generator.drivers import "
+        "generate_labber_device_driver_code\n"
+        "generate_labber_device_driver_code('A', 'settings.json')\n"
+        "print([m for m in ['black', 'autoflake', 'jinja2'] if m in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
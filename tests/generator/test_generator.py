@@ -1,5 +1,7 @@
 from collections import OrderedDict
 import pytest
+import subprocess
+import sys
 from pathlib import Path
 from unittest.mock import Mock, patch
 import tempfile
@@ -9,8 +11,11 @@ from zhinst.labber.generator.generator import (
     conf_to_labber_format,
     DeviceConfig,
     generate_labber_files,
+    generate_labber_files_offline,
     order_labber_config,
 )
+from zhinst.labber.generator.manifest import MANIFEST_FILENAME
+from zhinst.labber.testing import FakeDataServer, fake_data_server
 from zhinst.toolkit.driver.devices import UHFLI, SHFQA
 
 NUM_STATIC_Files = 3
@@ -216,10 +221,11 @@ def test_generate_labber_drivers_amt_uhfli(
     session.connect_device = Mock(return_value=uhfli)
     with tempfile.TemporaryDirectory() as tmpdirname:
         created, _ = generate_labber_files(tmpdirname, "normal", "dev1234", "localhost")
-    # Dataserver + device + amount of zimodules. Times 3 (.json file, .ini, file, .py file)
+    # Dataserver + device + amount of zimodules. Times 4 (.json file, .ini file,
+    # .py file, quant_metadata.py file)
     assert len(settings_json["misc"]["ziModules"]) == 3
     # No SHFQA_Sweeper: Minus 1 from ziModules lengths
-    assert len(created) == (1 + len(settings_json["misc"]["ziModules"])) * 3 + NUM_STATIC_Files
+    assert len(created) == (1 + len(settings_json["misc"]["ziModules"])) * 4 + NUM_STATIC_Files
 
 
 @patch("zhinst.labber.generator.generator.Session")
@@ -230,10 +236,11 @@ def test_generate_labber_drivers_amt_shfqa(gen_ses, shfqa, session, settings_jso
     session.connect_device = Mock(return_value=shfqa)
     with tempfile.TemporaryDirectory() as tmpdirname:
         created, _ = generate_labber_files(tmpdirname, "normal", "dev1234", "localhost")
-    # Dataserver + device + amount of zimodules. Times 3 (.json file, .ini, file, .py file)
+    # Dataserver + device + amount of zimodules. Times 4 (.json file, .ini file,
+    # .py file, quant_metadata.py file)
     assert len(settings_json["misc"]["ziModules"]) == 3
     # SHFQA_Sweeper included
-    assert len(created) == (1 + len(settings_json["misc"]["ziModules"])) * 3 + NUM_STATIC_Files
+    assert len(created) == (1 + len(settings_json["misc"]["ziModules"])) * 4 + NUM_STATIC_Files
     files = [
         Path(tmpdirname)
         / "Zurich_Instruments_SHFQA4_FOO_BAR"
@@ -260,6 +267,103 @@ def test_generate_labber_drivers_amt_shfqa(gen_ses, shfqa, session, settings_jso
         assert file in created
 
 
+def _read_tree(root):
+    return {
+        path.relative_to(root): path.read_bytes()
+        for path in sorted(Path(root).rglob("*"))
+        if path.is_file() and path.name != MANIFEST_FILENAME
+    }
+
+
+def test_generate_labber_files_offline(data_dir, tmp_path):
+    module_nodedocs = {
+        "daq": data_dir / "nodedoc_daq_test.json",
+        "sweeper": data_dir / "nodedoc_sweeper_test.json",
+    }
+    server = FakeDataServer(
+        module_nodedocs={
+            "dataAcquisitionModule": module_nodedocs["daq"],
+            "sweep": module_nodedocs["sweeper"],
+        }
+    )
+    server.add_device(
+        "dev1234", data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI", options="MF\nAWG"
+    )
+    (tmp_path / "live").mkdir()
+    (tmp_path / "offline").mkdir()
+    with fake_data_server(server):
+        live, _ = generate_labber_files(
+            str(tmp_path / "live"), "NORMAL", "dev1234", "localhost"
+        )
+
+    with patch("zhinst.core.ziDAQServer", side_effect=RuntimeError) as connection:
+        offline, _ = generate_labber_files_offline(
+            str(tmp_path / "offline"),
+            "NORMAL",
+            "dev1234",
+            data_dir / "nodedoc_dev1234_uhfli.json",
+            "UHFLI",
+            options="MF\nAWG",
+            module_nodedocs=module_nodedocs,
+        )
+    connection.assert_not_called()
+    assert len(offline) == len(live)
+    assert _read_tree(tmp_path / "offline") == _read_tree(tmp_path / "live")
+    assert (
+        tmp_path / "offline" / "Zurich_Instruments_UHFLI_MF_AWG" / "settings.json"
+    ).exists()
+
+    with pytest.raises(ValueError):
+        generate_labber_files_offline(
+            str(tmp_path / "offline"),
+            "NORMAL",
+            "dev1234",
+            data_dir / "nodedoc_dev1234_uhfli.json",
+            "UHFLI",
+            module_nodedocs={"foo": data_dir / "nodedoc_daq_test.json"},
+        )
+
+
+def test_generate_labber_files_offline_without_module_nodedoc(data_dir, tmp_path):
+    with pytest.warns(UserWarning, match="sweeper"):
+        generate_labber_files_offline(
+            str(tmp_path),
+            "NORMAL",
+            "dev1234",
+            data_dir / "nodedoc_dev1234_uhfli.json",
+            "UHFLI",
+            module_nodedocs={"daq": data_dir / "nodedoc_daq_test.json"},
+        )
+
+
+def test_generator_without_test_utilities():
+    code = (
+        "import sys\n"
+        "import zhinst.labber.generator.batch\n"
+        "print('zhinst.labber.testing' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_offline_session():
+    import zhinst.core
+    from zhinst.toolkit.driver.modules import shfqa_sweeper
+
+    from zhinst.labber.offline_server import offline_session
+
+    connection = zhinst.core.ziDAQServer
+    sweeper_connection = shfqa_sweeper.ziDAQServer
+    server = FakeDataServer()
+    with offline_session(server) as session:
+        assert session.daq_server is server
+        assert zhinst.core.ziDAQServer is connection
+        assert shfqa_sweeper.ziDAQServer("localhost", 8004, 6) is server
+    assert shfqa_sweeper.ziDAQServer is sweeper_connection
+
+
 @patch("zhinst.labber.generator.generator.Session")
 def test_generate_labber_drivers_exists_shfqa(gen_ses, shfqa, session):
     gen_ses.return_value = session
@@ -283,36 +387,44 @@ def test_generate_labber_drivers_exists_upgrade_shfqa(gen_ses, shfqa, session):
     shfqa.features.options = Mock(return_value="FOO\nBAR")
     session.connect_device = Mock(return_value=shfqa)
     with tempfile.TemporaryDirectory() as tmpdirname:
+        files = [
+            Path(tmpdirname)
+            / "Zurich_Instruments_SHFQA4_FOO_BAR"
+            / "Zurich_Instruments_SHFQA4_FOO_BAR.py",
+            Path(tmpdirname) / "Zurich_Instruments_SHFQA4_FOO_BAR" / "settings.json",
+            Path(tmpdirname)
+            / "Zurich_Instruments_SHFQA4_FOO_BAR"
+            / "Zurich_Instruments_SHFQA4_FOO_BAR.ini",
+            Path(tmpdirname)
+            / "Zurich_Instruments_DataServer"
+            / "Zurich_Instruments_DataServer.py",
+            Path(tmpdirname) / "Zurich_Instruments_DataServer" / "settings.json",
+            Path(tmpdirname)
+            / "Zurich_Instruments_DataServer"
+            / "Zurich_Instruments_DataServer.ini",
+            Path(tmpdirname)
+            / "Zurich_Instruments_Waveform_Processor"
+            / "Zurich_Instruments_Waveform_Processor.ini",
+            Path(tmpdirname)
+            / "Zurich_Instruments_Waveform_Processor"
+            / "Zurich_Instruments_Waveform_Processor.py",
+        ]
         _, _ = generate_labber_files(
             tmpdirname, "normal", "dev1234", "localhost", upgrade=True
         )
+        for file in files:
+            file.write_text("outdated")
         _, generated = generate_labber_files(
             tmpdirname, "normal", "dev1234", "localhost", upgrade=True
         )
-    files = [
-        Path(tmpdirname)
-        / "Zurich_Instruments_SHFQA4_FOO_BAR"
-        / "Zurich_Instruments_SHFQA4_FOO_BAR.py",
-        Path(tmpdirname) / "Zurich_Instruments_SHFQA4_FOO_BAR" / "settings.json",
-        Path(tmpdirname)
-        / "Zurich_Instruments_SHFQA4_FOO_BAR"
-        / "Zurich_Instruments_SHFQA4_FOO_BAR.ini",
-        Path(tmpdirname)
-        / "Zurich_Instruments_DataServer"
-        / "Zurich_Instruments_DataServer.py",
-        Path(tmpdirname) / "Zurich_Instruments_DataServer" / "settings.json",
-        Path(tmpdirname)
-        / "Zurich_Instruments_DataServer"
-        / "Zurich_Instruments_DataServer.ini",
-        Path(tmpdirname)
-        / "Zurich_Instruments_Waveform_Processor"
-        / "Zurich_Instruments_Waveform_Processor.ini",
-        Path(tmpdirname)
-        / "Zurich_Instruments_Waveform_Processor"
-        / "Zurich_Instruments_Waveform_Processor.py",
-    ]
-    for file in files:
-        assert file in generated
+        for file in files:
+            assert file in generated
+        # Unchanged files are not rewritten
+        created, generated = generate_labber_files(
+            tmpdirname, "normal", "dev1234", "localhost", upgrade=True
+        )
+        assert created == []
+        assert generated == []
 
 
 class TestLabberConfigSHFQA:
@@ -367,3 +479,18 @@ def test_order_labber_config():
     assert order_labber_config(
         conf, {}
     ) == conf
+
+
+def test_order_labber_config_buckets():
+    conf = {
+        "foo/bar1": {"section": "Section 2"},
+        "foo/bar2": {"section": "other"},
+        "foo/bar3": {},
+        "foo/bar4": {"section": "section 0"},
+        "foo/bar5": {"section": "section 2"},
+    }
+    assert list(
+        order_labber_config(
+            conf, {"sections": ["section 0", "SECTION 2", "section 0", "missing"]}
+        )
+    ) == ["foo/bar4", "foo/bar1", "foo/bar5", "foo/bar2", "foo/bar3"]
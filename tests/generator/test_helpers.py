@@ -99,6 +99,20 @@ def test_match_in_list_match(target, data, idx):
     assert item == data[idx]
 
 
+def test_pattern_set():
+    patterns = helpers.PatternSet(["bar/*", "/qachannels/*/foobar/*", "/QAchannels/*"])
+    # first match wins
+    assert patterns.match("/qaCHAnnels/0/foobar/1") == "/qachannels/*/foobar/*"
+    assert patterns.match("qachannels/0/Foo/") == "/QAchannels/*"
+    assert patterns.match("/foo") is None
+    assert helpers.PatternSet([]).match("/foo") is None
+
+    patterns = helpers.PatternSet(
+        ["/sines/<n>/*"], lambda pattern: pattern.replace("<n>", "*")
+    )
+    assert patterns.match("sines/0/amplitude") == "/sines/<n>/*"
+
+
 @pytest.mark.parametrize(
     "tp, node, enum, out",
     [
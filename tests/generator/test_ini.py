@@ -0,0 +1,89 @@
+import configparser
+import io
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from zhinst.labber.generator.generator import (
+    DeviceConfig,
+    dict_to_config,
+    generate_labber_files_offline,
+    iter_labber_format,
+    open_settings_file,
+)
+from zhinst.labber.generator.ini import write_ini
+from zhinst.labber.testing import FakeDataServer, fake_data_server
+from zhinst.toolkit import Session
+
+GOLDEN_DIR = Path(__file__).parent.parent / "data" / "generator"
+
+
+def _configparser_output(sections):
+    config = configparser.ConfigParser()
+    for title, items in sections:
+        config.add_section(title)
+        for name, value in items.items():
+            config.set(title, name, value)
+    file = io.StringIO()
+    config.write(file)
+    return file.getvalue()
+
+
+def test_write_ini():
+    sections = [
+        ("General settings", {"name": "Zurich Instruments Test", "version": "1.0"}),
+        ("Bar - 0 - Wave", {"Label": "Wave", "set_cmd": "/bar/0", "label": "Last"}),
+        ("Empty", {}),
+        ("Tooltip", {"tooltip": "<html>\nline\n\nend</html>"}),
+    ]
+    file = io.StringIO()
+    write_ini(file, iter(sections))
+    assert file.getvalue() == _configparser_output(sections)
+    assert "[Bar - 0 - Wave]\nlabel = Last\nset_cmd = /bar/0\n\n" in file.getvalue()
+
+    with pytest.raises(configparser.DuplicateSectionError):
+        write_ini(io.StringIO(), sections + sections[:1])
+    with pytest.raises(ValueError):
+        write_ini(io.StringIO(), [("Unit", {"unit": "%"})])
+    file = io.StringIO()
+    write_ini(file, [("Unit", {"unit": "100%%"})])
+    assert file.getvalue() == "[Unit]\nunit = 100%%\n\n"
+
+
+@pytest.mark.parametrize("mode", ["NORMAL", "ADVANCED"])
+def test_write_ini_device(data_dir, mode):
+    server = FakeDataServer()
+    server.add_device("dev1234", data_dir / "nodedoc_dev1234_shfqa.json", "SHFQA4")
+    with fake_data_server(server):
+        session = Session("localhost")
+        settings = open_settings_file()
+        config = DeviceConfig(
+            session.connect_device("dev1234"), session, settings, mode
+        )
+        data = config.config()
+    delim = settings["misc"]["labberDelimiter"]
+    order = config.env_settings.quant_order
+
+    expected = configparser.ConfigParser()
+    dict_to_config(expected, data, delim=delim, order=order)
+    expected_file = io.StringIO()
+    expected.write(expected_file)
+    file = io.StringIO()
+    write_ini(file, iter_labber_format(data, delim=delim, order=order))
+    assert file.getvalue() == expected_file.getvalue()
+
+
+@patch("zhinst.labber.generator.generator.__version__", "dev")
+def test_write_ini_golden(data_dir, tmp_path):
+    generate_labber_files_offline(
+        str(tmp_path),
+        "NORMAL",
+        "dev1234",
+        data_dir / "nodedoc_dev1234_shfqa.json",
+        "SHFQA4",
+        module_nodedocs={"daq": data_dir / "nodedoc_daq_test.json"},
+    )
+    name = "Zurich_Instruments_DAQ_Module.ini"
+    generated = tmp_path / "Zurich_Instruments_DAQ_Module" / name
+    assert generated.read_bytes() == (GOLDEN_DIR / name).read_bytes()
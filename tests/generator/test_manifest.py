@@ -0,0 +1,133 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from zhinst.labber.generator import generator
+from zhinst.labber.generator.generator import (
+    DeviceConfig,
+    Filehandler,
+    generate_labber_files_offline,
+    open_settings_file,
+)
+from zhinst.labber.generator.manifest import (
+    MANIFEST_FILENAME,
+    Manifest,
+    content_hash,
+    file_hash,
+)
+from zhinst.labber.testing import FakeDataServer, fake_data_server
+from zhinst.toolkit import Session
+
+
+def test_file_hash(tmp_path):
+    path = tmp_path / "test.ini"
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[a]\nb = ü\n")
+    assert file_hash(path) == content_hash("[a]\nb = ü\n")
+    assert file_hash(tmp_path / "missing.ini") is None
+
+
+def test_manifest(tmp_path):
+    files = {"A/A.ini": "[a]\n", "A/A.py": "pass\n"}
+    (tmp_path / "A").mkdir()
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+
+    manifest = Manifest(tmp_path, "settings")
+    assert not manifest.is_current("A", "inputs")
+    manifest.update("A", "inputs", files)
+    manifest.save()
+    assert (tmp_path / MANIFEST_FILENAME).exists()
+
+    manifest = Manifest(tmp_path, "settings")
+    assert manifest.is_current("A", "inputs")
+    assert not manifest.is_current("A", "other")
+    assert not manifest.is_current("B", "inputs")
+    # Other settings file or package version
+    assert not Manifest(tmp_path, "other").is_current("A", "inputs")
+    with patch("zhinst.labber.generator.manifest.__version__", "0.0.1"):
+        assert not Manifest(tmp_path, "settings").is_current("A", "inputs")
+    # Modified or deleted files
+    (tmp_path / "A/A.py").write_text("modified\n")
+    assert not manifest.is_current("A", "inputs")
+    (tmp_path / "A/A.py").unlink()
+    assert not manifest.is_current("A", "inputs")
+
+    (tmp_path / MANIFEST_FILENAME).write_text("invalid")
+    assert not Manifest(tmp_path, "settings").is_current("A", "inputs")
+
+
+def test_input_hash(data_dir):
+    server = FakeDataServer()
+    server.add_device("dev1234", data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI")
+    server.add_device("dev5678", data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI")
+    server.add_device(
+        "dev2345", data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI", options="MF"
+    )
+    with fake_data_server(server):
+        session = Session("localhost")
+        hashes = [
+            DeviceConfig(
+                session.connect_device(serial), session, open_settings_file(), mode
+            ).input_hash()
+            for serial, mode in [
+                ("dev1234", "NORMAL"),
+                ("dev5678", "NORMAL"),
+                ("dev2345", "NORMAL"),
+                ("dev1234", "ADVANCED"),
+            ]
+        ]
+    # The serial is not part of the generated files
+    assert hashes[0] == hashes[1]
+    assert len(set(hashes)) == 3
+
+
+@pytest.mark.parametrize("upgrade", [False, True])
+def test_generate_skips_unchanged_drivers(data_dir, tmp_path, upgrade):
+    kwargs = {
+        "driver_directory": str(tmp_path),
+        "mode": "NORMAL",
+        "device_id": "dev1234",
+        "nodedoc": data_dir / "nodedoc_dev1234_uhfli.json",
+        "device_type": "UHFLI",
+        "upgrade": upgrade,
+    }
+    created, _ = generate_labber_files_offline(**kwargs)
+    assert created
+    with patch.object(
+        generator, "render_labber_files", wraps=generator.render_labber_files
+    ) as render:
+        assert generate_labber_files_offline(**kwargs) == ([], [])
+        render.assert_not_called()
+
+        # Deleted files are regenerated
+        ini = tmp_path / "Zurich_Instruments_UHFLI" / "Zurich_Instruments_UHFLI.ini"
+        ini.unlink()
+        assert generate_labber_files_offline(**kwargs) == ([ini], [])
+        render.assert_called_once()
+
+        # Changed inputs are rendered again
+        render.reset_mock()
+        created, upgraded = generate_labber_files_offline(
+            **kwargs, labone_version="23.10"
+        )
+        assert render.call_count == 4
+        assert created == []
+        # Only the version in the .ini files changed
+        if upgrade:
+            assert sorted(path.suffix for path in upgraded) == [".ini"] * 4
+        else:
+            assert upgraded == []
+
+
+def test_filehandler_unchanged_files(tmp_path):
+    config = Mock()
+    config.name = "Zurich_Instruments_TEST"
+    handler = Filehandler(config, tmp_path, upgrade=True)
+    path = tmp_path / config.name / "test.txt"
+    handler.write_to_file(path, lambda file: file.write("a"))
+    handler.write_to_file(path, lambda file: file.write("a"))
+    handler.write_to_file(path, lambda file: file.write("b"))
+    assert handler.created_files == [path]
+    assert handler.upgraded_files == [path]
+    assert path.read_text() == "b"
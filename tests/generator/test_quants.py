@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 
 from zhinst.labber.generator.quants import Quant, NodeQuant, QuantGenerator
@@ -209,6 +211,18 @@ class TestNodeQuant:
         with pytest.raises(ValueError):
             NodeQuant(info)
 
+    def test_options_evaluated_once(self):
+        obj = NodeQuant(dict(node_dict_enum, Properties="Read, Write"))
+        assert not hasattr(obj, "__dict__")
+        with patch(
+            "zhinst.labber.generator.quants.helpers.tooltip", return_value="tooltip"
+        ) as tooltip:
+            assert obj.combo_defs["combo_def_1"] == "lowpass_1500"
+            assert obj.tooltip == "tooltip"
+            obj.as_dict()
+        tooltip.assert_called_once()
+
+
 class TestQuantSuffix:
     conf = {"datatype": "BOO", "suffix": "File", "permission": "READ"}
     path = "/qachannels/0/generator/arm/"
@@ -460,6 +474,16 @@ class TestQuantGenerator:
         r = q_gen.quant_paths("/foo/*/bar/*", ["dev", 1, 2])
         assert r == []
 
+    def test_quant_paths_large_indexes(self):
+        q_gen = QuantGenerator(
+            [f"/DEV1234/FOO/{i}/BAR/{j}" for i in range(12) for j in range(2)]
+        )
+        r = q_gen.quant_paths("/foo/*/bar/*", ["dev", "dev"])
+        assert len(r) == 24
+        assert r[-2:] == ["/foo/11/bar/0", "/foo/11/bar/1"]
+        r = q_gen.quant_paths("/foo/0/bar/*", ["dev"])
+        assert r == ["/foo/0/bar/0", "/foo/0/bar/1"]
+
     @pytest.mark.parametrize(
         "string, target, n, idx",
         [
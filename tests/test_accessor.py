@@ -0,0 +1,23 @@
+import pytest
+
+from zhinst.labber.driver.accessor import Accessor
+
+
+def test_accessor():
+    value = {"vector": [1, 2, 3], "nested": [{"x": 4}]}
+    assert Accessor("")(value) is value
+    assert Accessor("['vector']")(value) == [1, 2, 3]
+    assert Accessor("['vector'][-1]")(value) == 3
+    assert Accessor(' ["nested"][0]["x"]')(value) == 4
+    assert Accessor("['nested'][0]['x']").keys == ("nested", 0, "x")
+    with pytest.raises(KeyError):
+        Accessor("['unknown']")(value)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["['a'", ".vector", "['a'].b", "[len('a')]", "[1:2]", "[0.5]", "x['a']"],
+)
+def test_invalid_accessor(expression):
+    with pytest.raises(ValueError):
+        Accessor(expression)
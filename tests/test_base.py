@@ -9,6 +9,7 @@ import numpy as np
 sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
 import zhinst.labber.driver.base_instrument as labber_driver
 from zhinst.labber.driver.base_instrument import logger
+from zhinst.labber.driver.hardware_loop import MODULE_TIMEOUT_MARGIN
 from labber.BaseDriver import InstrumentQuantity
 
 
@@ -198,6 +199,18 @@ class TestBase:
         mock_toolkit_session.assert_called_with("testee", 6543, hf2=False)
         assert session_driver._instrument == session_driver._session
 
+    def test_performOpen_broker(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        device_driver._instrument_settings["data_server"]["broker"] = {"port": 8020}
+        with patch(
+            "zhinst.labber.driver.base_instrument.connect_broker"
+        ) as connect_broker:
+            device_driver.performOpen()
+        connect_broker.assert_called_once_with({"port": 8020}, "localhost", 8004, False)
+        mock_toolkit_session.assert_called_with(
+            "localhost", 8004, hf2=False, connection=connect_broker.return_value
+        )
+
     def test_performSet_node(self, mock_toolkit_session, device_driver):
         device_driver.comCfg.getAddressString.return_value = "DEV1234"
         device_driver.performOpen()
@@ -786,6 +799,81 @@ class TestBase:
             ["sig3"],
         )
 
+    def test_module_arm(self, mock_toolkit_session, daq_module):
+        daq_module.comCfg.getAddressString.return_value = "DEV1234"
+        daq_module.performOpen()
+        daq_module.isStopped = Mock(return_value=False)
+        daq_module.wait = Mock()
+        raw_module = daq_module._instrument.raw_module
+        raw_module.getDouble.return_value = 0.5
+
+        create_quant_mock("Signal - 1", daq_module, "", "")
+        result_quant = create_quant_mock("Result - 1", daq_module, "", "")
+        daq_module.instrCfg.getQuantity.return_value.getValue.return_value = "test/a/b"
+
+        # no hardware loop => nothing to arm
+        daq_module.performArm([])
+        raw_module.execute.assert_not_called()
+
+        daq_module.performArm(["Result - 1"], options={"n_seq": 3, "seq_no": 0})
+        raw_module.subscribe.assert_called_with("/dev1234/test/a/b")
+        raw_module.set.assert_any_call("count", 3)
+        raw_module.execute.assert_called_once()
+        raw_module.getDouble.assert_called_with("duration")
+        assert daq_module._module_results.timeout == 1.0 + MODULE_TIMEOUT_MARGIN
+
+        # the module is only started once
+        daq_module._call_module_execute()
+        raw_module.execute.assert_called_once()
+
+        records = [{"value": np.array([[i, i + 1]])} for i in range(3)]
+        raw_module.finished.return_value = False
+        raw_module.read.side_effect = [
+            {"/dev1234/test/a/b": [records[:1]]},
+            {"/dev1234/test/a/b": [records[:2]]},
+            {"/dev1234/test/a/b": [records]},
+        ]
+        results = [
+            daq_module.performGetValue(
+                result_quant, options={"n_seq": 3, "seq_no": seq_no}
+            )
+            for seq_no in range(3)
+        ]
+        assert raw_module.read.call_count == 3
+        np.testing.assert_array_equal(results[2], [2, 3])
+        assert daq_module._module_results is None
+
+        # missing step
+        daq_module.performArm(["Result - 1"], options={"n_seq": 3, "seq_no": 0})
+        raw_module.finished.return_value = True
+        raw_module.read.side_effect = None
+        raw_module.read.return_value = {}
+        with patch("zhinst.labber.driver.base_instrument.logger") as logger:
+            result = daq_module.performGetValue(
+                result_quant, options={"n_seq": 3, "seq_no": 1}
+            )
+        assert len(result) == 0
+        logger.error.assert_called_with("%s: no result for step %d", "Result - 1", 1)
+
+        # module without progress => the read is aborted after the timeout
+        daq_module.performArm(["Result - 1"], options={"n_seq": 3, "seq_no": 0})
+        daq_module._module_results.timeout = 0.05
+        raw_module.finished.return_value = False
+        with patch("zhinst.labber.driver.base_instrument.logger") as logger:
+            result = daq_module.performGetValue(
+                result_quant, options={"n_seq": 3, "seq_no": 0}
+            )
+            assert len(result) == 0
+            logger.error.assert_any_call(
+                "%s: module did not return a record within %.3fs", "Result - 1", 0.05
+            )
+            read_count = raw_module.read.call_count
+            result = daq_module.performGetValue(
+                result_quant, options={"n_seq": 3, "seq_no": 1}
+            )
+        assert len(result) == 0
+        assert raw_module.read.call_count == read_count
+
     def test_module_clear(self, mock_toolkit_session, daq_module):
         daq_module.comCfg.getAddressString.return_value = "DEV1234"
         daq_module.performOpen()
@@ -868,3 +956,233 @@ class TestBase:
         np.testing.assert_array_equal(
             expected_set, device_driver._instrument[quant.set_cmd].call_args[0][0]
         )
+
+    def test_hardware_loop(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        device_driver._device_type = "SHFSG8"
+        device_driver.performOpen()
+        awg = device_driver._instrument["sgchannels/0/awg"]
+
+        amplitude = create_quant_mock(
+            "sgchannels - 0 - awg - hardware_loop - amplitude", device_driver, "", ""
+        )
+        create_quant_mock(
+            "sgchannels - 0 - awg - hardware_loop - count_register",
+            device_driver,
+            "",
+            "",
+        )
+        device_driver.instrCfg.getQuantity.return_value.getValue.return_value = 2
+
+        # static value is uploaded directly
+        assert device_driver.performSetValue(amplitude, 0.5) == 0.5
+        awg.commandtable.upload_to_device.assert_called_once_with(
+            {
+                "table": [
+                    {
+                        "index": 0,
+                        "amplitude00": {"value": 0.5},
+                        "amplitude01": {"value": -0.5},
+                        "amplitude10": {"value": 0.5},
+                        "amplitude11": {"value": 0.5},
+                    }
+                ]
+            },
+            validate=True,
+        )
+        awg.commandtable.upload_to_device.reset_mock()
+
+        # hardware loop values are uploaded on arm
+        for seq_no, value in enumerate([0.1, 0.2, 0.3]):
+            device_driver.performSetValue(
+                amplitude, value, options={"n_seq": 3, "seq_no": seq_no}
+            )
+        awg.commandtable.upload_to_device.assert_not_called()
+        device_driver.performArm([], options={"n_seq": 3, "seq_no": 0})
+        table = awg.commandtable.upload_to_device.call_args[0][0]["table"]
+        assert [entry["index"] for entry in table] == [0, 1, 2]
+        assert [entry["amplitude00"]["value"] for entry in table] == [0.1, 0.2, 0.3]
+        awg.userregs[2].assert_called_with(3)
+
+        # upload error is logged
+        awg.commandtable.upload_to_device.side_effect = RuntimeError("Test")
+        with patch("zhinst.labber.driver.base_instrument.logger") as logger:
+            device_driver.performSetValue(amplitude, 0.5)
+        logger.error.assert_called_with(
+            "%s", awg.commandtable.upload_to_device.side_effect
+        )
+
+    def test_hardware_loop_hdawg_phase(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        device_driver._device_type = "HDAWG8"
+        device_driver.performOpen()
+        awg = device_driver._instrument["awgs/0"]
+        phase = create_quant_mock(
+            "awgs - 0 - hardware_loop - phase", device_driver, "", ""
+        )
+        device_driver.performSetValue(phase, 30)
+        entry = awg.commandtable.upload_to_device.call_args[0][0]["table"][0]
+        assert entry["phase0"] == {"value": 30}
+        assert entry["phase1"] == {"value": -60}
+
+    def test_hardware_loop_set_config(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        device_driver._device_type = "SHFSG8"
+        device_driver.performOpen()
+        awg = device_driver._instrument["sgchannels/0/awg"]
+        amplitude = create_quant_mock(
+            "sgchannels - 0 - awg - hardware_loop - amplitude", device_driver, "", ""
+        )
+        phase = create_quant_mock(
+            "sgchannels - 0 - awg - hardware_loop - phase", device_driver, "", ""
+        )
+        create_quant_mock(
+            "sgchannels - 0 - awg - hardware_loop - count_register",
+            device_driver,
+            "",
+            "",
+        )
+        device_driver.instrCfg.getQuantity.return_value.getValue.return_value = -1
+
+        # set config on load does not overwrite the command table
+        device_driver.performSetValue(
+            amplitude, 0.5, options={"call_no": 0, "n_calls": 2}
+        )
+        device_driver.performSetValue(phase, 90, options={"call_no": 1, "n_calls": 2})
+        awg.commandtable.upload_to_device.assert_not_called()
+
+        # changed values are uploaded after the transaction
+        device_driver.performSetValue(
+            amplitude, 0.2, options={"call_no": 0, "n_calls": 2}
+        )
+        awg.commandtable.upload_to_device.assert_not_called()
+        device_driver.performSetValue(phase, 90, options={"call_no": 1, "n_calls": 2})
+        awg.commandtable.upload_to_device.assert_called_once()
+        entry = awg.commandtable.upload_to_device.call_args[0][0]["table"][0]
+        assert entry["amplitude00"] == {"value": 0.2}
+        assert entry["phase"] == {"value": 90}
+        awg.commandtable.upload_to_device.reset_mock()
+
+        # unchanged values are not uploaded again on arm
+        device_driver.performArm([], options={"n_seq": 3, "seq_no": 0})
+        awg.commandtable.upload_to_device.assert_not_called()
+        device_driver.performSetValue(phase, 45, options={"call_no": 0, "n_calls": 2})
+        awg.commandtable.upload_to_device.assert_not_called()
+        # pending values are uploaded on arm
+        device_driver.performArm([], options={"n_seq": 3, "seq_no": 0})
+        awg.commandtable.upload_to_device.assert_called_once()
+
+    def test_hardware_loop_unswept_core(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        device_driver._device_type = "HDAWG8"
+        device_driver.performOpen()
+        awgs = [Mock(), Mock()]
+        device_driver._instrument.__getitem__.side_effect = {
+            f"awgs/{i}": awg for i, awg in enumerate(awgs)
+        }.get
+        amplitudes = [
+            create_quant_mock(
+                f"awgs - {i} - hardware_loop - amplitude", device_driver, "", ""
+            )
+            for i in range(2)
+        ]
+        for i, amplitude in enumerate(amplitudes):
+            device_driver.performSetValue(
+                amplitude, 0.5, options={"call_no": i, "n_calls": 2}
+            )
+        for seq_no, value in enumerate([0.1, 0.2]):
+            device_driver.performSetValue(
+                amplitudes[0], value, options={"n_seq": 2, "seq_no": seq_no}
+            )
+        device_driver.performArm([], options={"n_seq": 2, "seq_no": 0})
+        awgs[0].commandtable.upload_to_device.assert_called_once()
+        awgs[1].commandtable.upload_to_device.assert_not_called()
+
+        # a changed value only uploads the table of its core
+        awgs[0].commandtable.upload_to_device.reset_mock()
+        for i, value in enumerate([0.5, 0.3]):
+            device_driver.performSetValue(
+                amplitudes[i], value, options={"call_no": i, "n_calls": 2}
+            )
+        awgs[0].commandtable.upload_to_device.assert_not_called()
+        awgs[1].commandtable.upload_to_device.assert_called_once()
+
+    def test_hardware_loop_result(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        device_driver.performOpen()
+
+        quant = create_quant_mock(
+            "qas - 0 - result - data - 0 - wave",
+            device_driver,
+            "",
+            "qas/0/result/data/0/wave",
+        )
+        quant.VECTOR = InstrumentQuantity.VECTOR
+        quant.VECTOR_COMPLEX = InstrumentQuantity.VECTOR_COMPLEX
+        quant.datatype = InstrumentQuantity.VECTOR
+        device_driver._instrument[quant.get_cmd].return_value = np.arange(6)
+        results = [
+            device_driver.performGetValue(quant, options={"n_seq": 3, "seq_no": i})
+            for i in range(3)
+        ]
+        device_driver._instrument[quant.get_cmd].assert_called_once()
+        np.testing.assert_array_equal(results[1], [2, 3])
+
+        # other vectors are not split
+        other = create_quant_mock("Test - Name", device_driver, "", "test/node")
+        other.datatype = InstrumentQuantity.VECTOR
+        device_driver._instrument[other.get_cmd].return_value = np.arange(6)
+        result = device_driver.performGetValue(other, options={"n_seq": 3, "seq_no": 1})
+        np.testing.assert_array_equal(result, np.arange(6))
+
+    def test_performGetValue_vector_dtype(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        device_driver.performOpen()
+
+        quant = create_quant_mock("Test - Name", device_driver, "", "test/node")
+        quant.VECTOR = InstrumentQuantity.VECTOR
+        quant.VECTOR_COMPLEX = InstrumentQuantity.VECTOR_COMPLEX
+        quant.datatype = InstrumentQuantity.VECTOR_COMPLEX
+        vector = np.ones(100, dtype=np.complex64)
+        device_driver._instrument[quant.get_cmd].return_value = vector
+        assert device_driver.performGetValue(quant) is vector
+
+        device_driver._instrument[quant.get_cmd].return_value = {
+            "timestamp": 0,
+            "vector": vector,
+        }
+        assert device_driver.performGetValue(quant) is vector
+
+    def test_toolkit_function_cache(self, mock_toolkit_session, device_driver):
+        device_driver.comCfg.getAddressString.return_value = "DEV1234"
+        quant = create_quant_mock(
+            "awgs - 0 - commandtable - data", device_driver, "*.json", ""
+        )
+        device_driver.dQuantities[quant.name] = quant
+        device_driver.performOpen()
+        # resolved at open
+        assert list(device_driver._toolkit_functions) == [
+            ("awgs", "0", "commandtable", "upload_to_device")
+        ]
+        function = device_driver._instrument.awgs[0].commandtable.upload_to_device
+
+        input = Path("tests/data/test.json")
+        device_driver.instrCfg.getQuantity.return_value.getValue.return_value = input
+        device_driver.performSetValue(quant, input)
+        device_driver.performSetValue(quant, input)
+        assert device_driver._function_paths[quant.name] == Path(
+            "/awgs/0/commandtable/upload_to_device"
+        )
+        assert function.call_count == 2
+
+        # reconnect resolves the functions of the new instrument
+        mock_toolkit_session.return_value.connect_device.return_value = MagicMock()
+        device_driver.performOpen()
+        new_function = device_driver._instrument.awgs[0].commandtable.upload_to_device
+        assert new_function is not function
+        assert (
+            device_driver._toolkit_functions[
+                ("awgs", "0", "commandtable", "upload_to_device")
+            ]
+            is new_function
+        )
@@ -0,0 +1,252 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from zhinst.labber.driver import broker as labber_broker
+
+
+@pytest.fixture()
+def mock_daq_server():
+    with patch(
+        "zhinst.labber.driver.broker.core.ziDAQServer", autospec=True
+    ) as daq_server:
+        daq_server.return_value.getString.return_value = "DataServer"
+        yield daq_server
+
+
+@pytest.fixture()
+def shared_broker(mock_daq_server):
+    yield labber_broker.Broker(snapshot_ttl=60)
+
+
+def test_shared_connection(mock_daq_server, shared_broker):
+    client1 = shared_broker.connection("localhost", 8004, 6)
+    client2 = shared_broker.connection("localhost", 8004, 6)
+    client3 = shared_broker.connection("localhost", 8005, 1)
+    assert mock_daq_server.call_count == 2
+    mock_daq_server.assert_any_call("localhost", 8004, 6)
+    mock_daq_server.assert_any_call("localhost", 8005, 1)
+    daq_server = mock_daq_server.return_value
+
+    # node trees are only downloaded once
+    daq_server.listNodesJSON.return_value = "{}"
+    assert client1.listNodesJSON("/dev1234/*") == "{}"
+    assert client2.listNodesJSON("/dev1234/*") == "{}"
+    daq_server.listNodesJSON.assert_called_once_with("/dev1234/*")
+    client1.call("connectDevice", "dev1234", "1GbE")
+    client2.listNodesJSON("/dev1234/*")
+    assert daq_server.listNodesJSON.call_count == 2
+
+    # snapshots are shared until a value is set
+    daq_server.get.return_value = {"/dev1234/a": 1}
+    assert client1.get("/dev1234/*", flat=True) == {"/dev1234/a": 1}
+    assert client2.get("/dev1234/*", flat=True) == {"/dev1234/a": 1}
+    daq_server.get.assert_called_once_with("/dev1234/*", flat=True)
+    client2.call("set", "/dev1234/a", 2)
+    daq_server.set.assert_called_once_with("/dev1234/a", 2)
+    client1.get("/dev1234/*", flat=True)
+    assert daq_server.get.call_count == 2
+    # single nodes are not cached
+    client1.get("/dev1234/a", flat=True)
+    client1.get("/dev1234/a", flat=True)
+    assert daq_server.get.call_count == 4
+
+    client1.call("getInt", "/dev1234/a")
+    daq_server.getInt.assert_called_once_with("/dev1234/a")
+    with pytest.raises(AttributeError):
+        client1.call("dataAcquisitionModule")
+    del client3
+
+
+def test_shared_connection_coalesce(mock_daq_server, shared_broker):
+    client1 = shared_broker.connection("localhost", 8004, 6)
+    client2 = shared_broker.connection("localhost", 8004, 6)
+    daq_server = mock_daq_server.return_value
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_get(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return 42
+
+    daq_server.getDouble.side_effect = slow_get
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(client1.call("getDouble", "/dev1234/a"))
+    )
+    thread.start()
+    started.wait(5)
+    waiter = threading.Thread(
+        target=lambda: results.append(client2.call("getDouble", "/dev1234/a"))
+    )
+    waiter.start()
+    time.sleep(0.1)
+    release.set()
+    thread.join(5)
+    waiter.join(5)
+    assert results == [42, 42]
+    daq_server.getDouble.assert_called_once_with("/dev1234/a")
+
+    # errors are forwarded to all waiting clients
+    daq_server.getDouble.side_effect = RuntimeError("test")
+    with pytest.raises(RuntimeError):
+        client1.call("getDouble", "/dev1234/a")
+
+
+def test_shared_connection_subscriptions(mock_daq_server, shared_broker):
+    client1 = shared_broker.connection("localhost", 8004, 6)
+    client2 = shared_broker.connection("localhost", 8004, 6)
+    daq_server = mock_daq_server.return_value
+
+    client1.subscribe("/DEV1234/demods/0/sample")
+    client2.subscribe("/dev1234/demods/0/sample")
+    client2.subscribe("/dev1234/demods/1/sample")
+    assert daq_server.subscribe.call_count == 2
+
+    daq_server.poll.return_value = {
+        "/dev1234/demods/0/sample": {"x": np.array([1, 2]), "y": np.array([3, 4])},
+        "/dev1234/demods/1/sample": {"x": np.array([5]), "y": np.array([6])},
+    }
+    result = client1.poll(0.1, 500)
+    daq_server.poll.assert_called_with(0.1, 500, flat=True)
+    assert list(result.keys()) == ["/dev1234/demods/0/sample"]
+
+    daq_server.poll.return_value = {
+        "/dev1234/demods/0/sample": {"x": np.array([7]), "y": np.array([8])},
+    }
+    result = client2.poll(0.1, 500)
+    np.testing.assert_array_equal(
+        result["/dev1234/demods/0/sample"]["x"], np.array([1, 2, 7])
+    )
+    np.testing.assert_array_equal(
+        result["/dev1234/demods/1/sample"]["y"], np.array([6])
+    )
+
+    client1.unsubscribe("*")
+    daq_server.unsubscribe.assert_not_called()
+    client2.unsubscribe("/dev1234/demods/0/sample")
+    daq_server.unsubscribe.assert_called_once_with("/dev1234/demods/0/sample")
+    # subscriptions are removed with the client
+    del client2
+    daq_server.unsubscribe.assert_called_with("/dev1234/demods/1/sample")
+
+
+def test_broker_connection(mock_daq_server, shared_broker):
+    client = shared_broker.connection("localhost", 8004, 6)
+    connection = labber_broker.BrokerConnection(client, "localhost", 8004, 6)
+    assert mock_daq_server.call_count == 1
+    assert connection.host == "localhost"
+    assert connection.port == 8004
+    connection.getString("/zi/about/dataserver")
+    mock_daq_server.return_value.getString.assert_called_with("/zi/about/dataserver")
+    # Not shared functionality opens a direct connection
+    connection.dataAcquisitionModule()
+    assert mock_daq_server.call_count == 2
+    mock_daq_server.return_value.dataAcquisitionModule.assert_called_once()
+    with pytest.raises(AttributeError):
+        connection._private
+
+
+def test_broker_server(mock_daq_server):
+    broker = labber_broker.Broker()
+    labber_broker._BrokerServerManager.register(
+        "connection",
+        callable=broker.connection,
+        exposed=labber_broker.ClientConnection.EXPOSED,
+    )
+    manager = labber_broker._BrokerServerManager(
+        address=("localhost", 0), authkey=b"test"
+    )
+    server = manager.get_server()
+
+    def serve_forever():
+        try:
+            server.serve_forever()
+        except SystemExit:
+            pass
+
+    thread = threading.Thread(target=serve_forever, daemon=True)
+    thread.start()
+    mock_daq_server.return_value.getInt.return_value = 5
+    connection = labber_broker.connect_broker(
+        {"port": server.address[1], "authkey": "test"}, "localhost", 8004, False
+    )
+    assert connection.getInt("/dev1234/a") == 5
+    mock_daq_server.assert_called_once_with("localhost", 8004, 6)
+    mock_daq_server.return_value.getInt.assert_called_once_with("/dev1234/a")
+    server.stop_event.set()
+    thread.join(5)
+
+
+def test_broker_authkey(tmp_path):
+    authkey_file = tmp_path / "labber" / "broker_authkey"
+    with patch("zhinst.labber.driver.broker.AUTHKEY_FILE", authkey_file):
+        assert labber_broker.broker_authkey("test") == b"test"
+        assert not authkey_file.exists()
+        authkey = labber_broker.broker_authkey()
+        assert len(authkey) == 64
+        assert authkey_file.read_text().encode() == authkey
+        if os.name == "posix":
+            assert authkey_file.stat().st_mode & 0o777 == 0o600
+        # the key is generated only once
+        assert labber_broker.broker_authkey() == authkey
+
+
+def test_broker_serve_remote():
+    assert labber_broker.is_loopback("localhost")
+    assert labber_broker.is_loopback("127.0.0.1")
+    assert not labber_broker.is_loopback("0.0.0.0")
+    with pytest.raises(ValueError):
+        labber_broker.serve(host="0.0.0.0")
+
+
+def test_shared_connection_poll_not_blocking(mock_daq_server, shared_broker):
+    client1 = shared_broker.connection("localhost", 8004, 6)
+    client2 = shared_broker.connection("localhost", 8004, 6)
+    daq_server = mock_daq_server.return_value
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_poll(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return {}
+
+    daq_server.poll.side_effect = slow_poll
+    client1.subscribe("/dev1234/demods/0/sample")
+    thread = threading.Thread(target=lambda: client1.poll(10, 500))
+    thread.start()
+    started.wait(5)
+    # polls use a separate connection
+    assert mock_daq_server.call_count == 2
+    daq_server.getInt.return_value = 1
+    assert client2.call("getInt", "/dev1234/a") == 1
+    release.set()
+    thread.join(5)
+
+
+def test_shared_connection_poll_buffer(mock_daq_server):
+    shared = labber_broker.SharedConnection(
+        "localhost", 8004, 6, snapshot_ttl=0, max_buffered_polls=3
+    )
+    daq_server = mock_daq_server.return_value
+    shared.subscribe(0, "/dev1234/demods/0/sample")
+    shared.subscribe(1, "/dev1234/demods/0/sample")
+    with patch("zhinst.labber.driver.broker.logger") as logger:
+        for i in range(5):
+            daq_server.poll.return_value = {
+                "/dev1234/demods/0/sample": {"x": np.array([i])}
+            }
+            shared.poll(0, 0.1, 500)
+    # client 1 never polled, only the latest chunks are kept
+    logger.warning.assert_called_once()
+    daq_server.poll.return_value = {}
+    result = shared.poll(1, 0.1, 500)
+    np.testing.assert_array_equal(
+        result["/dev1234/demods/0/sample"]["x"], np.array([2, 3, 4])
+    )
@@ -0,0 +1,167 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from labber.BaseDriver import InstrumentQuantity
+from labber.InstrumentDriver_Interface import Interface
+from zhinst.labber.driver.config_planner import values_equal
+from zhinst.labber.testing import FakeDataServer, fake_data_server
+
+
+@pytest.fixture()
+def fake_server(data_dir):
+    server = FakeDataServer()
+    server.add_device("dev1234", data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI")
+    server.connectDevice("dev1234")
+    with fake_data_server(server):
+        yield server
+
+
+@pytest.fixture()
+def driver(fake_server):
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": {"base_type": "device", "type": "UHFLI"},
+    }
+    labber_driver.created_sessions = {}
+    driver = labber_driver.BaseDevice(settings=settings)
+    driver.comCfg = MagicMock()
+    driver.comCfg.getAddressString.return_value = "DEV1234"
+    driver.instrCfg = MagicMock()
+    driver.interface = MagicMock()
+    driver.dOp = {"operation": 0}
+    driver.performOpen()
+    yield driver
+    driver.performClose()
+
+
+def create_quant(name, path, datatype=InstrumentQuantity.DOUBLE, combos=None):
+    quant = Mock(spec=InstrumentQuantity)
+    quant.name = name
+    quant.set_cmd = path
+    quant.get_cmd = path
+    quant.datatype = datatype
+    quant.cmd_def = [] if combos is None else list(combos)
+    quant.combo_defs = [] if combos is None else list(combos.values())
+    return quant
+
+
+def set_config(driver, values):
+    driver.dOp = {"operation": Interface.SET_CFG}
+    for call_no, (quant, value) in enumerate(values):
+        driver.performSetValue(
+            quant, value, options={"call_no": call_no, "n_calls": len(values)}
+        )
+
+
+def test_values_equal():
+    assert values_equal(1, 1.0)
+    assert values_equal(1, True)
+    assert not values_equal(1, 2)
+    assert values_equal(0.5, 0.5)
+    assert values_equal("abc", "abc")
+    assert not values_equal("abc", 1)
+    assert not values_equal(None, 0)
+    assert values_equal({"vector": np.array([1, 2])}, [1, 2])
+    assert not values_equal(np.array([1, 2]), np.array([1, 2, 3]))
+
+
+def test_set_config(driver, fake_server):
+    values = [
+        (create_quant("Demods - 0 - Rate", "demods/0/rate"), 1000.0),
+        (create_quant("Sigouts - 0 - On", "sigouts/0/on"), 1),
+        (
+            create_quant(
+                "Demods - 0 - Adcselect",
+                "demods/0/adcselect",
+                InstrumentQuantity.COMBO,
+                {"0": "Sig In 1", "1": "Curr In 1"},
+            ),
+            "Curr In 1",
+        ),
+    ]
+    fake_server.set("/dev1234/demods/0/rate", 10.0)
+    with patch.object(fake_server, "set", wraps=fake_server.set) as set_mock:
+        set_config(driver, values)
+    assert set_mock.call_count == 1
+    assert fake_server.getDouble("/dev1234/demods/0/rate") == 1000.0
+    assert fake_server.getInt("/dev1234/sigouts/0/on") == 1
+    assert fake_server.getInt("/dev1234/demods/0/adcselect") == 1
+    assert driver._config_planner.written == 3
+    assert driver._config_planner.skipped == 0
+
+    # re-applying the same configuration => single snapshot, no writes
+    with patch.object(
+        fake_server, "set", wraps=fake_server.set
+    ) as set_mock, patch.object(
+        fake_server, "get", wraps=fake_server.get
+    ) as get_mock, patch(
+        "zhinst.labber.driver.config_planner.logger"
+    ) as logger:
+        set_config(driver, values)
+    # empty transaction
+    set_mock.assert_called_once_with([])
+    get_mock.assert_called_once()
+    logger.info.assert_called_with(
+        "Set config: %d nodes written, %d writes skipped", 0, 3
+    )
+
+    # only the changed node is written
+    fake_server.set("/dev1234/sigouts/0/on", 0)
+    set_config(driver, values)
+    assert fake_server.getInt("/dev1234/sigouts/0/on") == 1
+    assert driver._config_planner.written == 1
+    assert driver._config_planner.skipped == 2
+
+
+def test_values_equal_float():
+    assert values_equal(0.1, 0.1 + 1e-12)
+    assert values_equal(np.float32(0.1), 0.1)
+    assert values_equal(np.array([0.1, 0.2], dtype=np.float32), [0.1, 0.2])
+    assert not values_equal(1.0, 1.001)
+    assert not values_equal(2**40, 2**40 + 1)
+
+
+def test_set_config_side_effects(driver, fake_server):
+    offset = create_quant("Sigouts - 0 - Offset", "sigouts/0/offset")
+    range_quant = create_quant("Sigouts - 0 - Range", "sigouts/0/range")
+    on = create_quant("Sigouts - 0 - On", "sigouts/0/on")
+    fake_server.set("/dev1234/sigouts/0/offset", 0.0)
+    fake_server.set("/dev1234/sigouts/0/range", 1.5)
+    fake_server.set("/dev1234/sigouts/0/on", 1)
+    server_set = fake_server.set
+
+    def rescale(path, value=None):
+        # a range change resets the offset
+        server_set(path, value)
+        if isinstance(path, list) and any("range" in node for node, _ in path):
+            server_set("/dev1234/sigouts/0/offset", 0.3)
+
+    with patch.object(fake_server, "set", side_effect=rescale):
+        set_config(driver, [(offset, 0.0), (range_quant, 0.15), (on, 1)])
+    assert fake_server.getDouble("/dev1234/sigouts/0/range") == 0.15
+    # skipped before the range write => read again and written
+    assert fake_server.getDouble("/dev1234/sigouts/0/offset") == 0.0
+    # after the range write => written unconditionally
+    assert driver._config_planner.written == 2
+    assert driver._config_planner.skipped == 1
+
+
+def test_set_config_snapshot_failure(driver, fake_server):
+    values = [
+        (create_quant("Demods - 0 - Rate", "demods/0/rate"), 1000.0),
+        (create_quant("Sigouts - 0 - On", "sigouts/0/on"), 1),
+    ]
+    with patch.object(
+        driver._snapshot, "refresh", side_effect=RuntimeError("Test")
+    ), patch.object(fake_server, "get", wraps=fake_server.get) as get_mock:
+        set_config(driver, values)
+    # all nodes are written without reading them individually
+    get_mock.assert_not_called()
+    assert driver._config_planner.written == 2
+    assert fake_server.getDouble("/dev1234/demods/0/rate") == 1000.0
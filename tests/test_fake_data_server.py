@@ -0,0 +1,120 @@
+import json
+import time
+
+import numpy as np
+import pytest
+from zhinst.toolkit import Session
+
+from zhinst.labber.testing import (
+    FakeDataServer,
+    fake_data_server,
+    load_nodedoc,
+    scale_nodedoc,
+)
+
+
+@pytest.fixture()
+def fake_server(data_dir):
+    server = FakeDataServer(
+        module_nodedocs={
+            "dataAcquisitionModule": data_dir / "nodedoc_daq_test.json",
+            "sweep": data_dir / "nodedoc_sweeper_test.json",
+        },
+        module_duration=0.05,
+    )
+    server.add_device(
+        "dev1234", data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI", "LI\nDIG"
+    )
+    yield server
+
+
+def test_load_and_scale_nodedoc(data_dir):
+    nodedoc = load_nodedoc(data_dir / "nodedoc_dev1234_uhfli.json")
+    assert "/dev1234/demods/0/rate" in nodedoc
+    assert load_nodedoc(json.dumps({"/A/B": {}})) == {"/a/b": {}}
+    scaled = scale_nodedoc(nodedoc, 100)
+    assert len(scaled) > 10 * len(nodedoc)
+    assert scaled["/dev1234/demods/99/rate"]["Node"] == "/DEV1234/DEMODS/99/RATE"
+    assert "/dev1234/features/devtype" in scaled
+
+
+def test_device_nodes(fake_server):
+    assert fake_server.getString("/zi/devices/visible") == "dev1234"
+    assert fake_server.getString("/zi/devices/connected") == ""
+    with pytest.raises(RuntimeError):
+        fake_server.listNodesJSON("/dev1234/*")
+    fake_server.connectDevice("dev1234", "1GbE")
+    assert fake_server.getString("/zi/devices/connected") == "dev1234"
+    assert json.loads(fake_server.getString("/zi/devices"))["DEV1234"]["CONNECTED"]
+    assert "/dev1234/demods/0/rate" in json.loads(
+        fake_server.listNodesJSON("/dev1234/demods/0")
+    )
+    with pytest.raises(RuntimeError):
+        fake_server.connectDevice("dev9999")
+
+    fake_server.set("/dev1234/demods/0/rate", 2000)
+    assert fake_server.getDouble("/dev1234/demods/0/rate") == 2000.0
+    result = fake_server.get("/dev1234/demods/*/rate", flat=True)
+    assert result["/dev1234/demods/0/rate"]["value"][0] == 2000.0
+    nested = fake_server.get("/dev1234/demods/0/rate")
+    assert nested["dev1234"]["demods"]["0"]["rate"]["value"][0] == 2000.0
+    # transaction
+    fake_server.set([("/dev1234/oscs/0/freq", 10e6), ("/dev1234/sigouts/0/on", 1)])
+    assert fake_server.getDouble("/dev1234/oscs/0/freq") == 10e6
+    assert fake_server.getInt("/dev1234/sigouts/0/on") == 1
+    with pytest.raises(RuntimeError):
+        fake_server.set("/dev1234/unknown", 1)
+
+
+def test_subscribe_poll(fake_server):
+    fake_server.connectDevice("dev1234")
+    fake_server.set("/dev1234/demods/0/rate", 10e3)
+    fake_server.subscribe("/dev1234/demods/0/sample")
+    fake_server.subscribe("/dev1234/sigouts/0/on")
+    fake_server.set("/dev1234/sigouts/0/on", 1)
+    fake_server.getAsEvent("/dev1234/sigouts/0/on")
+    result = fake_server.poll(0.01, 100, flat=True)
+    samples = result["/dev1234/demods/0/sample"]
+    assert len(samples["x"]) >= 100
+    assert np.all(np.diff(samples["timestamp"].astype(np.int64)) > 0)
+    np.testing.assert_array_equal(result["/dev1234/sigouts/0/on"]["value"], [1, 1])
+    fake_server.unsubscribe("*")
+    assert fake_server.poll(0, 100, flat=True) == {}
+    sample = fake_server.getSample("/dev1234/demods/0/sample")
+    assert len(sample["x"]) > 0
+
+
+def test_latency():
+    server = FakeDataServer(latency={"getInt": 0.05, "default": 0})
+    start = time.perf_counter()
+    server.getString("/zi/about/version")
+    assert time.perf_counter() - start < 0.05
+    server.getInt("/zi/config/port")
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_toolkit_session(fake_server):
+    with fake_data_server(fake_server):
+        session = Session("localhost")
+        device = session.connect_device("dev1234")
+        assert device.device_type == "UHFLI"
+        device.demods[0].rate(1000)
+        assert device.demods[0].rate() == 1000
+        with device.set_transaction():
+            device.oscs[0].freq(1e6)
+            device.demods[0].enable(1)
+        assert device.oscs[0].freq() == 1e6
+        assert device.demods[0].enable() == 1
+        sample = device.demods[0].sample()
+        assert "x" in sample
+
+        daq_module = session.modules.daq
+        daq_module.grid.cols(50)
+        assert daq_module.grid.cols() == 50
+        daq_module.subscribe("/dev1234/demods/0/sample.r")
+        daq_module.execute()
+        assert not daq_module.raw_module.finished()
+        daq_module.wait_done(timeout=1, sleep_time=0.01)
+        assert daq_module.progress() == 1
+        result = daq_module.raw_module.read(flat=True)
+        assert result["/dev1234/demods/0/sample.r"][0]["value"].shape == (1, 50)
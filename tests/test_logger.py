@@ -0,0 +1,123 @@
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from zhinst.toolkit import Waveforms
+
+from zhinst.labber.driver.logger import (
+    BackgroundQueueHandler,
+    ErrorRateLimiter,
+    PayloadSummary,
+    configure_logger,
+    summarize,
+)
+
+
+def test_summarize_array():
+    value = np.ones(1000000, dtype=np.complex64)
+    summary = summarize(value)
+    assert summary.startswith("array(shape=(1000000,), dtype=complex64, hash=")
+    assert summary == summarize(value.copy())
+    assert summary != summarize(2 * value)
+    assert summarize(1.5) == "1.5"
+    assert summarize("test") == "test"
+
+
+def test_summarize_waveforms():
+    waves = Waveforms()
+    waves[0] = (np.ones(10), None, None)
+    waves[3] = (np.ones(10), np.zeros(10), np.ones(10, dtype=int))
+    summary = summarize({"waveforms": waves, "test": [1, (2, 3)]})
+    assert summary.startswith("{'waveforms': Waveforms(0: (array(shape=(10,)")
+    assert "None, None), 3: (array(" in summary
+    assert summary.endswith("'test': [1, (2, 3)]}")
+
+
+def test_payload_summary_lazy():
+    class Payload:
+        calls = 0
+
+        def __str__(self):
+            Payload.calls += 1
+            return "payload"
+
+    summary = PayloadSummary(Payload())
+    assert Payload.calls == 0
+    assert str(summary) == "payload"
+    assert Payload.calls == 1
+
+
+def test_error_rate_limiter():
+    rate_limiter = ErrorRateLimiter(interval=60)
+
+    def record(level, msg, *args):
+        return logging.LogRecord("test", level, "", 0, msg, args, None)
+
+    assert rate_limiter.filter(record(logging.ERROR, "error %s", 1))
+    assert not rate_limiter.filter(record(logging.ERROR, "error %s", 1))
+    assert not rate_limiter.filter(record(logging.ERROR, "error %s", 1))
+    assert rate_limiter.filter(record(logging.ERROR, "error %s", 2))
+    assert rate_limiter.filter(record(logging.INFO, "info"))
+    assert rate_limiter.filter(record(logging.INFO, "info"))
+
+    rate_limiter = ErrorRateLimiter(interval=0)
+    assert rate_limiter.filter(record(logging.ERROR, "error"))
+    repeated = record(logging.ERROR, "error")
+    assert rate_limiter.filter(repeated)
+    assert repeated.getMessage() == "error"
+
+
+def test_configure_logger_background():
+    logger = logging.getLogger("zhinst.labber.test_logger")
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        log_path = Path(tmpdirname) / "test.log"
+        configure_logger(logger, logging.INFO, log_path)
+        configure_logger(logger, logging.INFO, log_path)
+        handlers = [
+            handler
+            for handler in logger.handlers
+            if isinstance(handler, BackgroundQueueHandler)
+        ]
+        assert len(handlers) == 1
+        main_thread = threading.current_thread()
+        emitted_from = []
+        handlers[0]._listener.handlers[-1].addFilter(
+            lambda record: emitted_from.append(threading.current_thread()) or True
+        )
+        logger.info("test %s", PayloadSummary(np.zeros(5)))
+        for _ in range(3):
+            logger.error("same error")
+        handlers[0].close()
+        logger.removeHandler(handlers[0])
+        content = log_path.read_text()
+        assert "test array(shape=(5,), dtype=float64" in content
+        assert content.count("same error") == 1
+        assert emitted_from and main_thread not in emitted_from
+
+
+def test_background_handler_lazy_format():
+    formatted_from = []
+
+    class Payload:
+        def __str__(self):
+            formatted_from.append(threading.current_thread())
+            return "payload"
+
+    records = []
+    target = logging.Handler()
+    target.emit = lambda record: records.append(record.getMessage())
+    handler = BackgroundQueueHandler(target)
+    logger = logging.getLogger("test_background_handler_lazy_format")
+    logger.propagate = False
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        logger.info("test %s", PayloadSummary(Payload()))
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    assert records == ["test payload"]
+    # the payload is only summarized by the background thread
+    assert formatted_from and threading.current_thread() not in formatted_from
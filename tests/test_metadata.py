@@ -0,0 +1,129 @@
+import configparser
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from zhinst.labber import __version__
+from zhinst.labber.driver.metadata import (
+    METADATA_VERSION,
+    load_metadata,
+    render_metadata,
+    settings_size,
+)
+from zhinst.labber.generator.generator import (
+    SETTINGS_FILE,
+    generate_labber_files_offline,
+    open_settings_file,
+)
+
+
+@pytest.fixture()
+def shfqa_driver_dir(data_dir, tmp_path):
+    generate_labber_files_offline(
+        str(tmp_path),
+        "ADVANCED",
+        "dev1234",
+        data_dir / "nodedoc_dev1234_shfqa.json",
+        "SHFQA4",
+    )
+    yield tmp_path / "Zurich_Instruments_SHFQA4"
+
+
+def create_driver(settings, metadata_file=None):
+    labber_driver.created_sessions = {}
+    return labber_driver.BaseDevice(settings=settings, metadata_file=metadata_file)
+
+
+def test_render_metadata():
+    settings = open_settings_file()
+    content = render_metadata(
+        settings,
+        "device",
+        "SHFQA4",
+        [
+            "/qachannels/0/generator/pulses",
+            "/qachannels/0/centerfreq",
+            "/qachannels/1/readout/wait_done",
+            "/qachannels/1/generator/pulses",
+        ],
+        "Zurich_Instruments_SHFQA4",
+        1234,
+    )
+    namespace = {}
+    exec(compile(content, "quant_metadata.py", "exec"), namespace)
+    assert namespace["METADATA_VERSION"] == METADATA_VERSION
+    assert namespace["PACKAGE_VERSION"] == __version__
+    assert namespace["SETTINGS_SIZE"] == 1234
+    assert namespace["LABBER_DELIMITER"] == settings["misc"]["labberDelimiter"]
+    assert namespace["FUNCTIONS"] == settings["functions"]
+    # Quants without driver information are not part of the metadata
+    assert namespace["QUANTS"] == {
+        "/qachannels/0/generator/pulses": 0,
+        "/qachannels/1/readout/wait_done": 1,
+        "/qachannels/1/generator/pulses": 0,
+    }
+    quants = settings["SHFQA"]["quants"]
+    assert namespace["DRIVER_INFO"] == (
+        quants["/qachannels/*/generator/pulses"]["driver"],
+        quants["/qachannels/*/readout/wait_done"]["driver"],
+    )
+
+
+def test_load_metadata(shfqa_driver_dir, tmp_path):
+    metadata_file = shfqa_driver_dir / "quant_metadata.py"
+    metadata = load_metadata(metadata_file, SETTINGS_FILE)
+    assert metadata.QUANTS
+    assert not any("*" in path for path in metadata.QUANTS)
+    assert metadata.SETTINGS_SIZE == settings_size(SETTINGS_FILE)
+    assert load_metadata(tmp_path / "missing.py", SETTINGS_FILE) is None
+    outdated = tmp_path / "outdated.py"
+    outdated.write_text("METADATA_VERSION = 0\n")
+    assert load_metadata(outdated, SETTINGS_FILE) is None
+
+    # generated with a different settings file or package version
+    other_settings = tmp_path / "settings.json"
+    other_settings.write_text("{}")
+    assert load_metadata(metadata_file, other_settings) is None
+    with patch("zhinst.labber.driver.metadata.__version__", "0.0.0"):
+        assert load_metadata(metadata_file, SETTINGS_FILE) is None
+
+
+def test_load_metadata_does_not_read_settings(shfqa_driver_dir):
+    metadata_file = shfqa_driver_dir / "quant_metadata.py"
+    with patch("builtins.open") as open_mock:
+        assert load_metadata(metadata_file, SETTINGS_FILE) is not None
+    open_mock.assert_not_called()
+
+
+def test_driver_metadata(shfqa_driver_dir, tmp_path):
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": {"base_type": "device", "type": "SHFQA4"},
+    }
+    driver = create_driver(settings)
+    metadata_file = shfqa_driver_dir / "quant_metadata.py"
+    with patch.object(labber_driver.json, "loads") as loads:
+        driver_metadata = create_driver(settings, metadata_file)
+        loads.assert_not_called()
+    assert driver_metadata._path_seperator == driver._path_seperator
+    assert driver_metadata._function_info == driver._function_info
+
+    config = configparser.ConfigParser()
+    config.read(shfqa_driver_dir / "Zurich_Instruments_SHFQA4.ini")
+    for quant_name in config.sections():
+        assert repr(driver_metadata._get_node_info(quant_name)) == repr(
+            driver._get_node_info(quant_name)
+        )
+    # Drivers without metadata module use the global settings
+    driver_missing = create_driver(settings, shfqa_driver_dir / "missing.py")
+    assert driver_missing._quant_info is None
+    # ... as well as drivers generated from a different settings file
+    changed_settings = tmp_path / "settings.json"
+    changed_settings.write_text(SETTINGS_FILE.read_text() + "\n")
+    with patch.object(labber_driver, "GLOBAL_SETTINGS", changed_settings):
+        driver_changed = create_driver(settings, metadata_file)
+    assert driver_changed._quant_info is None
@@ -0,0 +1,139 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from labber.BaseDriver import InstrumentQuantity
+from zhinst.labber.driver.poller import (
+    BackgroundPoller,
+    DoubleBuffer,
+    matching_config,
+)
+
+WAVE_NODE = "/dev1234/scopes/0/wave"
+
+
+class FakeConnection:
+    """Connection that returns a new scope wave on every poll."""
+
+    def __init__(self):
+        self.subscribed = []
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def subscribe(self, path):
+        self.subscribed.append(path)
+
+    def unsubscribe(self, path):
+        self.subscribed = []
+
+    def poll(self, recording_time, timeout, flat=False):
+        time.sleep(0.001)
+        with self.lock:
+            self.counter += 1
+            counter = self.counter
+        if WAVE_NODE not in self.subscribed:
+            return {}
+        return {WAVE_NODE: [{"wave": np.full((2, 4), counter, dtype=np.int16)}]}
+
+
+def test_double_buffer():
+    buffer = DoubleBuffer(size=4)
+    assert buffer.get(timeout=0) == (None, 0)
+    buffer.append(np.array([1, 2, 3]))
+    assert buffer.get(timeout=0) == (None, 0)
+    buffer.append(np.array([4, 5]))
+    value, generation = buffer.get()
+    np.testing.assert_array_equal(value, [2, 3, 4, 5])
+    assert generation == 1
+    # no newer buffer available
+    assert buffer.get(newer_than=1, timeout=0.01) == (None, 1)
+
+    buffer = DoubleBuffer()
+    buffer.append(np.array([1, 2, 3]))
+    np.testing.assert_array_equal(buffer.get()[0], [1, 2, 3])
+
+
+def test_matching_config():
+    config = {"/scopes/*/wave": {"fresh": True}, "*": {"buffer_size": 10}}
+    assert matching_config("/scopes/0/wave", config) == {"fresh": True}
+    assert matching_config("/qas/0/result", config) == {"buffer_size": 10}
+    assert matching_config("/qas/0/result", {}) is None
+
+
+def test_background_poller():
+    connection = FakeConnection()
+    poller = BackgroundPoller(connection)
+    poller.add(WAVE_NODE.upper())
+    assert WAVE_NODE in poller
+    assert connection.subscribed == [WAVE_NODE]
+    poller.start()
+    first = poller.get(WAVE_NODE, fresh=True, timeout=1)
+    assert first.dtype == np.int16
+    assert len(first) == 4
+    second = poller.get(WAVE_NODE, fresh=True, timeout=1)
+    assert second[0] > first[0]
+    poller.stop()
+    assert connection.subscribed == []
+
+
+def test_driver_background_poller():
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": {"base_type": "device", "type": "UHFLI"},
+        "background_poller": {"/scopes/*/wave": {"fresh": True, "timeout": 1}},
+    }
+    labber_driver.created_sessions = {}
+    connection = FakeConnection()
+    with patch(
+        "zhinst.labber.driver.base_instrument.Session", autospec=True
+    ) as session, patch(
+        "zhinst.labber.driver.base_instrument.core.ziDAQServer",
+        return_value=connection,
+    ):
+        session.return_value.connect_device.return_value.serial = "dev1234"
+        driver = labber_driver.BaseDevice(settings=settings)
+        driver.comCfg = MagicMock()
+        driver.comCfg.getAddressString.return_value = "DEV1234"
+        driver.instrCfg = MagicMock()
+        driver.interface = MagicMock()
+        driver.dOp = {"operation": 0}
+        for name, set_cmd, get_cmd in [
+            ("Scopes - 0 - Wave", "", "scopes/0/wave"),
+            ("Scopes - 0 - Enable", "scopes/0/enable", "scopes/0/enable"),
+        ]:
+            quant = Mock(spec=InstrumentQuantity)
+            quant.name = name
+            quant.set_cmd = set_cmd
+            quant.get_cmd = get_cmd
+            quant.cmd_def = []
+            quant.datatype = InstrumentQuantity.VECTOR
+            driver.dQuantities[name] = quant
+        driver.performOpen()
+        assert list(driver._poller_quants) == ["Scopes - 0 - Wave"]
+        assert connection.subscribed == [WAVE_NODE]
+
+        quant = driver.dQuantities["Scopes - 0 - Wave"]
+        first = driver.performGetValue(quant)
+        second = driver.performGetValue(quant)
+        assert second[0] > first[0]
+        driver._instrument["scopes/0/wave"].assert_not_called()
+
+        # no data => direct read
+        driver._poller.stop()
+        driver._poller.get(WAVE_NODE, fresh=True, timeout=0)
+        driver._poller_quants["Scopes - 0 - Wave"][1]["timeout"] = 0.01
+        with patch("zhinst.labber.driver.base_instrument.logger") as logger:
+            driver.performGetValue(quant)
+        logger.warning.assert_called_with(
+            "%s: no data received from the poller", "Scopes - 0 - Wave"
+        )
+        driver._instrument["scopes/0/wave"].assert_called_once()
+
+        driver.performClose()
+        assert driver._poller is None
@@ -0,0 +1,129 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from zhinst.labber.driver import prefetch
+from zhinst.labber.driver.prefetch import get_prefetcher, prefetched_device
+from zhinst.labber.testing import FakeDataServer, fake_data_server
+
+SERIALS = ["dev1234", "dev1235", "dev1236"]
+CONNECT_LATENCY = 0.2
+
+
+@pytest.fixture()
+def fake_server(data_dir):
+    server = FakeDataServer(latency={"connectDevice": CONNECT_LATENCY})
+    for serial in SERIALS:
+        server.add_device(serial, data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI")
+    with fake_data_server(server):
+        yield server
+
+
+def create_driver(serial):
+    settings = {
+        "data_server": {
+            "host": "localhost",
+            "port": 8004,
+            "hf2": False,
+            "prefetch": SERIALS,
+        },
+        "instrument": {"base_type": "device", "type": "UHFLI"},
+    }
+    driver = labber_driver.BaseDevice(settings=settings)
+    driver.comCfg = MagicMock()
+    driver.comCfg.getAddressString.return_value = serial.upper()
+    driver.instrCfg = MagicMock()
+    driver.interface = MagicMock()
+    driver.dOp = {"operation": 0}
+    return driver
+
+
+def test_prefetch(fake_server):
+    labber_driver.created_sessions = {}
+    start = time.perf_counter()
+    drivers = [create_driver(serial) for serial in SERIALS]
+    with patch.object(
+        fake_server, "connectDevice", wraps=fake_server.connectDevice
+    ) as connect:
+        for driver in drivers:
+            driver.performOpen()
+    # bounded by the slowest device
+    assert time.perf_counter() - start < len(SERIALS) * CONNECT_LATENCY
+    assert connect.call_count == len(SERIALS)
+    for driver, serial in zip(drivers, SERIALS):
+        assert driver._instrument.serial == serial
+        assert driver._instrument is driver._session.devices[serial]
+    assert len({id(driver._session) for driver in drivers}) == 1
+
+
+def test_prefetch_failure(fake_server):
+    labber_driver.created_sessions = {}
+    driver = create_driver("dev1234")
+    driver._instrument_settings["data_server"]["prefetch"] = ["dev1234", "dev9999"]
+    driver.performOpen()
+    prefetcher = get_prefetcher(driver._session)
+    with pytest.raises(KeyError):
+        prefetcher.get("dev9999")
+    assert prefetcher.get("dev0000") is None
+
+    # failed prefetch => direct connect
+    driver = create_driver("dev9999")
+    with patch("zhinst.labber.driver.base_instrument.logger") as logger, pytest.raises(
+        KeyError
+    ):
+        driver.performOpen()
+    logger.error.assert_called_once()
+
+
+def test_prefetch_dedicated_connection(fake_server):
+    labber_driver.created_sessions = {}
+    driver = create_driver("dev1234")
+    main_thread = threading.get_ident()
+    threads = []
+    list_nodes = fake_server.listNodesJSON
+
+    def record_thread(path, *args, **kwargs):
+        if path.lower().startswith("/dev"):
+            threads.append(threading.get_ident())
+        return list_nodes(path, *args, **kwargs)
+
+    with patch(
+        "zhinst.core.ziDAQServer", return_value=fake_server
+    ) as daq, patch.object(
+        fake_server, "listNodesJSON", side_effect=record_thread
+    ), patch.object(
+        fake_server, "disconnect", wraps=fake_server.disconnect
+    ) as disconnect:
+        driver.performOpen()
+        devices = [get_prefetcher(driver._session).get(serial) for serial in SERIALS]
+    # one connection for the session and one per prefetched device
+    assert daq.call_count == 1 + len(SERIALS)
+    # the prefetch connections are closed
+    assert disconnect.call_count == len(SERIALS)
+    # the node trees are downloaded by the workers
+    assert len(threads) == len(SERIALS)
+    assert main_thread not in threads
+    for device, serial in zip(devices, SERIALS):
+        assert device is driver._session.devices[serial]
+
+
+def test_prefetcher_by_server(fake_server):
+    labber_driver.created_sessions = {}
+    driver = create_driver("dev1234")
+    driver.performOpen()
+    prefetcher = get_prefetcher(driver._session)
+    assert get_prefetcher(driver._session) is prefetcher
+
+    labber_driver.created_sessions = {}
+    other = create_driver("dev1235")
+    other.performOpen()
+    assert other._session is not driver._session
+    assert get_prefetcher(other._session) is not prefetcher
+    assert len(prefetch._prefetchers) == 1
+    assert prefetched_device(driver._session, "dev1234") is None
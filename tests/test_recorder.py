@@ -0,0 +1,222 @@
+import json
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from labber.BaseDriver import InstrumentQuantity
+from zhinst.labber.driver.recorder import (
+    RecordingConnection,
+    ReplayConnection,
+    TraceWriter,
+    read_trace,
+    replay_trace,
+)
+
+NODES = {
+    "/zi/config/port": {
+        "Node": "/ZI/CONFIG/PORT",
+        "Description": "Port",
+        "Properties": "Read, Write, Setting",
+        "Type": "Integer (64 bit)",
+        "Unit": "None",
+    },
+}
+
+
+class FakeModule:
+    def __init__(self):
+        self.values = {}
+
+    def set(self, path, value):
+        self.values[path] = value
+
+    def getDouble(self, path):
+        return self.values.get(path, 0.0)
+
+
+class FakeDataServer:
+    """Minimal ziDAQServer replacement with a single integer node."""
+
+    host = "localhost"
+    port = 8004
+
+    def __init__(self):
+        self.value = 8004
+
+    def getString(self, path):
+        if path == "/zi/about/dataserver":
+            return "Zurich Instruments Data Server"
+        return "23.06"
+
+    def listNodesJSON(self, path, *args, **kwargs):
+        return json.dumps(NODES)
+
+    def getInt(self, path):
+        return self.value
+
+    def get(self, path, *args, **kwargs):
+        return {path: {"timestamp": np.array([0]), "value": np.array([self.value])}}
+
+    def set(self, path, value=None):
+        self.value = value
+
+    def syncSetInt(self, path, value):
+        self.value = value
+        return value
+
+    def getDouble(self, path):
+        raise RuntimeError("unknown node")
+
+    def dataAcquisitionModule(self):
+        return FakeModule()
+
+
+def create_driver(settings):
+    labber_driver.created_sessions = {}
+    instrument = labber_driver.BaseDevice(settings=settings)
+    instrument.comCfg = MagicMock()
+    instrument.comCfg.getAddressString.return_value = "localhost:8004"
+    instrument.instrCfg = MagicMock()
+    instrument.interface = MagicMock()
+    instrument.dOp = {"operation": 0}
+    return instrument
+
+
+def create_quant(name, instrument, cmd):
+    quant = Mock(spec=InstrumentQuantity)
+    quant.name = name
+    quant.set_cmd = cmd
+    quant.get_cmd = cmd
+    quant.cmd_def = []
+    quant.datatype = 0
+    instrument._node_quant_map[instrument._quant_to_path(name)] = name
+    return quant
+
+
+def test_record_and_replay_connection():
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        trace_path = Path(tmpdirname) / "test.trace"
+        writer = TraceWriter(trace_path)
+        connection = RecordingConnection(FakeDataServer(), writer)
+        assert connection.host == "localhost"
+        assert connection.getInt("/zi/config/port") == 8004
+        connection.set("/zi/config/port", 1234)
+        assert connection.getInt("/zi/config/port") == 1234
+        with pytest.raises(RuntimeError):
+            connection.getDouble("/zi/config/port")
+        module = connection.dataAcquisitionModule()
+        module.set("grid/cols", 10)
+        assert module.getDouble("grid/cols") == 10
+        writer.close()
+
+        records = list(read_trace(trace_path))
+        assert [record.name for record in records] == [
+            "getInt",
+            "set",
+            "getInt",
+            "getDouble",
+            "dataAcquisitionModule",
+            "dataAcquisitionModule[0].set",
+            "dataAcquisitionModule[0].getDouble",
+        ]
+        assert records[3].is_error
+        assert all(record.duration >= 0 for record in records)
+
+        replay = ReplayConnection(records)
+        assert replay.getInt("/zi/config/port") == 8004
+        replay.set("/zi/config/port", 1234)
+        assert replay.getInt("/zi/config/port") == 1234
+        # exhausted requests repeat the last answer
+        assert replay.getInt("/zi/config/port") == 1234
+        with pytest.raises(RuntimeError, match="unknown node"):
+            replay.getDouble("/zi/config/port")
+        with pytest.raises(RuntimeError, match="not part of the trace"):
+            replay.getInt("/zi/config/unknown")
+        module = replay.dataAcquisitionModule()
+        module.set("grid/cols", 10)
+        assert module.getDouble("grid/cols") == 10
+
+
+def test_read_invalid_trace():
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        trace_path = Path(tmpdirname) / "test.trace"
+        trace_path.write_bytes(b"invalid")
+        with pytest.raises(ValueError):
+            list(read_trace(trace_path))
+
+
+def test_record_and_replay_driver():
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        trace_path = Path(tmpdirname) / "test.trace"
+        settings = {
+            "data_server": {"hf2": False},
+            "instrument": {"base_type": "DataServer"},
+            "record_path": str(trace_path),
+        }
+        with patch(
+            "zhinst.labber.driver.base_instrument.core.ziDAQServer",
+            return_value=FakeDataServer(),
+        ) as daq_server:
+            driver = create_driver(settings)
+            driver.performOpen()
+            daq_server.assert_called_once_with("localhost", 8004, 6)
+            # recording sessions are never shared
+            assert labber_driver.created_sessions == {}
+            quant = create_quant("config - port", driver, "config/port")
+            assert driver.performGetValue(quant) == 8004
+            driver.performSetValue(quant, 1234)
+            assert driver.performGetValue(quant) == 1234
+            # a read-only set gets the value internally
+            read_only = create_quant("config - port - read", driver, "config/port")
+            read_only.set_cmd = ""
+            assert driver.performSetValue(read_only, 1) == 1234
+            driver.performClose()
+
+        records = list(read_trace(trace_path))
+        assert records[0].kind == "session"
+        assert records[0].args == ("localhost", 8004, False)
+        labber_records = [record for record in records if record.kind == "labber"]
+        # nested operations are only recorded as part of the outer one
+        assert [record.name for record in labber_records] == [
+            "open",
+            "get",
+            "set",
+            "get",
+            "set",
+            "close",
+        ]
+        assert labber_records[2].args == ("config - port", 1234)
+
+        settings = {
+            "data_server": {"hf2": False},
+            "instrument": {"base_type": "DataServer"},
+            "replay_path": str(trace_path),
+        }
+        with patch(
+            "zhinst.labber.driver.base_instrument.core.ziDAQServer"
+        ) as daq_server:
+            driver = create_driver(settings)
+            quant = create_quant("config - port", driver, "config/port")
+            read_only = create_quant("config - port - read", driver, "config/port")
+            read_only.set_cmd = ""
+            quants = {quant.name: quant, read_only.name: read_only}
+            driver.getQuantity = Mock(side_effect=quants.get)
+            results = replay_trace(driver, trace_path)
+            daq_server.assert_not_called()
+        assert [result.operation for result in results] == [
+            "open",
+            "get",
+            "set",
+            "get",
+            "set",
+            "close",
+        ]
+        assert results[1].quant == "config - port"
+        assert quant.setValue.call_args_list[-1].args == (1234,)
+        assert read_only.setValue.call_args_list[-1].args == (1234,)
@@ -0,0 +1,113 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from labber.BaseDriver import InstrumentQuantity
+from zhinst.labber.driver.state import content_hash, load_state, save_state
+from zhinst.labber.testing import FakeDataServer, fake_data_server
+
+
+@pytest.fixture()
+def fake_server(data_dir):
+    server = FakeDataServer()
+    server.add_device("dev1234", data_dir / "nodedoc_dev1234_uhfli.json", "UHFLI")
+    server.connectDevice("dev1234")
+    with fake_data_server(server):
+        yield server
+
+
+@pytest.fixture()
+def driver(fake_server):
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": {"base_type": "device", "type": "UHFLI"},
+    }
+    labber_driver.created_sessions = {}
+    driver = labber_driver.BaseDevice(settings=settings)
+    driver.comCfg = MagicMock()
+    driver.comCfg.getAddressString.return_value = "DEV1234"
+    driver.instrCfg = MagicMock()
+    driver.instrCfg.getQuantity.side_effect = lambda name: driver.dQuantities[name]
+    driver.interface = MagicMock()
+    driver.dOp = {"operation": 0}
+    driver.performOpen()
+    yield driver
+    driver.performClose()
+
+
+def create_quant(driver, name, value):
+    quant = Mock(spec=InstrumentQuantity)
+    quant.name = name
+    quant.set_cmd = "*.seqc"
+    quant.get_cmd = ""
+    quant.cmd_def = []
+    quant.datatype = InstrumentQuantity.PATH
+    quant.PATH = InstrumentQuantity.PATH
+    quant.sweep_minute = False
+    quant.isVector.return_value = False
+    quant.getValue.return_value = value
+    quant.setValue.side_effect = lambda value, rate=None: setattr(
+        quant.getValue, "return_value", value
+    )
+    driver.dQuantities[name] = quant
+    driver._node_quant_map[driver._quant_to_path(name)] = name
+    return quant
+
+
+def test_save_load_state(tmp_path):
+    program = tmp_path / "program.seqc"
+    program.write_text("playZero(32);")
+    nodes = {
+        "/dev1234/a": 1,
+        "/dev1234/b": 0.5,
+        "/dev1234/c": "test",
+        "/dev1234/d": {"vector": np.arange(4, dtype=np.int16)},
+        "/dev1234/e": {"x": [1]},
+    }
+    save_state(tmp_path / "state.npz", nodes, {"A": program, "B": program})
+
+    loaded, files = load_state(tmp_path / "state.npz")
+    assert loaded["/dev1234/a"] == 1
+    assert loaded["/dev1234/b"] == 0.5
+    assert loaded["/dev1234/c"] == "test"
+    assert loaded["/dev1234/d"].dtype == np.int16
+    np.testing.assert_array_equal(loaded["/dev1234/d"], np.arange(4))
+    assert "/dev1234/e" not in loaded
+    digest = content_hash(b"playZero(32);")
+    assert files == {
+        "A": tmp_path / "state.blobs" / f"{digest}.seqc",
+        "B": tmp_path / "state.blobs" / f"{digest}.seqc",
+    }
+    assert files["A"].read_text() == "playZero(32);"
+
+
+def test_export_import_state(driver, fake_server, tmp_path):
+    program = tmp_path / "program.seqc"
+    program.write_text("playZero(32);")
+    create_quant(driver, "awgs - 0 - sequencer_program", str(program))
+    fake_server.set("/dev1234/demods/0/rate", 1000.0)
+    fake_server.set("/dev1234/sigouts/0/on", 1)
+    driver.export_state(tmp_path / "state.npz")
+
+    fake_server.set("/dev1234/demods/0/rate", 10.0)
+    fake_server.set("/dev1234/sigouts/0/on", 0)
+    driver.setValue("awgs - 0 - sequencer_program", "")
+    with patch.object(
+        fake_server, "set", wraps=fake_server.set
+    ) as set_mock, patch.object(driver, "call_function") as call_function:
+        driver.import_state(tmp_path / "state.npz")
+    # single transaction
+    set_mock.assert_called_once()
+    assert fake_server.getDouble("/dev1234/demods/0/rate") == 1000.0
+    assert fake_server.getInt("/dev1234/sigouts/0/on") == 1
+    restored = Path(driver.getValue("awgs - 0 - sequencer_program"))
+    assert restored.parent == tmp_path / "state.blobs"
+    assert restored.read_text() == "playZero(32);"
+    call_function.assert_called_once_with(
+        "sequencer_program", Path("/awgs/0/load_sequencer_program")
+    )
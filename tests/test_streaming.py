@@ -0,0 +1,180 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "labber"))
+import zhinst.labber.driver.base_instrument as labber_driver
+from labber.BaseDriver import InstrumentQuantity
+from zhinst.labber.driver.streaming import TIMEOUT_MARGIN, DemodStream, apply_statistic
+from zhinst.labber.testing import FakeDataServer, fake_data_server, scale_nodedoc
+
+
+@pytest.fixture()
+def fake_server(data_dir):
+    server = FakeDataServer()
+    server.add_device(
+        "dev1234",
+        scale_nodedoc(data_dir / "nodedoc_dev1234_uhfli.json", 2),
+        "UHFLI",
+    )
+    server.connectDevice("dev1234")
+    server.set("/dev1234/clockbase", 60e6)
+    server.set("/dev1234/demods/0/rate", 10e3)
+    with fake_data_server(server):
+        yield server
+
+
+def create_quant(driver, name, datatype, value=0):
+    quant = Mock(spec=InstrumentQuantity)
+    quant.name = name
+    quant.set_cmd = ""
+    quant.get_cmd = ""
+    quant.cmd_def = []
+    quant.datatype = datatype
+    quant.getValue.return_value = value
+    driver.dQuantities[name] = quant
+    driver._node_quant_map[driver._quant_to_path(name)] = name
+    return quant
+
+
+@pytest.fixture()
+def driver(fake_server):
+    settings = {
+        "data_server": {"host": "localhost", "port": 8004, "hf2": False},
+        "instrument": {"base_type": "device", "type": "UHFLI"},
+    }
+    labber_driver.created_sessions = {}
+    driver = labber_driver.BaseDevice(settings=settings)
+    driver.comCfg = MagicMock()
+    driver.comCfg.getAddressString.return_value = "DEV1234"
+    driver.instrCfg = MagicMock()
+    driver.instrCfg.getQuantity.side_effect = lambda name: driver.dQuantities[name]
+    driver.interface = MagicMock()
+    driver.dOp = {"operation": 0}
+    driver.performOpen()
+    create_quant(driver, "demods - 0 - stream - statistic", 0, "mean")
+    create_quant(driver, "demods - 0 - stream - window", 0, 0.0)
+    create_quant(driver, "demods - 0 - stream - samplecount", 0, 50)
+    yield driver
+    driver.performClose()
+
+
+def test_demod_stream():
+    stream = DemodStream("/dev1234/demods/0/sample", 60e6)
+    assert stream.needs_acquisition("value")
+    for start in range(0, 100, 10):
+        stream.buffer.append(
+            {
+                "timestamp": np.arange(start, start + 10, dtype=np.uint64) * 6000,
+                "x": np.arange(start, start + 10, dtype=float),
+                "y": np.zeros(10),
+            }
+        )
+    assert len(stream.buffer) == 100
+    assert stream.is_complete(100, 0)
+    assert not stream.is_complete(101, 0)
+    # 99 samples * 0.1ms
+    assert stream.is_complete(0, int(99e-4 * 60e6))
+    assert not stream.is_complete(0, int(100e-4 * 60e6))
+
+    stream.finish_acquisition(0, int(9e-4 * 60e6))
+    assert len(stream.buffer) == 0
+    samples = stream.read("value")
+    np.testing.assert_array_equal(samples["x"], np.arange(90, 100))
+    assert not stream.needs_acquisition("x")
+    assert stream.needs_acquisition("value")
+
+    assert apply_statistic(samples, "mean") == complex(94.5, 0)
+    assert apply_statistic(samples, "Max") == complex(99, 0)
+    with pytest.raises(ValueError):
+        apply_statistic(samples, "unknown")
+    assert np.isnan(apply_statistic({"x": [], "y": []}, "mean").real)
+
+
+def test_stream_value(driver, fake_server):
+    value = create_quant(
+        driver, "demods - 0 - stream - value", InstrumentQuantity.COMPLEX
+    )
+    x = create_quant(driver, "demods - 0 - stream - x", InstrumentQuantity.VECTOR)
+    timestamp = create_quant(
+        driver, "demods - 0 - stream - timestamp", InstrumentQuantity.VECTOR
+    )
+    assert driver.performGetValue(value) == pytest.approx(1e-3, rel=1e-2)
+    assert "/dev1234/demods/0/sample" in fake_server._subscribed
+    # the vectors belong to the same acquisition
+    x_values = driver.performGetValue(x)
+    timestamps = driver.performGetValue(timestamp)
+    assert len(x_values) == 50
+    assert np.all(np.diff(timestamps) > 0)
+    # reading a value again starts a new acquisition
+    assert driver.performGetValue(x)[0] != x_values[0]
+    assert driver.performGetValue(timestamp)[0] > timestamps[-1]
+
+    # time window
+    driver.dQuantities["demods - 0 - stream - samplecount"].getValue.return_value = 0
+    driver.dQuantities["demods - 0 - stream - window"].getValue.return_value = 0.01
+    driver.performGetValue(value)
+    assert len(driver.performGetValue(x)) == pytest.approx(100, abs=1)
+
+    # settings are only stored in Labber
+    window = driver.dQuantities["demods - 0 - stream - window"]
+    assert driver.performSetValue(window, 0.1) == 0.1
+
+    driver.performClose()
+    assert fake_server._subscribed == []
+
+
+def test_stream_connection(driver, fake_server):
+    value = create_quant(
+        driver, "demods - 0 - stream - value", InstrumentQuantity.COMPLEX
+    )
+    # samples are polled through a dedicated connection, not the shared session
+    with patch("zhinst.core.ziDAQServer", return_value=fake_server) as daq_server:
+        driver.performGetValue(value)
+        driver.performGetValue(value)
+    daq_server.assert_called_once_with("localhost", 8004, 6)
+    assert driver._stream_connection is daq_server.return_value
+    driver.performClose()
+    assert driver._stream_connection is None
+    assert fake_server._subscribed == []
+
+
+def test_stream_unread_demod(driver, fake_server):
+    fake_server.set("/dev1234/demods/1/rate", 10e3)
+    create_quant(driver, "demods - 1 - stream - statistic", 0, "mean")
+    create_quant(driver, "demods - 1 - stream - window", 0, 0.0)
+    create_quant(driver, "demods - 1 - stream - samplecount", 0, 50)
+    values = [
+        create_quant(
+            driver, f"demods - {i} - stream - value", InstrumentQuantity.COMPLEX
+        )
+        for i in range(2)
+    ]
+    driver.performGetValue(values[1])
+    for _ in range(5):
+        driver.performGetValue(values[0])
+    # samples of the demod that is not read are not buffered
+    streams = {str(path): stream for path, stream in driver._streams.items()}
+    assert "/dev1234/demods/1/sample" in fake_server._subscribed
+    assert len(streams["/demods/1"].buffer) == 0
+    x = create_quant(driver, "demods - 1 - stream - x", InstrumentQuantity.VECTOR)
+    assert len(driver.performGetValue(x)) == 50
+
+
+def test_stream_timeout(driver):
+    stream = DemodStream("/dev1234/demods/0/sample", 60e6)
+    assert stream.timeout(100, 0, 1e3) == pytest.approx(0.2 + TIMEOUT_MARGIN)
+    assert stream.timeout(0, int(60e6), 1e3) == pytest.approx(2 + TIMEOUT_MARGIN)
+    assert stream.timeout(0, 0, 1e3) == TIMEOUT_MARGIN
+
+    value = create_quant(
+        driver, "demods - 0 - stream - value", InstrumentQuantity.COMPLEX, 1j
+    )
+    with patch("zhinst.labber.driver.streaming.TIMEOUT_MARGIN", 0.05), patch.object(
+        driver, "_poll_streams"
+    ), patch("zhinst.labber.driver.base_instrument.logger") as logger:
+        assert driver.performGetValue(value) == 1j
+    assert "samples received" in str(logger.error.call_args[0][1])
@@ -0,0 +1,32 @@
+import numpy as np
+
+from zhinst.labber.driver.vectors import extract_vector, to_labber_vector
+
+
+def test_extract_vector():
+    vector = np.arange(4, dtype=np.int16)
+    assert extract_vector(vector) is vector
+    assert extract_vector({"x": 1, "y": vector}, ["y"]) is vector
+    assert extract_vector({"timestamp": 0, "vector": vector}) is vector
+    assert extract_vector({"wave": vector}) is vector
+    # custom keys take precedence
+    assert extract_vector({"value": 1, "y": vector}, ["y"]) is vector
+    assert extract_vector({"x": 1}) == {"x": 1}
+
+
+def test_to_labber_vector():
+    for dtype in [np.int16, np.float32, np.complex64, np.uint32]:
+        vector = np.arange(8).astype(dtype)
+        result = to_labber_vector(vector)
+        assert result is vector
+        assert result.dtype == dtype
+
+    waves = np.ones((2, 1000), dtype=np.int16)
+    result = to_labber_vector(waves)
+    assert result.shape == (1000,)
+    assert np.shares_memory(result, waves)
+
+    np.testing.assert_array_equal(to_labber_vector([1, 2]), [1, 2])
+    assert to_labber_vector(np.array([True, False])).dtype == np.float64
+    assert to_labber_vector("program") == "program"
+    assert to_labber_vector(None) is None